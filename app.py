@@ -1,216 +1,406 @@
+import atexit
+import io
 import json
+import os
+import re
+import threading
 from collections import defaultdict
-from datetime import date, datetime, timedelta
-from typing import Dict, List
+from datetime import date, datetime, time, timedelta, timezone
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from uuid import uuid4
 
-from flask import Flask, redirect, render_template, request, url_for
-
-
-app = Flask(__name__)
-app.config["SECRET_KEY"] = "dev-secret"
-
-# Exercise catalog (placeholder data – replace with DB/CMS later)
-BODY_PARTS: Dict[str, Dict] = {
-    "chest": {
-        "label": "Chest",
-        "color": "#2f855a",
-        "exercises": [
-            "Barbell Bench Press",
-            "Dumbbell Bench Press",
-            "Incline Dumbbell Press",
-            "Decline Bench Press",
-            "Machine Chest Press",
-            "Dumbbell Fly",
-            "Cable Crossover",
-            "Push-up",
-        ],
-    },
-    "shoulders": {
-        "label": "Shoulders",
-        "color": "#38a169",
-        "exercises": [
-            "Overhead Press",
-            "Standing Military Press",
-            "Seated Dumbbell Press",
-            "Arnold Press",
-            "Lateral Raise",
-            "Rear Delt Fly",
-            "Face Pull",
-            "Upright Row",
-        ],
-    },
-    "arms": {
-        "label": "Arms",
-        "color": "#277a49",
-        "exercises": [
-            "Barbell Curl",
-            "Preacher Curl",
-            "Hammer Curl",
-            "Cable Curl",
-            "Triceps Pushdown",
-            "Overhead Triceps Extension",
-            "Skull Crusher",
-            "Bench Dip",
-        ],
-    },
-    "back": {
-        "label": "Back",
-        "color": "#22543d",
-        "exercises": [
-            "Deadlift",
-            "Romanian Deadlift",
-            "Lat Pulldown",
-            "Pull-up",
-            "Bent Over Row",
-            "T-Bar Row",
-            "Single-Arm Dumbbell Row",
-            "Seated Cable Row",
-        ],
-    },
-    "legs": {
-        "label": "Legs",
-        "color": "#1b4332",
-        "exercises": [
-            "Back Squat",
-            "Front Squat",
-            "Leg Press",
-            "Walking Lunge",
-            "Romanian Deadlift",
-            "Leg Extension",
-            "Leg Curl",
-            "Calf Raise",
-        ],
-    },
-}
+import click
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    abort,
+    current_app,
+    g,
+    has_app_context,
+    has_request_context,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache
+
+from bulk import (
+    FORMATS,
+    ImportRowError,
+    detect_format,
+    gzip_chunks,
+    import_rows,
+    open_text,
+    parse_iso_date,
+    read_rows,
+    write_rows,
+)
+from cache import FragmentCache
+from catalog import DEFAULT_PATH as DEFAULT_CATALOG_PATH, Catalog, CatalogFile
+from columnar import ColumnarWorkouts
+from concurrency import Partitions
+import metrics
+from indexes import (
+    MACROS,
+    RESOLUTIONS,
+    ChangeFeed,
+    DailySummaryTable,
+    ExerciseRollups,
+    ExerciseSeriesIndex,
+    NutritionLedger,
+    NutritionRollups,
+    ProgressionIndex,
+    SessionIndex,
+    WeightTimeline,
+)
+from jobs import JobRunner
+from metrics import count_scanned, timed
+from models import Movement, Session
+from storage import JournalStorage, MemoryStorage, open_storage
+import trends
+
+
+DEFAULT_USER = "default"
+USER_PATTERN = re.compile(r"[A-Za-z0-9_.@-]{1,128}")
+FRAGMENT_CACHE_SIZE = 256  # per user
+WEIGHT_TAG = "body-weight"
+MAX_SCHEDULE_WINDOW_DAYS = 366
+NUTRITION_ENTRIES_PER_PAGE = 50
+NUTRITION_DAYS_PER_PAGE = 31
+EXPORT_PAGE_SIZE = 256
+EXPORT_MIMETYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+INTAKE_AVERAGE_WINDOWS = (7, 30, 365)
+INTAKE_SERIES_WINDOWS = (7, 30, 90, 365)
+PROGRESSION_WINDOW = 8
+MAX_PROGRESSION_WINDOW = 52
+CHANGES_PAGE_SIZE = 500
+TIMELINE_DAYS_PER_PAGE = 7
+BASELINE_CALORIES_PER_KG = 30.0
+TREND_WEEKS = 12
+MAX_TREND_WEEKS = 156
+ROLLUP_POINTS = 120
+MAX_ROLLUP_POINTS = 1000
+
+
+class Stores:
+    """The in-memory stores and the indexes derived from them."""
+
+    def __init__(self) -> None:
+        self.workouts: List[Movement] = []
+        self.nutrition_logs: List[Dict] = []
+        self.session_index = SessionIndex()
+        self.weight_timeline = WeightTimeline()
+        self.exercise_series = ExerciseSeriesIndex()
+        self.progression = ProgressionIndex()
+        self.workout_columns = ColumnarWorkouts()
+        self.nutrition_ledger = NutritionLedger()
+        self.daily_summaries = DailySummaryTable()
+        self.exercise_rollups = ExerciseRollups()
+        self.nutrition_rollups = NutritionRollups()
+        self.changes = ChangeFeed()
+        # Computed fragments, tagged with the dates they cover (and
+        # WEIGHT_TAG when they depend on the body-weight readings).
+        self.fragments = FragmentCache(FRAGMENT_CACHE_SIZE)
+        # Storage seq of the newest record applied, and when it was applied.
+        self.version = 0
+        self.modified = datetime.now(timezone.utc)
+
+    def apply(self, records: List[Dict], modified: datetime, shared: Optional[Dict] = None) -> None:
+        """Fold a batch of stored records into the stores and indexes.
+
+        The two copies of a left-right pair apply the same batch from the
+        same state, so work that does not depend on the copy is done once:
+        the first copy to apply the batch leaves it in ``shared`` and the
+        other replays it from there.
+        """
+        if shared is None:
+            shared = {}
+        if records:
+            self.version = max(self.version, max(record["seq"] for record in records))
+            self.modified = modified
+        weight_readings = len(self.weight_timeline)
+        touched = set()
+        entries: List[Dict] = []
+        logs: List[Dict] = []
+        changes = []
+        for record in records:
+            if record["kind"] == "workouts":
+                for entry in record["entries"]:
+                    # Sessions track the seq that last changed them.  Entries
+                    # rebuilt from a snapshot already carry their own; the
+                    # record has been written out by now, so stamping is safe.
+                    entry.setdefault("seq", record["seq"])
+                entries.extend(record["entries"])
+            elif record["kind"] == "nutrition":
+                changes.append((record["seq"], "nutrition", record["entry"]))
+                logs.append(record["entry"])
+        if entries:
+            sessions, movements = self.session_index.add_entries(entries)
+            self.workouts.extend(movements)
+            changed = {movement.session.id: movement.session for movement in movements}
+            changes.extend((session.seq, "session", session) for session in changed.values())
+            self.weight_timeline.add_sessions(sessions)
+            self.daily_summaries.add_sessions(sessions)
+            self.exercise_series.add_entries(entries)
+            self.progression.add_entries(entries)
+            self.workout_columns.add_entries(entries)
+            if "exercise_rollups" in shared:
+                self.exercise_rollups.replay(shared["exercise_rollups"])
+            else:
+                shared["exercise_rollups"] = self.exercise_rollups.add_entries(entries)
+            touched.update(entry["date"] for entry in entries)
+        if logs:
+            self.nutrition_logs.extend(logs)
+            self.weight_timeline.add_logs(logs)
+            self.nutrition_ledger.add_logs(logs)
+            self.daily_summaries.add_logs(logs)
+            if "nutrition_rollups" in shared:
+                self.nutrition_rollups.replay(shared["nutrition_rollups"])
+            else:
+                shared["nutrition_rollups"] = self.nutrition_rollups.add_logs(logs)
+            touched.update(entry["date"] for entry in logs)
+        self.changes.add(changes)
+
+        if len(self.weight_timeline) != weight_readings:
+            touched.add(WEIGHT_TAG)
+        self.fragments.invalidate(touched)
+
+
+class Subsystems:
+    """The app's stateful parts, each started by its first use rather than at import.
+
+    Opening storage replays the journal into the per-user stores, so it is
+    left to the first request or command that reads or writes data; worker
+    spawns and test runs that never do skip it entirely.
+    """
+
+    def __init__(self, config) -> None:
+        self._config = config
+        self._lock = threading.RLock()
+        self._started: Dict[str, object] = {}
+
+    def _start(self, name: str, start: Callable[[], object]):
+        started = self._started.get(name)
+        if started is None:
+            with self._lock:
+                started = self._started.get(name)
+                if started is None:
+                    started = self._started[name] = start()
+        return started
+
+    @property
+    def catalog(self) -> CatalogFile:
+        """The exercise catalog, recompiled when its data file changes (see catalog.py)."""
+        return self._start("catalog", lambda: CatalogFile(self._config["CATALOG_PATH"]))
+
+    @property
+    def jobs(self) -> JobRunner:
+        """Heavy analytics run in worker processes, off the request path (see jobs.py)."""
+        return self._start("jobs", self._start_jobs)
+
+    def _start_jobs(self) -> JobRunner:
+        runner = JobRunner(self._config["JOB_WORKERS"])
+        atexit.register(runner.shutdown)
+        return runner
+
+    @property
+    def storage(self) -> "MemoryStorage | JournalStorage":
+        return self._start("data", self._open_data)[0]
+
+    @property
+    def partitions(self) -> Partitions:
+        """One pair of stores per user, loaded from storage; readers never wait on writers (see concurrency.py)."""
+        return self._start("data", self._open_data)[1]
+
+    def _open_data(self) -> Tuple["MemoryStorage | JournalStorage", Partitions]:
+        partitions = Partitions(Stores)
+        backend = open_storage(self._config["STORAGE_BACKEND"], self._config["DATA_DIR"])
+        backend.load(lambda records: _load_records(records, partitions))
+        threading.Thread(target=partitions.settle, name="settle-stores", daemon=True).start()
+        return backend, partitions
+
+
+def _fragment_cache_totals() -> Dict[str, int]:
+    """Fragment cache counters summed over every user's stores, both copies."""
+    totals: Dict[str, int] = defaultdict(int)
+    for _, partition in partitions().items():
+        for copy in partition.copies:
+            for name, value in copy.fragments.stats().items():
+                totals[name] += value
+    return totals
+
 
-# Simple in-memory stores
-WORKOUTS: List[Dict] = []
-NUTRITION_LOGS: List[Dict] = []
+FRAGMENT_CACHE_GAUGES = metrics.Gauges(
+    "muscle_log_fragment_cache", "Fragment cache counters.", "counter", _fragment_cache_totals
+)
 
 
 # --------------------------------------------------------------------------- #
 # Helper utilities
 # --------------------------------------------------------------------------- #
 
-def _has_exercise(body_part_key: str, exercise_name: str) -> bool:
-    exercises = BODY_PARTS.get(body_part_key, {}).get("exercises", [])
-    return exercise_name in exercises
-
-
-def build_sessions() -> List[Dict]:
-    """Collapse movement-level workouts into session-level containers."""
-    sessions_map: Dict[str, Dict] = {}
-    sorted_workouts = sorted(
-        WORKOUTS,
-        key=lambda item: (
-            item["date"],
-            item.get("session_id") or "",
-            item.get("body_part"),
-            item.get("name"),
-        ),
-    )
+def subsystems() -> Subsystems:
+    """The subsystems of the app serving the current request or command, else of the default app."""
+    return (current_app if has_app_context() else default_app()).extensions["muscle_log"]
 
-    for idx, entry in enumerate(sorted_workouts):
-        sid = entry.get("session_id") or f"legacy-{entry['date'].strftime('%Y%m%d')}-{idx}"
-        session = sessions_map.setdefault(
-            sid,
-            {
-                "id": sid,
-                "date": entry["date"],
-                "session_note": entry.get("session_note", ""),
-                "body_weight": entry.get("body_weight"),
-                "calories_target": 0.0,
-                "calories_burned": 0.0,
-                "protein_g": 0.0,
-                "fat_g": 0.0,
-                "carb_g": 0.0,
-                "duration_minutes": 0.0,
-                "movements": [],
-                "total_sets": 0,
-                "total_reps": 0,
-            },
-        )
 
-        if not session["movements"]:
-            session["calories_target"] = entry.get("calories_target", 0.0)
-            session["calories_burned"] = entry.get("calories_burned", 0.0)
-            session["protein_g"] = entry.get("protein_g", 0.0)
-            session["fat_g"] = entry.get("fat_g", 0.0)
-            session["carb_g"] = entry.get("carb_g", 0.0)
-            session["duration_minutes"] = entry.get("session_duration_minutes", 0.0)
-            session["body_weight"] = entry.get("body_weight") or session["body_weight"]
+def storage() -> "MemoryStorage | JournalStorage":
+    return subsystems().storage
 
-        movement_total_reps = entry.get("total_reps")
-        if movement_total_reps is None:
-            movement_total_reps = entry.get("sets", 0) * entry.get("reps", 0)
 
-        session["movements"].append(
-            {
-                "body_part": entry["body_part"],
-                "body_part_label": entry["body_part_label"],
-                "name": entry["name"],
-                "weight": entry["weight"],
-                "sets": entry["sets"],
-                "reps": entry["reps"],
-                "total_reps": movement_total_reps,
-                "notes": entry.get("notes", ""),
-            }
-        )
-        session["total_sets"] += entry.get("sets", 0)
-        session["total_reps"] += movement_total_reps
-
-    sessions = list(sessions_map.values())
-    sessions.sort(key=lambda s: (s["date"], s["id"]), reverse=True)
-    return sessions
-
-
-def build_schedule_map(sessions: List[Dict]) -> Dict[str, List[Dict]]:
-    schedule = defaultdict(list)
-    for session in sessions:
-        date_key = session["date"].strftime("%Y-%m-%d")
-        for movement in session["movements"]:
-            payload = {
-                **movement,
-                "session_note": session["session_note"],
-                "session_id": session["id"],
-                "calories_burned": session["calories_burned"],
-                "calories_target": session["calories_target"],
-                "protein_g": session["protein_g"],
-                "fat_g": session["fat_g"],
-                "carb_g": session["carb_g"],
-            }
-            schedule[date_key].append(payload)
-    return schedule
+def partitions() -> Partitions:
+    return subsystems().partitions
+
+
+def catalog() -> Catalog:
+    return subsystems().catalog.current
+
+
+def current_user() -> str:
+    """The user the request acts for, as named by the proxy's user header."""
+    if not has_request_context():
+        return DEFAULT_USER
+    user = request.headers.get(current_app.config["USER_HEADER"], "").strip()
+    if not user:
+        return DEFAULT_USER
+    if not USER_PATTERN.fullmatch(user):
+        abort(400, description="Malformed user name.")
+    return user
+
+
+def stores() -> Stores:
+    """The copy of the current user's stores this request reads.
+
+    The copy is pinned on first use and released when the request ends, so a
+    page never mixes data from before and after a concurrent write.
+    """
+    if not has_request_context():
+        return partitions().peek(DEFAULT_USER).active
+    if "stores_slot" not in g:
+        g.stores_partition = partitions().peek(current_user())
+        g.stores_slot = g.stores_partition.acquire()
+    return g.stores_partition.copy(g.stores_slot)
+
+
+def _release_stores() -> None:
+    slot = g.pop("stores_slot", None) if has_request_context() else None
+    if slot is not None:
+        g.pop("stores_partition").release(slot)
+
+
+def _records_by_user(records: List[Dict]) -> Dict[str, List[Dict]]:
+    by_user: Dict[str, List[Dict]] = defaultdict(list)
+    for record in records:
+        by_user[record.get("user") or DEFAULT_USER].append(record)
+    return by_user
+
+
+def _apply_records(records: List[Dict]) -> None:
+    """Publish a batch of stored records to readers, in one step per user."""
+    # A writer waits for readers of the old copy, so it must not be one;
+    # reads later in the request pin the copy that includes the write.
+    _release_stores()
+    modified = datetime.now(timezone.utc)
+    for user, batch in _records_by_user(records).items():
+        shared: Dict = {}
+        partitions().get(user).write(lambda current, batch=batch, shared=shared: current.apply(batch, modified, shared))
+
+
+def _load_records(records: List[Dict], target: Optional[Partitions] = None) -> None:
+    """Fold records read at startup into each user's published copy only."""
+    if target is None:
+        target = partitions()
+    modified = datetime.now(timezone.utc)
+    for user, batch in _records_by_user(records).items():
+        shared: Dict = {}
+        target.get(user).load(lambda current, batch=batch, shared=shared: current.apply(batch, modified, shared))
+
+
+def _for_current_user(record: Dict) -> Dict:
+    """Tag ``record`` with the requesting user; the default user's records stay untagged."""
+    return _with_user(record, current_user())
+
 
+def conditional_on_data(per_day: bool = False):
+    """Answer GETs with a 304 while the data and catalog versions (and, with ``per_day``, the date) are unchanged.
 
-def build_sessions_by_date(sessions: List[Dict]) -> Dict[date, List[Dict]]:
-    by_date: Dict[date, List[Dict]] = defaultdict(list)
-    for session in sessions:
-        by_date[session["date"]].append(session)
-    return by_date
+    The ETag is checked before the view runs, so revalidating a page costs
+    no queries or template rendering.
+    """
 
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+            current = stores()
+            exercises = catalog()
+            etag = f"v{current.version}-{exercises.version}"
+            last_modified = max(current.modified, exercises.modified).replace(microsecond=0)
+            if per_day:
+                today = date.today()
+                etag = f"{etag}-{today.isoformat()}"
+                midnight = datetime.combine(today, time.min).astimezone(timezone.utc)
+                last_modified = max(last_modified, midnight)
 
-def build_nutrition_by_date() -> Dict[date, List[Dict]]:
-    by_date: Dict[date, List[Dict]] = defaultdict(list)
-    for entry in NUTRITION_LOGS:
-        by_date[entry["date"]].append(entry)
-    return by_date
+            if request.if_none_match:
+                fresh = request.if_none_match.contains(etag)
+            else:
+                fresh = request.if_modified_since is not None and last_modified <= request.if_modified_since
+            response = Response(status=304) if fresh else current_app.make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.vary.add(current_app.config["USER_HEADER"])
+                response.set_etag(etag)
+                response.last_modified = last_modified
+                response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def record_workouts(entries: List[Dict]) -> None:
+    """Durably store one session's movement entries."""
+    storage().append([_for_current_user({"kind": "workouts", "entries": entries})], _apply_records)
+
+
+def record_nutrition(entry: Dict) -> None:
+    storage().append([_for_current_user({"kind": "nutrition", "entry": entry})], _apply_records)
+
+
+@timed("build_schedule_map")
+def build_schedule_map(start: date, end: date) -> Dict[str, List[Dict]]:
+    current = stores()
+
+    def compute() -> Dict[str, List[Dict]]:
+        schedule = current.session_index.schedule_range(start, end)
+        count_scanned("schedule_movements", sum(len(items) for items in schedule.values()))
+        return schedule
+
+    return current.fragments.get_or_compute(
+        ("schedule", start, end),
+        compute,
+        tags=[start + timedelta(days=offset) for offset in range((end - start).days + 1)],
+    )
 
 
 def get_latest_body_weight(default: float = 70.0) -> float:
-    sessions = build_sessions()
-    for session in sessions:
-        if session.get("body_weight"):
-            return session["body_weight"]
-    for entry in sorted(NUTRITION_LOGS, key=lambda item: item["date"], reverse=True):
-        if entry.get("weight"):
-            return entry["weight"]
-    return default
+    return stores().weight_timeline.latest(default)
+
+
+def get_body_weight_on(day: date, default: float = 70.0) -> float:
+    """The body weight that counts for ``day``: the latest reading on or before it."""
+    return stores().weight_timeline.as_of(day, default)
 
 
 def _baseline_macros(weight: float) -> Dict[str, float]:
-    calories = round(weight * 30.0, 1)
+    calories = round(weight * BASELINE_CALORIES_PER_KG, 1)
     protein = round(weight * 1.6, 1)
     fat = round(weight * 0.8, 1)
     remaining = calories - (protein * 4 + fat * 9)
@@ -223,153 +413,507 @@ def _baseline_macros(weight: float) -> Dict[str, float]:
     }
 
 
-def _sum_nutrition(entries: List[Dict]) -> Dict[str, float]:
-    totals = {"calories": 0.0, "protein": 0.0, "fat": 0.0, "carb": 0.0}
-    for entry in entries:
-        totals["calories"] += entry.get("calories", 0.0)
-        totals["protein"] += entry.get("protein", 0.0)
-        totals["fat"] += entry.get("fat", 0.0)
-        totals["carb"] += entry.get("carb", 0.0)
-    for key in totals:
-        totals[key] = round(totals[key], 1)
-    return totals
-
-
-def get_daily_summary(
-    target_date: date,
-    sessions_by_date: Dict[date, List[Dict]],
-    nutrition_by_date: Dict[date, List[Dict]],
-) -> Dict:
-    sessions_today = sessions_by_date.get(target_date, [])
-    nutrition_today = nutrition_by_date.get(target_date, [])
-
-    if sessions_today:
-        calories_target = sum(session.get("calories_target", 0.0) for session in sessions_today)
-        protein_target = sum(session.get("protein_g", 0.0) for session in sessions_today)
-        fat_target = sum(session.get("fat_g", 0.0) for session in sessions_today)
-        carb_target = sum(session.get("carb_g", 0.0) for session in sessions_today)
-        if calories_target == 0:
-            reference_weight = sessions_today[0].get("body_weight") or get_latest_body_weight()
-            baseline = _baseline_macros(reference_weight)
-            calories_target = baseline["calories"]
-            protein_target = baseline["protein"]
-            fat_target = baseline["fat"]
-            carb_target = baseline["carb"]
-    else:
-        weight = get_latest_body_weight()
-        baseline = _baseline_macros(weight)
-        calories_target = baseline["calories"]
-        protein_target = baseline["protein"]
-        fat_target = baseline["fat"]
-        carb_target = baseline["carb"]
-
-    target = {
-        "calories": round(calories_target, 1),
-        "protein": round(protein_target, 1),
-        "fat": round(fat_target, 1),
-        "carb": round(carb_target, 1),
-    }
+def _target_macros(row: Optional[Dict], weight: float) -> Dict[str, float]:
+    """The day's macro targets: the logged session targets, else the baseline for its weight."""
+    if row and row["session_count"] and row["calories_target"]:
+        return {
+            "calories": round(row["calories_target"], 1),
+            "protein": round(row["protein_g"], 1),
+            "fat": round(row["fat_g"], 1),
+            "carb": round(row["carb_g"], 1),
+        }
+    reference_weight = (row["reference_weight"] if row and row["session_count"] else None) or weight
+    return _baseline_macros(reference_weight)
 
-    consumed = _sum_nutrition(nutrition_today)
 
+def _summary_figures(row: Optional[Dict], weight: float) -> Dict[str, Dict[str, float]]:
+    """Target, consumed and balance macros for one row of the daily summary table."""
+    target = _target_macros(row, weight)
+    consumed = {macro: round(row[macro], 1) if row else 0.0 for macro in MACROS}
     balance = {
         key: round(target[key] - consumed[key], 1)
         for key in target
     }
+    return {"target": target, "consumed": consumed, "balance": balance}
+
 
-    burned = sum(session.get("calories_burned", 0.0) for session in sessions_today)
-    duration = sum(session.get("duration_minutes", 0.0) for session in sessions_today)
+@timed("get_daily_summary")
+def get_daily_summary(target_date: date) -> Dict:
+    current = stores()
+    row = current.daily_summaries.get(target_date)
+    weight = get_body_weight_on(target_date)
 
     return {
         "date": target_date,
-        "target": target,
-        "consumed": consumed,
-        "balance": balance,
-        "sessions": sessions_today,
-        "session_count": len(sessions_today),
-        "calories_burned": round(burned, 1),
-        "duration_minutes": round(duration, 1),
-        "body_weight": get_latest_body_weight(),
+        **_summary_figures(row, weight),
+        "sessions": current.session_index.sessions_by_date().get(target_date, []),
+        "session_count": row["session_count"] if row else 0,
+        "calories_burned": round(row["calories_burned"], 1) if row else 0.0,
+        "duration_minutes": round(row["duration_minutes"], 1) if row else 0.0,
+        "body_weight": weight,
     }
 
 
-def get_recent_intake_series(
-    days: int,
-    sessions_by_date: Dict[date, List[Dict]],
-    nutrition_by_date: Dict[date, List[Dict]],
-) -> List[Dict]:
+def daily_summary(target_date: date) -> Dict:
+    """``get_daily_summary`` for the current data, cached until a write touches the date or a weight."""
+    current = stores()
+    return current.fragments.get_or_compute(
+        ("daily_summary", target_date),
+        lambda: get_daily_summary(target_date),
+        tags=(target_date, WEIGHT_TAG),
+    )
+
+
+@timed("get_recent_intake_series")
+def get_recent_intake_series(days: int) -> List[Dict]:
+    """Calorie target vs intake for the last ``days`` days, read as one window of the summary table."""
     today = date.today()
+    start = today - timedelta(days=days - 1)
+    current = stores()
+    rows = current.daily_summaries.window(start, today)
+    count_scanned("daily_summaries", len(rows))
+    weights = current.weight_timeline
+
     series: List[Dict] = []
-    for offset in range(days - 1, -1, -1):
-        day = today - timedelta(days=offset)
-        summary = get_daily_summary(day, sessions_by_date, nutrition_by_date)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        target = _target_macros(row, weights.as_of(day))["calories"]
+        consumed = round(row["calories"], 1) if row else 0.0
         series.append(
             {
                 "date": day,
-                "calories_target": summary["target"]["calories"],
-                "calories_consumed": summary["consumed"]["calories"],
-                "calories_balance": summary["balance"]["calories"],
+                "calories_target": target,
+                "calories_consumed": consumed,
+                "calories_balance": round(target - consumed, 1),
             }
         )
     return series
 
 
-def get_grouped_workouts() -> Dict[str, Dict[str, List[Dict]]]:
-    """Legacy helper for dashboard timeline grouped by date/body part."""
-    grouped: Dict[str, Dict[str, List[Dict]]] = defaultdict(lambda: defaultdict(list))
-    for entry in sorted(
-        WORKOUTS,
-        key=lambda item: (item["date"], item["body_part_label"], item["name"]),
-    ):
-        date_key = entry["date"].strftime("%Y-%m-%d")
-        grouped[date_key][entry["body_part_label"]].append(entry)
-    return grouped
+def _timeline_cursor(key: Optional[Tuple[date, str]]) -> Optional[str]:
+    return f"{key[0].isoformat()}:{key[1]}" if key else None
 
 
-def parse_date(value: str, default: date) -> date:
+def _parse_timeline_cursor(raw: Optional[str]) -> Optional[Tuple[date, str]]:
+    """The (date, session id) key encoded by ``_timeline_cursor``; ``ValueError`` if malformed."""
+    if not raw:
+        return None
+    day, _, sid = raw.partition(":")
+    if not sid:
+        raise ValueError(raw)
+    return datetime.strptime(day, "%Y-%m-%d").date(), sid
+
+
+@timed("get_timeline_page")
+def get_timeline_page(
+    before: Optional[Tuple[date, str]] = None, days: int = TIMELINE_DAYS_PER_PAGE
+) -> Tuple[List[Tuple[str, Dict[str, List[Movement]]]], Optional[str]]:
+    """One page of the dashboard timeline: training days grouped by body part, and the next cursor.
+
+    The page is read from the session index by key, so its cost depends on
+    the page size rather than on the length of the history.
+    """
+    page, cursor = stores().session_index.day_page(before, days)
+    timeline = []
+    for day, sessions in page:
+        movements = [movement for session in reversed(sessions) for movement in session.movements]
+        count_scanned("timeline_movements", len(movements))
+        grouped: Dict[str, List[Movement]] = defaultdict(list)
+        for movement in sorted(movements, key=lambda item: (item.body_part_label, item.name)):
+            grouped[movement.body_part_label].append(movement)
+        timeline.append((day.strftime("%Y-%m-%d"), grouped))
+    return timeline, _timeline_cursor(cursor)
+
+
+def parse_date(value: str, default: Optional[date]) -> Optional[date]:
     try:
         return datetime.strptime(value, "%Y-%m-%d").date()
     except (ValueError, TypeError):
         return default
 
 
+# --------------------------------------------------------------------------- #
+# Validation shared by the forms and bulk import
+# --------------------------------------------------------------------------- #
+
+class SessionValidationError(ValueError):
+    """A submitted session cannot be stored; the message is shown to the user."""
+
+
+def parse_body_weight(raw) -> float:
+    if not str(raw if raw is not None else "").strip():
+        raise SessionValidationError("Please provide your body weight to estimate energy and macro needs.")
+    try:
+        body_weight = float(raw)
+        if body_weight <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise SessionValidationError("Body weight must be a positive number.")
+    return body_weight
+
+
+def session_energy(body_weight: float, total_sets: int) -> Dict[str, float]:
+    """Session duration, calorie burn and macro targets derived from body weight."""
+    duration_hours = max((total_sets * 3) / 60.0, 0.25)
+    calories_burned = round(body_weight * 6.0 * duration_hours, 1)
+    caloric_surplus = body_weight * 5  # ~300 kcal surplus target
+    calories_target = round(calories_burned + caloric_surplus, 1)
+    protein_g = round(body_weight * 2.0, 1)
+    fat_g = round(body_weight * 0.9, 1)
+    remaining_calories = calories_target - (protein_g * 4 + fat_g * 9)
+    carb_g = round(max(remaining_calories / 4, 0), 1)
+    return {
+        "body_weight": body_weight,
+        "session_duration_minutes": round(duration_hours * 60, 1),
+        "calories_burned": calories_burned,
+        "calories_target": calories_target,
+        "protein_g": protein_g,
+        "fat_g": fat_g,
+        "carb_g": carb_g,
+    }
+
+
+def build_session_entries(
+    workout_date: date,
+    body_weight: float,
+    session_note: str,
+    movements,
+    session_id: Optional[str] = None,
+) -> List[Dict]:
+    """Validate submitted movements and expand them into stored movement entries."""
+    if not isinstance(movements, list) or len(movements) == 0:
+        raise SessionValidationError("Please add at least one movement before saving.")
+
+    exercises = catalog()
+    session_id = session_id or str(uuid4())
+    entries: List[Dict] = []
+    total_sets = 0
+
+    for idx, entry in enumerate(movements, start=1):
+        if not isinstance(entry, dict):
+            raise SessionValidationError(f"Movement #{idx} is missing a body part or exercise.")
+        body_part = str(entry.get("body_part", "")).strip()
+        exercise = str(entry.get("exercise", "")).strip()
+        sets_raw = entry.get("sets", "")
+        reps_raw = entry.get("reps", "")
+        weight_raw = entry.get("weight", "")
+        note = str(entry.get("note", "") or "").strip()
+
+        if not body_part or not exercise:
+            raise SessionValidationError(f"Movement #{idx} is missing a body part or exercise.")
+
+        if not exercises.has_exercise(body_part, exercise):
+            raise SessionValidationError(
+                f"Movement #{idx} references an invalid body part / exercise combination."
+            )
+
+        try:
+            sets_value = int(sets_raw) if str(sets_raw).strip() else 0
+            reps_value = int(reps_raw) if str(reps_raw).strip() else 0
+            weight_value = float(weight_raw) if str(weight_raw).strip() else 0.0
+        except (TypeError, ValueError, OverflowError):
+            # OverflowError: JSON reads numbers like 1e400 as infinity, which int() refuses.
+            raise SessionValidationError(f"Movement #{idx} contains a numeric field with an invalid format.")
+
+        total_sets += sets_value
+        entries.append(
+            {
+                "date": workout_date,
+                "body_part": body_part,
+                "body_part_label": exercises.label(body_part),
+                "name": exercise,
+                "weight": weight_value,
+                "sets": sets_value,
+                "reps": reps_value,
+                "notes": note or session_note,
+                "entry_note": note,
+                "session_note": session_note,
+                "session_id": session_id,
+                "total_reps": sets_value * reps_value,
+            }
+        )
+
+    energy = session_energy(body_weight, total_sets)
+    for stored in entries:
+        stored.update(energy)
+    return entries
+
+
+def _float_or(raw, default: Optional[float]) -> Optional[float]:
+    raw = str(raw if raw is not None else "").strip()
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def build_nutrition_entry(log_date: date, weight="", calories="", protein="", fat="", carb="", notes="") -> Dict:
+    """Nutrition log entry; unreadable numbers fall back to empty values like the form does."""
+    return {
+        "date": log_date,
+        "weight": _float_or(weight, None),
+        "calories": _float_or(calories, 0.0),
+        "protein": _float_or(protein, 0.0),
+        "fat": _float_or(fat, 0.0),
+        "carb": _float_or(carb, 0.0),
+        "notes": str(notes or "").strip(),
+    }
+
+
+def _import_record(row: Dict, user: Optional[str] = None) -> Dict:
+    """Validate one bulk-import row with the same rules as the forms.
+
+    The record goes to ``user``'s stores; without one, to the user named by
+    the row's own ``user`` column (the default user when it is empty).
+    """
+    kind = str(row.get("type") or "").strip()
+    if kind == "invalid":
+        raise ImportRowError(row["error"])
+    if user is None:
+        user = str(row.get("user") or "").strip() or DEFAULT_USER
+        if not USER_PATTERN.fullmatch(user):
+            raise ImportRowError(f"Malformed user name {user!r}.")
+    return _with_user(_import_payload(kind, row), user)
+
+
+def _with_user(record: Dict, user: str) -> Dict:
+    if user != DEFAULT_USER:
+        record["user"] = user
+    return record
+
+
+def _import_payload(kind: str, row: Dict) -> Dict:
+    if kind == "session":
+        workout_date = parse_iso_date(row.get("date"))
+        body_weight = parse_body_weight(row.get("body_weight"))
+        session_note = str(row.get("session_note") or "").strip()
+        return {
+            "kind": "workouts",
+            "entries": build_session_entries(workout_date, body_weight, session_note, row.get("movements")),
+        }
+    if kind == "nutrition":
+        entry = build_nutrition_entry(
+            parse_iso_date(row.get("date")),
+            weight=row.get("body_weight"),
+            calories=row.get("calories"),
+            protein=row.get("protein"),
+            fat=row.get("fat"),
+            carb=row.get("carb"),
+            notes=row.get("notes"),
+        )
+        return {"kind": "nutrition", "entry": entry}
+    raise ImportRowError(f"Unknown row type {kind!r}; expected 'session' or 'nutrition'.")
+
+
+@timed("run_import")
+def run_import(stream: io.TextIOBase, fmt: str, user: Optional[str] = None) -> Dict:
+    """Import rows into ``user``'s stores, or each into its row's ``user`` when ``None``."""
+    report = import_rows(
+        read_rows(stream, fmt),
+        lambda row: _import_record(row, user),
+        lambda records: storage().append(records, _apply_records, compact=False),
+    )
+    if report["sessions"] or report["nutrition"]:
+        storage().maybe_compact(_apply_records)
+    return report
+
+
 # --------------------------------------------------------------------------- #
 # Routes
 # --------------------------------------------------------------------------- #
 
-@app.route("/")
-def home():
-    sessions = build_sessions()
-    sessions_by_date = build_sessions_by_date(sessions)
-    nutrition_by_date = build_nutrition_by_date()
+def _export_session(session: Session) -> Dict:
+    return {
+        "type": "session",
+        "date": session.date.isoformat(),
+        "session": session.id,
+        "body_weight": session.body_weight,
+        "session_note": session.session_note,
+        "movements": [
+            {
+                "body_part": movement.body_part,
+                "exercise": movement.name,
+                "sets": movement.sets,
+                "reps": movement.reps,
+                "weight": movement.weight,
+                "note": movement.note,
+            }
+            for movement in session.movements
+        ],
+    }
+
+
+def _export_nutrition(entry: Dict) -> Dict:
+    return {
+        "type": "nutrition",
+        "date": entry["date"].isoformat(),
+        "body_weight": entry.get("weight"),
+        "calories": entry.get("calories", 0.0),
+        "protein": entry.get("protein", 0.0),
+        "fat": entry.get("fat", 0.0),
+        "carb": entry.get("carb", 0.0),
+        "notes": entry.get("notes", ""),
+    }
+
+
+def _session_change(seq: int, session: Session) -> Dict:
+    """A session as the change feed sends it; clients rebuild calendar payloads from it."""
+    return {
+        "seq": seq,
+        "id": session.id,
+        "date": session.date.isoformat(),
+        "session_note": session.session_note,
+        "body_weight": session.body_weight,
+        "calories_target": session.calories_target,
+        "calories_burned": session.calories_burned,
+        "protein_g": session.protein_g,
+        "fat_g": session.fat_g,
+        "carb_g": session.carb_g,
+        "duration_minutes": session.duration_minutes,
+        "movements": [
+            {
+                "body_part": movement.body_part,
+                "body_part_label": movement.body_part_label,
+                "name": movement.name,
+                "weight": movement.weight,
+                "sets": movement.sets,
+                "reps": movement.reps,
+                "note": movement.note,
+            }
+            for movement in session.movements
+        ],
+    }
+
+
+def _nutrition_change(seq: int, entry: Dict) -> Dict:
+    return {
+        "seq": seq,
+        "date": entry["date"].isoformat(),
+        "weight": entry.get("weight"),
+        "calories": entry.get("calories", 0.0),
+        "protein": entry.get("protein", 0.0),
+        "fat": entry.get("fat", 0.0),
+        "carb": entry.get("carb", 0.0),
+        "notes": entry.get("notes", ""),
+    }
+
+
+def export_rows(
+    start: Optional[date] = None, end: Optional[date] = None, user: str = DEFAULT_USER
+) -> Iterator[Dict]:
+    """``user``'s sessions then nutrition logs in the bulk-import format, newest first.
+
+    Each page is read under its own short pin, so a long export never holds
+    writers back for its whole duration.
+    """
+    # Resolved now: a streamed response iterates the rows after the app context is gone.
+    return _export_pages(partitions().peek(user), start, end)
+
+
+def _export_pages(partition, start: Optional[date], end: Optional[date]) -> Iterator[Dict]:
+    cursor = None
+    while True:
+        with partition.read() as current:
+            sessions, cursor = current.session_index.page(start, end, cursor, EXPORT_PAGE_SIZE)
+            rows = [_export_session(session) for session in sessions]
+        count_scanned("export_sessions", len(rows))
+        yield from rows
+        if cursor is None:
+            break
+    while True:
+        with partition.read() as current:
+            entries, cursor = current.nutrition_ledger.page(start, end, cursor, EXPORT_PAGE_SIZE)
+            rows = [_export_nutrition(entry) for entry in entries]
+        count_scanned("export_nutrition", len(rows))
+        yield from rows
+        if cursor is None:
+            break
+
+
+def refresh_storage():
+    storage().refresh(_apply_records)
+
+
+def refresh_catalog():
+    subsystems().catalog.refresh()
+
 
+def release_stores(exc=None):
+    _release_stores()
+
+
+# Every page and API route, registered on each app ``create_app`` builds.
+bp = Blueprint("muscle_log", __name__)
+
+
+@bp.route("/")
+@conditional_on_data(per_day=True)
+def home():
     today = date.today()
-    summary = get_daily_summary(today, sessions_by_date, nutrition_by_date)
-    recent_sessions = sessions[:4]
-    schedule_map = build_schedule_map(sessions)
-    intake_series = get_recent_intake_series(7, sessions_by_date, nutrition_by_date)
+    summary = daily_summary(today)
+    recent_sessions = stores().session_index.recent(4)
+    trend_days = request.args.get("trend_days", INTAKE_SERIES_WINDOWS[0], type=int)
+    if trend_days not in INTAKE_SERIES_WINDOWS:
+        trend_days = INTAKE_SERIES_WINDOWS[0]
+    intake_series = get_recent_intake_series(trend_days)
 
     return render_template(
         "home.html",
         summary=summary,
         recent_sessions=recent_sessions,
-        schedule_json=json.dumps(schedule_map),
+        latest_session_date=_latest_session_key(),
         intake_series=intake_series,
+        trend_days=trend_days,
+        trend_windows=INTAKE_SERIES_WINDOWS,
     )
 
 
-@app.route("/dashboard")
+@bp.route("/api/intake/series")
+@conditional_on_data(per_day=True)
+def intake_series_api():
+    """Daily calorie target vs intake for the last ``days`` days."""
+    days = request.args.get("days", INTAKE_SERIES_WINDOWS[0], type=int) or INTAKE_SERIES_WINDOWS[0]
+    if not 1 <= days <= max(INTAKE_SERIES_WINDOWS):
+        return jsonify({"error": f"'days' must be between 1 and {max(INTAKE_SERIES_WINDOWS)}."}), 400
+    series = get_recent_intake_series(days)
+    return jsonify([{**item, "date": item["date"].isoformat()} for item in series])
+
+
+@bp.route("/dashboard")
+@conditional_on_data()
 def dashboard():
-    grouped = get_grouped_workouts()
+    timeline, cursor = get_timeline_page()
     return render_template(
         "index.html",
-        grouped_workouts=grouped,
-        has_workouts=bool(WORKOUTS),
-        body_parts=BODY_PARTS,
+        timeline=timeline,
+        next_cursor=cursor,
+        has_workouts=bool(timeline),
+        body_parts=catalog().body_parts,
     )
 
 
-@app.route("/workouts/new", methods=["GET", "POST"])
+@bp.route("/dashboard/timeline")
+@conditional_on_data()
+def dashboard_timeline():
+    """The timeline days after ``cursor``, as HTML for the dashboard's infinite scroll.
+
+    The next page's URL travels in the ``X-Next-Page`` header, absent on the last page.
+    """
+    try:
+        before = _parse_timeline_cursor(request.args.get("cursor"))
+    except ValueError:
+        return jsonify({"error": "Malformed timeline cursor."}), 400
+    timeline, cursor = get_timeline_page(before)
+    response = current_app.make_response(
+        render_template("_timeline_days.html", timeline=timeline, body_parts=catalog().body_parts)
+    )
+    if cursor:
+        response.headers["X-Next-Page"] = url_for(".dashboard_timeline", cursor=cursor)
+    return response
+
+
+@bp.route("/workouts/new", methods=["GET", "POST"])
 def new_workouts():
     if request.method == "POST":
         raw_date = request.form.get("workout_date", "").strip()
@@ -383,255 +927,524 @@ def new_workouts():
             "body_weight": body_weight_raw,
         }
 
-        if not raw_date or not payload_raw:
+        try:
+            if not raw_date or not payload_raw:
+                raise SessionValidationError("Date and at least one movement are required.")
+            workout_date = parse_date(raw_date, default=date.today())
+            body_weight = parse_body_weight(body_weight_raw)
+            try:
+                parsed_payload = json.loads(payload_raw)
+            except json.JSONDecodeError:
+                raise SessionValidationError("The submitted movements could not be read. Try adding them again.")
+            entries_to_store = build_session_entries(workout_date, body_weight, session_note, parsed_payload)
+        except SessionValidationError as exc:
             return render_template(
                 "workouts_new.html",
-                error="Date and at least one movement are required.",
-                body_parts=BODY_PARTS,
+                error=str(exc),
                 form=form_state,
                 form_payload=payload_raw,
             )
 
-        if not body_weight_raw:
-            return render_template(
-                "workouts_new.html",
-                error="Please provide your body weight to estimate energy and macro needs.",
-                body_parts=BODY_PARTS,
-                form=form_state,
-                form_payload=payload_raw,
-            )
+        record_workouts(entries_to_store)
+        return redirect(url_for(".home"))
+
+    return render_template("workouts_new.html", form=None, form_payload="")
+
+
+@bp.route("/api/catalog")
+def catalog_api():
+    """The exercise catalog, pre-encoded per catalog version and revalidated by ETag."""
+    current = catalog()
+    response = Response(current.json, mimetype="application/json")
+    response.set_etag(current.version)
+    response.last_modified = current.modified.replace(microsecond=0)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@bp.route("/api/catalog/complete")
+def catalog_complete():
+    """Exercises matching a typed prefix, for autocomplete."""
+    current = catalog()
+    limit = min(max(request.args.get("limit", 10, type=int) or 10, 1), 50)
+    return jsonify(
+        [
+            {"id": current.exercise_id(name), "name": name, "body_parts": list(current.body_parts_for(name))}
+            for name in current.complete(request.args.get("q", ""), limit)
+        ]
+    )
 
-        workout_date = parse_date(raw_date, default=date.today())
 
-        try:
-            body_weight = float(body_weight_raw)
-            if body_weight <= 0:
-                raise ValueError
-        except ValueError:
-            return render_template(
-                "workouts_new.html",
-                error="Body weight must be a positive number.",
-                body_parts=BODY_PARTS,
-                form=form_state,
-                form_payload=payload_raw,
-            )
+@bp.route("/analytics")
+@conditional_on_data()
+def analytics():
+    return render_template(
+        "analytics.html",
+        body_parts=catalog().body_parts,
+        default_body_part=next(iter(stores().exercise_series.body_parts), ""),
+    )
 
-        try:
-            parsed_payload = json.loads(payload_raw)
-        except json.JSONDecodeError:
-            return render_template(
-                "workouts_new.html",
-                error="The submitted movements could not be read. Try adding them again.",
-                body_parts=BODY_PARTS,
-                form=form_state,
-                form_payload=payload_raw,
-            )
 
-        if not isinstance(parsed_payload, list) or len(parsed_payload) == 0:
-            return render_template(
-                "workouts_new.html",
-                error="Please add at least one movement before saving.",
-                body_parts=BODY_PARTS,
-                form=form_state,
-                form_payload=payload_raw,
-            )
+def _analytics_filters():
+    body_part = request.args.get("body_part", "").strip()
+    current = catalog()
+    exercises = [name for name in request.args.getlist("exercise") if current.has_exercise(body_part, name)]
+    try:
+        weight = float(request.args["weight"]) if request.args.get("weight") else None
+    except ValueError:
+        weight = None
+    return body_part, exercises, weight
+
+
+@bp.route("/api/analytics/series")
+@conditional_on_data()
+def analytics_series():
+    body_part, exercises, weight = _analytics_filters()
+    return jsonify(stores().exercise_series.series(body_part, exercises, weight))
+
+
+@bp.route("/api/analytics/weights")
+@conditional_on_data()
+def analytics_weights():
+    body_part, exercises, _ = _analytics_filters()
+    return jsonify({"weights": stores().exercise_series.weights(body_part, exercises)})
+
+
+@bp.route("/api/analytics/overview")
+@conditional_on_data()
+def analytics_overview():
+    """Bulk training statistics computed over the columnar workout store."""
+    start = parse_date(request.args.get("from"), default=None)
+    end = parse_date(request.args.get("to"), default=None)
+    columns = stores().workout_columns
+    return jsonify(
+        {
+            "volume": columns.exercise_volume(),
+            "estimated_1rm": columns.estimated_1rm(),
+            "weekly_tonnage": [
+                {"week": week.isoformat(), "tonnage": tonnage}
+                for week, tonnage in columns.weekly_tonnage(start, end).items()
+            ],
+            "body_parts": columns.body_part_distribution(),
+        }
+    )
 
-        session_id = str(uuid4())
-        entries_to_store: List[Dict] = []
-        total_sets = 0
-
-        for idx, entry in enumerate(parsed_payload, start=1):
-            body_part = str(entry.get("body_part", "")).strip()
-            exercise = str(entry.get("exercise", "")).strip()
-            sets_raw = entry.get("sets", "")
-            reps_raw = entry.get("reps", "")
-            weight_raw = entry.get("weight", "")
-            note = str(entry.get("note", "") or "").strip()
-
-            if not body_part or not exercise:
-                return render_template(
-                    "workouts_new.html",
-                    error=f"Movement #{idx} is missing a body part or exercise.",
-                    body_parts=BODY_PARTS,
-                    form=form_state,
-                    form_payload=payload_raw,
-                )
-
-            if body_part not in BODY_PARTS or not _has_exercise(body_part, exercise):
-                return render_template(
-                    "workouts_new.html",
-                    error=f"Movement #{idx} references an invalid body part / exercise combination.",
-                    body_parts=BODY_PARTS,
-                    form=form_state,
-                    form_payload=payload_raw,
-                )
 
-            try:
-                sets_value = int(sets_raw) if str(sets_raw).strip() else 0
-                reps_value = int(reps_raw) if str(reps_raw).strip() else 0
-                weight_value = float(weight_raw) if str(weight_raw).strip() else 0.0
-            except (TypeError, ValueError):
-                return render_template(
-                    "workouts_new.html",
-                    error=f"Movement #{idx} contains a numeric field with an invalid format.",
-                    body_parts=BODY_PARTS,
-                    form=form_state,
-                    form_payload=payload_raw,
-                )
-
-            total_sets += sets_value
-            total_reps = sets_value * reps_value
-            notes_combined = note or session_note
-
-            entries_to_store.append(
-                {
-                    "date": workout_date,
-                    "body_part": body_part,
-                    "body_part_label": BODY_PARTS[body_part]["label"],
-                    "name": exercise,
-                    "weight": weight_value,
-                    "sets": sets_value,
-                    "reps": reps_value,
-                    "notes": notes_combined,
-                    "entry_note": note,
-                    "session_note": session_note,
-                    "session_id": session_id,
-                    "total_reps": total_reps,
-                }
-            )
+@bp.route("/api/progression")
+@conditional_on_data()
+def progression_records():
+    """Personal records for every exercise trained, keyed by exercise name."""
+    return jsonify(stores().progression.all_records())
+
+
+@bp.route("/api/progression/<exercise_id>")
+@conditional_on_data()
+def progression_detail(exercise_id: str):
+    """PRs plus the last ``window`` training days and their trend for one exercise."""
+    name = catalog().exercise_name(exercise_id)
+    records = stores().progression.records(name) if name else None
+    if records is None:
+        return jsonify({"error": f"No training recorded for {exercise_id!r}."}), 404
+    window = request.args.get("window", PROGRESSION_WINDOW, type=int) or PROGRESSION_WINDOW
+    window = min(max(window, 2), MAX_PROGRESSION_WINDOW)
+    return jsonify(
+        {
+            "exercise": name,
+            "id": exercise_id,
+            "records": records,
+            **stores().progression.progression(name, window),
+        }
+    )
 
-        duration_hours = max((total_sets * 3) / 60.0, 0.25)
-        calories_burned = round(body_weight * 6.0 * duration_hours, 1)
-        caloric_surplus = body_weight * 5  # ~300 kcal surplus target
-        calories_target = round(calories_burned + caloric_surplus, 1)
-        protein_g = round(body_weight * 2.0, 1)
-        fat_g = round(body_weight * 0.9, 1)
-        remaining_calories = calories_target - (protein_g * 4 + fat_g * 9)
-        carb_g = round(max(remaining_calories / 4, 0), 1)
-
-        for stored in entries_to_store:
-            stored.update(
-                {
-                    "body_weight": body_weight,
-                    "session_duration_minutes": round(duration_hours * 60, 1),
-                    "calories_burned": calories_burned,
-                    "calories_target": calories_target,
-                    "protein_g": protein_g,
-                    "fat_g": fat_g,
-                    "carb_g": carb_g,
-                }
-            )
 
-        WORKOUTS.extend(entries_to_store)
-        return redirect(url_for("home"))
+def _rollup_query(rollups, series: str):
+    """Answer a rollup request for ``series`` from the ``from``/``to``/``max_points``/``resolution`` arguments."""
+    start = parse_date(request.args.get("from"), default=None)
+    end = parse_date(request.args.get("to"), default=None)
+    if start and end and end < start:
+        return jsonify({"error": "'to' must not be before 'from'."}), 400
+    resolution = request.args.get("resolution") or None
+    if resolution is not None and resolution not in RESOLUTIONS:
+        return jsonify({"error": f"Unknown resolution; use one of: {', '.join(RESOLUTIONS)}."}), 400
+    max_points = request.args.get("max_points", ROLLUP_POINTS, type=int) or ROLLUP_POINTS
+    max_points = min(max(max_points, 1), MAX_ROLLUP_POINTS)
+    result = rollups.query(series, start, end, max_points, resolution)
+    count_scanned("rollup_buckets", len(result["labels"]))
+    return jsonify(result)
+
+
+@bp.route("/api/timeseries/exercise/<exercise_id>")
+@conditional_on_data()
+def exercise_timeseries(exercise_id: str):
+    """Top load, best e1RM, volume, sets and reps for one exercise, at a resolution that fits the range.
+
+    The finest of day, week, month and year that keeps the range within
+    ``max_points`` buckets is used unless ``resolution`` names one.
+    """
+    name = catalog().exercise_name(exercise_id)
+    if name is None:
+        return jsonify({"error": f"Unknown exercise {exercise_id!r}."}), 404
+    return _rollup_query(stores().exercise_rollups, name)
+
+
+@bp.route("/api/timeseries/nutrition/<metric>")
+@conditional_on_data()
+def nutrition_timeseries(metric: str):
+    """Intake totals and daily averages for one macro, bucketed like ``exercise_timeseries``."""
+    if metric not in MACROS:
+        return jsonify({"error": f"Unknown metric; use one of: {', '.join(MACROS)}."}), 404
+    return _rollup_query(stores().nutrition_rollups, metric)
+
+
+def _strength_trend_inputs(current: Stores, today: date, weeks: int) -> Tuple:
+    return current.workout_columns.copy(), today.toordinal(), weeks
+
+
+def _body_weight_inputs(current: Stores, today: date, weeks: int) -> Tuple:
+    weights = current.weight_timeline.daily()
+    days = [
+        (
+            day.toordinal(),
+            weights.get(day),
+            row["calories"] or None,
+            row["calories_target"] if row["session_count"] else None,
+        )
+        for day, row in current.daily_summaries.window(date.min, today).items()
+    ]
+    return days, today.toordinal(), weeks, BASELINE_CALORIES_PER_KG
 
-    return render_template("workouts_new.html", body_parts=BODY_PARTS, form=None, form_payload="")
 
+def _muscle_balance_inputs(current: Stores, today: date, weeks: int) -> Tuple:
+    return current.workout_columns.copy(), today.toordinal(), weeks
 
-@app.route("/analytics")
-def analytics():
-    serialized_workouts = [
-        {
-            "date": entry["date"].strftime("%Y-%m-%d"),
-            "body_part": entry["body_part"],
-            "body_part_label": entry["body_part_label"],
-            "name": entry["name"],
-            "weight": entry["weight"],
-            "sets": entry["sets"],
-            "reps": entry["reps"],
-        }
-        for entry in WORKOUTS
-    ]
-    return render_template(
-        "analytics.html",
-        body_parts=BODY_PARTS,
-        workouts_json=json.dumps(serialized_workouts),
+
+# Job kind -> (function run in the job pool, its inputs copied from the stores).
+ANALYTICS_JOBS = {
+    "strength_trends": (trends.strength_trends, _strength_trend_inputs),
+    "body_weight_trend": (trends.body_weight_trend, _body_weight_inputs),
+    "muscle_balance": (trends.muscle_balance, _muscle_balance_inputs),
+}
+
+
+def _job_payload(job) -> Dict:
+    return {**job.to_json(), "url": url_for(".job_status", job_id=job.id)}
+
+
+@bp.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """Start an analytics job, or join the one already running or done for the same data.
+
+    Answers 200 with the result when it is already known, otherwise 202;
+    poll the returned ``url`` until the status is ``done`` or ``failed``.
+    """
+    params = request.get_json(silent=True) or request.form
+    if not isinstance(params, dict):
+        return jsonify({"error": "Send the job parameters as a JSON object or form fields."}), 400
+    kind = params.get("kind", "")
+    if not isinstance(kind, str) or kind not in ANALYTICS_JOBS:
+        return jsonify({"error": f"Unknown job kind; use one of: {', '.join(ANALYTICS_JOBS)}."}), 400
+    try:
+        weeks = int(params.get("weeks") or TREND_WEEKS)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "'weeks' must be a whole number."}), 400
+    weeks = min(max(weeks, 1), MAX_TREND_WEEKS)
+    today = date.today()
+    current = stores()
+    function, inputs = ANALYTICS_JOBS[kind]
+    job = subsystems().jobs.submit(
+        current_user(),
+        kind,
+        {"weeks": weeks, "as_of": today.isoformat()},
+        current.version,
+        function,
+        lambda: inputs(current, today, weeks),
     )
+    payload = _job_payload(job)
+    return jsonify(payload), 200 if payload["status"] == "done" else 202
+
 
+@bp.route("/api/jobs/<job_id>")
+def job_status(job_id: str):
+    job = subsystems().jobs.get(job_id)
+    if job is None or job.owner != current_user():
+        return jsonify({"error": "No such job; it may have expired, so submit it again."}), 404
+    return jsonify(_job_payload(job))
 
-@app.route("/schedule")
+
+@bp.route("/schedule")
+@conditional_on_data()
 def schedule():
-    sessions = build_sessions()
-    calendar_payload = build_schedule_map(sessions)
     return render_template(
         "schedule.html",
-        schedule_json=json.dumps(calendar_payload),
-        body_parts=BODY_PARTS,
+        latest_session_date=_latest_session_key(),
+        body_parts=catalog().body_parts,
     )
 
 
-@app.route("/nutrition", methods=["GET", "POST"])
+def _latest_session_key() -> str:
+    latest = stores().session_index.latest_date()
+    return latest.strftime("%Y-%m-%d") if latest else ""
+
+
+@bp.route("/api/schedule")
+@conditional_on_data(per_day=True)
+def schedule_api():
+    """Calendar entries for the requested window (defaults to the current month)."""
+    today = date.today()
+    start = parse_date(request.args.get("from"), default=today.replace(day=1))
+    month_end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    end = parse_date(request.args.get("to"), default=month_end)
+    if end < start:
+        return jsonify({"error": "'to' must not be before 'from'."}), 400
+    if (end - start).days + 1 > MAX_SCHEDULE_WINDOW_DAYS:
+        return jsonify({"error": f"Windows are limited to {MAX_SCHEDULE_WINDOW_DAYS} days."}), 400
+    return jsonify(build_schedule_map(start, end))
+
+
+@bp.route("/api/changes")
+@conditional_on_data()
+def changes_api():
+    """Sessions and nutrition logs written after the client's ``since`` cursor.
+
+    Clients apply the changes to their local copy and ask again with the
+    returned ``cursor`` while ``more`` is set.  ``reset`` tells them to drop
+    their copy first: their cursor is ahead of this server's data, which must
+    have been replaced, so the feed starts over from the beginning.  ``user``
+    names whose data this is, so a copy kept for one user is never extended
+    with another's changes.
+    """
+    current = stores()
+    since = request.args.get("since", 0, type=int)
+    limit = min(max(request.args.get("limit", CHANGES_PAGE_SIZE, type=int), 1), CHANGES_PAGE_SIZE)
+    reset = not 0 <= since <= current.version
+    changes, cursor, more = current.changes.since(0 if reset else since, limit)
+    count_scanned("changes", len(changes))
+    return jsonify(
+        {
+            "user": current_user(),
+            "version": current.version,
+            "cursor": cursor if more else current.version,
+            "more": more,
+            "reset": reset,
+            "sessions": [_session_change(seq, item) for seq, kind, item in changes if kind == "session"],
+            "nutrition": [_nutrition_change(seq, item) for seq, kind, item in changes if kind == "nutrition"],
+        }
+    )
+
+
+@bp.route("/nutrition", methods=["GET", "POST"])
+@conditional_on_data(per_day=True)
 def nutrition():
     if request.method == "POST":
         raw_date = request.form.get("log_date") or date.today().isoformat()
         log_date = parse_date(raw_date, default=date.today())
 
-        weight_raw = request.form.get("log_weight", "").strip()
-        calories_raw = request.form.get("log_calories", "").strip()
-        protein_raw = request.form.get("log_protein", "").strip()
-        fat_raw = request.form.get("log_fat", "").strip()
-        carb_raw = request.form.get("log_carb", "").strip()
-        notes = request.form.get("log_notes", "").strip()
-
-        try:
-            weight = float(weight_raw) if weight_raw else None
-        except ValueError:
-            weight = None
-        try:
-            calories = float(calories_raw) if calories_raw else 0.0
-        except ValueError:
-            calories = 0.0
-        try:
-            protein = float(protein_raw) if protein_raw else 0.0
-        except ValueError:
-            protein = 0.0
-        try:
-            fat = float(fat_raw) if fat_raw else 0.0
-        except ValueError:
-            fat = 0.0
-        try:
-            carb = float(carb_raw) if carb_raw else 0.0
-        except ValueError:
-            carb = 0.0
-
-        NUTRITION_LOGS.append(
-            {
-                "date": log_date,
-                "weight": weight,
-                "calories": calories,
-                "protein": protein,
-                "fat": fat,
-                "carb": carb,
-                "notes": notes,
-            }
+        record_nutrition(
+            build_nutrition_entry(
+                log_date,
+                weight=request.form.get("log_weight", ""),
+                calories=request.form.get("log_calories", ""),
+                protein=request.form.get("log_protein", ""),
+                fat=request.form.get("log_fat", ""),
+                carb=request.form.get("log_carb", ""),
+                notes=request.form.get("log_notes", ""),
+            )
         )
-        return redirect(url_for("nutrition"))
-
-    logs_sorted = sorted(NUTRITION_LOGS, key=lambda item: item["date"], reverse=True)
-    daily_totals = defaultdict(lambda: {"calories": 0.0, "protein": 0.0, "fat": 0.0, "carb": 0.0, "weight": None})
-    for entry in logs_sorted:
-        key = entry["date"].strftime("%Y-%m-%d")
-        totals = daily_totals[key]
-        totals["calories"] += entry.get("calories", 0.0)
-        totals["protein"] += entry.get("protein", 0.0)
-        totals["fat"] += entry.get("fat", 0.0)
-        totals["carb"] += entry.get("carb", 0.0)
-        totals["weight"] = entry.get("weight") or totals["weight"]
-
-    for totals in daily_totals.values():
-        for macro in ("calories", "protein", "fat", "carb"):
-            totals[macro] = round(totals[macro], 1)
+        return redirect(url_for(".nutrition"))
 
-    daily_history = sorted(daily_totals.items(), key=lambda item: item[0], reverse=True)
+    page = max(request.args.get("page", 1, type=int) or 1, 1)
+    days_page = max(request.args.get("days_page", 1, type=int) or 1, 1)
+    today = date.today()
+    ledger = stores().nutrition_ledger
 
     return render_template(
         "nutrition.html",
-        logs=logs_sorted,
-        daily_history=daily_history,
+        logs=ledger.entries((page - 1) * NUTRITION_ENTRIES_PER_PAGE, NUTRITION_ENTRIES_PER_PAGE),
+        page=page,
+        page_count=_page_count(len(ledger), NUTRITION_ENTRIES_PER_PAGE),
+        daily_history=ledger.daily_history((days_page - 1) * NUTRITION_DAYS_PER_PAGE, NUTRITION_DAYS_PER_PAGE),
+        days_page=days_page,
+        days_page_count=_page_count(ledger.day_count(), NUTRITION_DAYS_PER_PAGE),
+        averages=[(days, ledger.average(days, today)) for days in INTAKE_AVERAGE_WINDOWS],
         latest_weight=get_latest_body_weight(),
         date=date,
     )
 
 
+def _page_count(total: int, per_page: int) -> int:
+    return max((total + per_page - 1) // per_page, 1)
+
+
+@bp.route("/api/import", methods=["POST"])
+def bulk_import():
+    """Stream a JSONL or CSV body (or a ``file`` upload) into the requesting user's stores."""
+    upload = request.files.get("file")
+    if upload is not None:
+        stream = upload.stream
+        fmt = request.args.get("format") or detect_format(upload.filename, upload.content_type)
+    else:
+        stream = io.BufferedReader(request.stream)
+        fmt = request.args.get("format") or detect_format(None, request.content_type)
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unknown import format; use one of: {', '.join(FORMATS)}."}), 400
+    report = run_import(open_text(stream), fmt, current_user())
+    return jsonify(report)
+
+
+@bp.route("/api/export")
+def bulk_export():
+    """Stream the requesting user's history as JSONL or CSV, gzip-encoded when the client accepts it."""
+    fmt = request.args.get("format", "jsonl")
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unknown export format; use one of: {', '.join(FORMATS)}."}), 400
+    start = parse_date(request.args.get("from"), default=None)
+    end = parse_date(request.args.get("to"), default=None)
+    if start and end and end < start:
+        return jsonify({"error": "'to' must not be before 'from'."}), 400
+
+    chunks = write_rows(export_rows(start, end, current_user()), fmt)
+    headers = {
+        "Content-Disposition": f"attachment; filename=muscle-log.{fmt}",
+        "Vary": f"Accept-Encoding, {current_app.config['USER_HEADER']}",
+    }
+    if "gzip" in request.accept_encodings:
+        body = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = (chunk.encode("utf-8") for chunk in chunks)
+    return Response(body, mimetype=EXPORT_MIMETYPES[fmt], headers=headers)
+
+
+@bp.route("/api/cache/stats")
+def cache_stats():
+    """Fragment cache counters, summed over every user's stores."""
+    totals = _fragment_cache_totals()
+    lookups = totals["hits"] + totals["misses"]
+    totals["hit_rate"] = round(totals["hits"] / lookups, 4) if lookups else 0.0
+    return jsonify(totals)
+
+
+@click.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help="Defaults to the file extension.")
+@click.option("--user", help="Import everything for this user instead of each row's own user column.")
+@with_appcontext
+def import_command(path: str, fmt: Optional[str], user: Optional[str]) -> None:
+    """Bulk import sessions and nutrition logs from a JSONL or CSV file."""
+    if user is not None and not USER_PATTERN.fullmatch(user):
+        raise click.BadParameter("Malformed user name.", param_hint="--user")
+    fmt = fmt or detect_format(path)
+    if fmt is None:
+        raise click.UsageError("Cannot tell the format from the file name; pass --format.")
+    with open(path, "rb") as raw, open_text(raw) as handle:
+        report = run_import(handle, fmt, user)
+    click.echo(
+        f"Imported {report['sessions']} sessions ({report['movements']} movements) "
+        f"and {report['nutrition']} nutrition logs; {report['error_count']} rows rejected."
+    )
+    for error in report["errors"]:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
+
+@click.command("export")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help="Defaults to the file extension.")
+@click.option("--from", "start", type=click.DateTime(["%Y-%m-%d"]), help="First date to include.")
+@click.option("--to", "end", type=click.DateTime(["%Y-%m-%d"]), help="Last date to include.")
+@click.option("--user", default=DEFAULT_USER, show_default=True, help="Whose history to export.")
+@with_appcontext
+def export_command(
+    path: str, fmt: Optional[str], start: Optional[datetime], end: Optional[datetime], user: str
+) -> None:
+    """Export sessions and nutrition logs to a JSONL or CSV file (gzipped if PATH ends in .gz)."""
+    compressed = path.endswith(".gz")
+    fmt = fmt or detect_format(path[:-3] if compressed else path)
+    if fmt is None:
+        raise click.UsageError("Cannot tell the format from the file name; pass --format.")
+    chunks = write_rows(export_rows(start and start.date(), end and end.date(), user), fmt)
+    with open(path, "wb") as handle:
+        for chunk in gzip_chunks(chunks) if compressed else (chunk.encode("utf-8") for chunk in chunks):
+            handle.write(chunk)
+
+
+@click.command("compile-templates")
+@with_appcontext
+def compile_templates_command() -> None:
+    """Compile every template into the bytecode cache, so no worker compiles one on a request."""
+    env = current_app.jinja_env
+    if env.bytecode_cache is None:
+        raise click.UsageError("No template cache directory is configured; set MUSCLE_LOG_TEMPLATE_CACHE.")
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    click.echo(f"Compiled {len(names)} templates into {current_app.config['TEMPLATE_CACHE_DIR']}.")
+
+
+# --------------------------------------------------------------------------- #
+# Application factory
+# --------------------------------------------------------------------------- #
+
+def create_app(config: Optional[Dict] = None) -> Flask:
+    """Build an app; ``config`` overrides the settings read from the environment.
+
+    Nothing is loaded here: storage, the per-user stores, the catalog and
+    the job pool start on first use (see ``Subsystems``).  Compiled
+    templates persist in ``TEMPLATE_CACHE_DIR``, so a fresh worker loads
+    bytecode instead of recompiling every template on its first requests.
+    """
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = "dev-secret"
+    app.config["STORAGE_BACKEND"] = os.environ.get("MUSCLE_LOG_STORAGE", "journal")
+    app.config["DATA_DIR"] = os.environ.get("MUSCLE_LOG_DATA_DIR", os.path.join(app.instance_path, "data"))
+    app.config["PROFILE_DIR"] = os.environ.get("MUSCLE_LOG_PROFILE_DIR")
+    app.config["CATALOG_PATH"] = os.environ.get("MUSCLE_LOG_CATALOG", DEFAULT_CATALOG_PATH)
+    # Set by the authenticating proxy in front of the app; requests without it act for DEFAULT_USER.
+    app.config["USER_HEADER"] = os.environ.get("MUSCLE_LOG_USER_HEADER", "X-Muscle-Log-User")
+    app.config["JOB_WORKERS"] = int(os.environ.get("MUSCLE_LOG_JOB_WORKERS", "2"))
+    # Empty disables the bytecode cache.
+    app.config["TEMPLATE_CACHE_DIR"] = os.environ.get(
+        "MUSCLE_LOG_TEMPLATE_CACHE", os.path.join(app.instance_path, "templates")
+    )
+    app.config.update(config or {})
+
+    if app.config["TEMPLATE_CACHE_DIR"]:
+        os.makedirs(app.config["TEMPLATE_CACHE_DIR"], exist_ok=True)
+        app.jinja_options = {
+            **app.jinja_options,
+            "bytecode_cache": FileSystemBytecodeCache(app.config["TEMPLATE_CACHE_DIR"]),
+        }
+    app.extensions["muscle_log"] = Subsystems(app.config)
+
+    metrics.init_app(app, profile_dir=app.config["PROFILE_DIR"], gauges=[FRAGMENT_CACHE_GAUGES])
+    app.before_request(refresh_storage)
+    app.before_request(refresh_catalog)
+    app.teardown_request(release_stores)
+    app.register_blueprint(bp)
+    for command in (import_command, export_command, compile_templates_command):
+        app.cli.add_command(command)
+    return app
+
+
+_default_app: Optional[Flask] = None
+_default_app_lock = threading.Lock()
+
+
+def default_app() -> Flask:
+    """The app served as ``app:app``, built on first access."""
+    global _default_app
+    if _default_app is None:
+        with _default_app_lock:
+            if _default_app is None:
+                _default_app = create_app()
+    return _default_app
+
+
+def __getattr__(name: str):
+    # ``app.app`` (WSGI servers, ``flask --app app``) builds the default app when first looked up.
+    if name == "app":
+        return default_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
-    app.run(debug=True, port=5050)
+    default_app().run(debug=True, port=5050)
@@ -0,0 +1,92 @@
+"""Compare the columnar analytics kernels against plain loops over movement dicts.
+
+Usage::
+
+    python -m benchmarks.bench_columnar --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+os.environ.setdefault("MUSCLE_LOG_STORAGE", "memory")
+
+import columnar  # noqa: E402
+from benchmarks.bench_storage import generate_sessions  # noqa: E402
+from columnar import ColumnarWorkouts, epley_1rm  # noqa: E402
+
+
+def dict_volume(rows):
+    totals = defaultdict(float)
+    for entry in rows:
+        totals[entry["name"]] += entry["weight"] * entry["sets"] * entry["reps"]
+    return {name: round(total, 1) for name, total in totals.items()}
+
+
+def dict_1rm(rows):
+    best = defaultdict(float)
+    for entry in rows:
+        best[entry["name"]] = max(best[entry["name"]], epley_1rm(entry["weight"], entry["reps"]))
+    return {name: round(value, 1) for name, value in best.items()}
+
+
+def dict_weekly(rows):
+    totals = defaultdict(float)
+    for entry in rows:
+        day = entry["date"]
+        totals[day.toordinal() - day.weekday()] += entry["weight"] * entry["sets"] * entry["reps"]
+    return totals
+
+
+def dict_distribution(rows):
+    counts = defaultdict(int)
+    for entry in rows:
+        counts[entry["body_part"]] += entry["sets"]
+    return counts
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args(argv)
+
+    numpy_module = columnar.np
+    print(f"numpy: {'available' if numpy_module is not None else 'not installed'}")
+    print(f"{'movements':>10} {'kernel':<12} {'dict loop':>10} {'columns':>10} {'numpy':>10}")
+    for size in args.sizes:
+        rows = [entry for record in generate_sessions(size) for entry in record["entries"]]
+        columns = ColumnarWorkouts()
+        columns.add_entries(rows)
+        assert columns.exercise_volume() == dict_volume(rows)
+        kernels = [
+            ("volume", dict_volume, columns.exercise_volume),
+            ("e1rm", dict_1rm, columns.estimated_1rm),
+            ("weekly", dict_weekly, columns.weekly_tonnage),
+            ("body parts", dict_distribution, columns.body_part_distribution),
+        ]
+        for name, baseline, kernel in kernels:
+            loop_seconds = timed(lambda baseline=baseline, rows=rows: baseline(rows))
+            columnar.np = None
+            fallback_seconds = timed(kernel)
+            columnar.np = numpy_module
+            vector_seconds = timed(kernel) if numpy_module is not None else float("nan")
+            print(
+                f"{len(rows):>10,} {name:<12} {loop_seconds * 1e3:>8.1f}ms "
+                f"{fallback_seconds * 1e3:>8.1f}ms {vector_seconds * 1e3:>8.1f}ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
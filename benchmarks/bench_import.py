@@ -0,0 +1,77 @@
+"""Measure bulk import throughput, in rows per second, on each storage backend.
+
+Each run imports the same ``benchmarks.synthetic`` history, as JSONL, into
+a fresh app through ``app.run_import``: parsing, validation, the journal
+write and the compaction that follows it, and applying every batch to both
+copies of the user's stores.  The run fails if the best run of any backend
+imports fewer than ``--target`` rows per second.
+
+Usage::
+
+    python -m benchmarks.bench_import --years 5 --runs 5
+    python -m benchmarks.bench_import --backends journal --target 10000
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Dict, List
+
+import app
+from benchmarks.synthetic import generate
+from bulk import write_rows
+
+
+BACKENDS = ("memory", "journal")
+
+
+def import_once(payload: bytes, backend: str) -> Dict:
+    with tempfile.TemporaryDirectory() as data_dir:
+        flask_app = app.create_app({"STORAGE_BACKEND": backend, "DATA_DIR": data_dir, "TEMPLATE_CACHE_DIR": ""})
+        with flask_app.app_context():
+            app.partitions()  # open storage outside the timed part
+            started = time.perf_counter()
+            report = app.run_import(app.open_text(io.BytesIO(payload)), "jsonl")
+            report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--target", type=float, default=20_000, help="rows per second the best run must reach")
+    args = parser.parse_args(argv)
+
+    end = date(2024, 12, 31)
+    payload = "".join(write_rows(generate(args.years, 1, args.seed, end), "jsonl")).encode("utf-8")
+    failed: List[str] = []
+    for backend in args.backends:
+        reports = [import_once(payload, backend) for _ in range(args.runs)]
+        if any(report["errors"] for report in reports):
+            print(f"{backend}: rows were rejected: {reports[0]['errors'][:3]}")
+            return 1
+        rows = reports[0]["rows"]
+        rates = [rows / report["seconds"] for report in reports]
+        best = max(rates)
+        print(
+            f"{backend:<8} {rows:>8,} rows  best {best:>9,.0f} rows/s  "
+            f"median {statistics.median(rates):>9,.0f} rows/s  "
+            f"({reports[0]['sessions']:,} sessions, {reports[0]['nutrition']:,} logs)"
+        )
+        if best < args.target:
+            failed.append(backend)
+    if failed:
+        print(f"below {args.target:,.0f} rows/s: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Measure cold start: import-to-ready time and the latency of the first requests.
+
+Each run starts a fresh interpreter that imports ``app``, builds it with
+``create_app`` and then requests ``--routes`` once each, in order, through
+the test client.  The first request also opens storage, since subsystems
+start lazily.  Runs alternate between an empty template cache (every
+template compiled on first use) and one filled by ``flask compile-templates``.
+
+``--years`` seeds a journal data directory with a synthetic history first,
+so the first request includes loading it; with ``--years 0`` the app runs
+on the memory backend.
+
+Usage::
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --years 3 --routes / /dashboard /analytics
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from typing import Dict, List
+
+from benchmarks.synthetic import generate
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = ("/", "/dashboard", "/analytics", "/schedule", "/nutrition")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+flask_app = app.create_app()
+ready = time.perf_counter()
+client = flask_app.test_client()
+first = {}
+for path in sys.argv[1:]:
+    began = time.perf_counter()
+    response = client.get(path)
+    response.get_data()
+    first[path] = (time.perf_counter() - began) * 1000
+    if response.status_code != 200:
+        raise SystemExit(f"{path} returned {response.status_code}")
+print(json.dumps({"ready_ms": (ready - started) * 1000, "first_request_ms": first}))
+"""
+
+
+def seed(data_dir: str, years: float, seed_value: int) -> int:
+    """Write a synthetic history into a journal data directory; return the row count."""
+    os.environ["MUSCLE_LOG_STORAGE"] = "journal"
+    os.environ["MUSCLE_LOG_DATA_DIR"] = data_dir
+    import app
+
+    flask_app = app.create_app({"TEMPLATE_CACHE_DIR": ""})
+    with flask_app.app_context():
+        records = [app._import_record(row, app.DEFAULT_USER) for row in generate(years, 1, seed_value, date.today())]
+        for offset in range(0, len(records), 1000):
+            app.storage().append(records[offset:offset + 1000], app._apply_records, compact=False)
+        app.storage().compact(app._apply_records)
+    return len(records)
+
+
+def probe(env: Dict[str, str], routes: List[str]) -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *routes], cwd=ROOT, env=env, capture_output=True, text=True, check=False
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip() or f"probe exited with {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compile_templates(env: Dict[str, str]) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "app", "compile-templates"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        check=True,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="interpreters started per template-cache state")
+    parser.add_argument("--years", type=float, default=0.0, help="synthetic history to load at startup")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--routes", nargs="+", default=list(ROUTES))
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="muscle-log-startup-")
+    try:
+        cache_dir = os.path.join(workdir, "templates")
+        env = {**os.environ, "MUSCLE_LOG_TEMPLATE_CACHE": cache_dir, "PYTHONPATH": ROOT}
+        rows = 0
+        if args.years > 0:
+            data_dir = os.path.join(workdir, "data")
+            rows = seed(data_dir, args.years, args.seed)
+            env.update(MUSCLE_LOG_STORAGE="journal", MUSCLE_LOG_DATA_DIR=data_dir)
+        else:
+            env["MUSCLE_LOG_STORAGE"] = "memory"
+
+        samples: Dict[str, List[Dict]] = {"cold": [], "compiled": []}
+        for _ in range(args.runs):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            samples["cold"].append(probe(env, args.routes))
+            compile_templates(env)
+            samples["compiled"].append(probe(env, args.routes))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {}
+    print(f"{'templates':<10}{'ready ms':>10}  " + "".join(f"{path[:14]:>16}" for path in args.routes))
+    for state, runs in samples.items():
+        ready = statistics.median(run["ready_ms"] for run in runs)
+        first = {path: statistics.median(run["first_request_ms"][path] for run in runs) for path in args.routes}
+        results[state] = {"ready_ms": round(ready, 3), "first_request_ms": {k: round(v, 3) for k, v in first.items()}}
+        print(f"{state:<10}{ready:>10.1f}  " + "".join(f"{first[path]:>13.1f} ms" for path in args.routes))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump({"params": vars(args), "rows": rows, "results": results}, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
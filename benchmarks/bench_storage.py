@@ -0,0 +1,91 @@
+"""Measure journal storage startup: snapshot load plus a short journal tail.
+
+Usage::
+
+    python -m benchmarks.bench_storage --movements 300000 --tail 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from uuid import uuid4
+
+os.environ.setdefault("MUSCLE_LOG_STORAGE", "memory")
+
+import app  # noqa: E402
+from storage import JournalStorage  # noqa: E402
+
+
+def generate_sessions(movements: int, per_session: int = 5, seed: int = 7):
+    rng = random.Random(seed)
+    catalog = [(key, data["label"], name) for key, data in app.catalog().body_parts.items() for name in data["exercises"]]
+    start = date.today() - timedelta(days=movements // per_session)
+    for idx in range(movements // per_session):
+        session_id = str(uuid4())
+        entries = []
+        for _ in range(per_session):
+            body_part, label, name = rng.choice(catalog)
+            sets, reps = rng.randint(2, 5), rng.randint(4, 12)
+            entries.append(
+                {
+                    "date": start + timedelta(days=idx),
+                    "body_part": body_part,
+                    "body_part_label": label,
+                    "name": name,
+                    "weight": float(rng.randrange(20, 140, 5)),
+                    "sets": sets,
+                    "reps": reps,
+                    "notes": "",
+                    "entry_note": "",
+                    "session_note": "",
+                    "session_id": session_id,
+                    "total_reps": sets * reps,
+                    "body_weight": 75.0,
+                    "session_duration_minutes": 45.0,
+                    "calories_burned": 337.5,
+                    "calories_target": 712.5,
+                    "protein_g": 150.0,
+                    "fat_g": 67.5,
+                    "carb_g": 0.0,
+                }
+            )
+        yield {"kind": "workouts", "entries": entries}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movements", type=int, default=300_000)
+    parser.add_argument("--tail", type=int, default=2_000, help="sessions left in the journal after compaction")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        records = list(generate_sessions(args.movements))
+        writer = JournalStorage(data_dir, compact_after=max(len(records) - args.tail, 1), fsync=False)
+        writer.load(lambda records: None)
+        started = time.perf_counter()
+        for offset in range(0, len(records), args.batch):
+            writer.append(records[offset:offset + args.batch], lambda records: None)
+        write_seconds = time.perf_counter() - started
+        snapshot_bytes = os.path.getsize(os.path.join(data_dir, "snapshot.json"))
+        del records
+
+        started = time.perf_counter()
+        reader = JournalStorage(data_dir)
+        reader.load(app._load_records)
+        load_seconds = time.perf_counter() - started
+
+    print(f"movements      {len(app.stores().workouts):>12,}")
+    print(f"sessions       {len(app.stores().session_index):>12,}")
+    print(f"snapshot       {snapshot_bytes / 1e6:>11.1f}MB")
+    print(f"write          {write_seconds:>11.2f}s")
+    print(f"startup load   {load_seconds:>11.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Benchmark the data helpers and every page against a synthetic history.
+
+Loads ``benchmarks.synthetic`` rows into an in-memory store, times each
+helper and each GET route (through the Flask test client, without
+conditional headers so pages are fully rebuilt), and writes the results as
+JSON.  With ``--users`` each history goes to its own user's partition and
+the timings are taken as the first of those users.  Pass ``--compare`` an earlier results file to print the change per
+benchmark and fail on regressions beyond ``--threshold``.
+
+Usage::
+
+    python -m benchmarks.bench_suite --years 5 --out benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.bench_suite --years 5 --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+os.environ.setdefault("MUSCLE_LOG_STORAGE", "memory")
+
+import app  # noqa: E402
+from benchmarks.synthetic import generate  # noqa: E402
+
+
+ROUTES = (
+    "/",
+    "/?trend_days=365",
+    "/dashboard",
+    "/analytics",
+    "/schedule",
+    "/nutrition",
+    "/api/schedule",
+    "/api/analytics/overview",
+    "/api/analytics/series?body_part=legs&exercise=Back+Squat&exercise=Leg+Press",
+    "/api/intake/series?days=365",
+    "/api/timeseries/exercise/back-squat?max_points=60",
+    "/api/timeseries/nutrition/calories?resolution=week",
+    "/api/export",
+)
+
+
+def bench_user(users: int) -> str:
+    """The user the timings act as: the first synthetic history."""
+    return "user-0" if users > 1 else app.DEFAULT_USER
+
+
+def load(years: float, users: int, seed: int, end: date) -> Dict[str, int]:
+    started = time.perf_counter()
+    rows = 0
+    batch: List[Dict] = []
+    for row in generate(years, users, seed, end):
+        # Rows carry their user, so each history lands in its own partition.
+        batch.append(app._import_record(row))
+        rows += 1
+        if len(batch) == 1000:
+            app.storage().append(batch, app._apply_records)
+            batch = []
+    if batch:
+        app.storage().append(batch, app._apply_records)
+    current = app.partitions().peek(bench_user(users)).active
+    return {
+        "rows": rows,
+        "partitions": len(app.partitions()),
+        "sessions": len(current.session_index),
+        "movements": len(current.workouts),
+        "nutrition_logs": len(current.nutrition_logs),
+        "load_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    func()  # warm-up: first-call caches are not what we compare
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 3),
+        "runs": repeat,
+    }
+
+
+def user_headers(user: str) -> Dict[str, str]:
+    return {} if user == app.DEFAULT_USER else {app.app.config["USER_HEADER"]: user}
+
+
+def helper_benchmarks(today: date, user: str) -> Dict[str, Callable[[], object]]:
+    month_start = today.replace(day=1)
+    headers = user_headers(user)
+
+    def in_request(func: Callable[[], object]) -> Callable[[], object]:
+        def run():
+            with app.app.test_request_context("/", headers=headers):
+                return func()
+
+        return run
+
+    return {
+        # Kept under the old helper's name so earlier results files still compare.
+        "helper:build_sessions": in_request(lambda: app.stores().session_index.sessions()),
+        "helper:sessions_by_date": in_request(lambda: app.stores().session_index.sessions_by_date()),
+        "helper:get_daily_summary": in_request(lambda: app.get_daily_summary(today)),
+        "helper:get_recent_intake_series[7]": in_request(lambda: app.get_recent_intake_series(7)),
+        "helper:get_recent_intake_series[365]": in_request(lambda: app.get_recent_intake_series(365)),
+        "helper:get_timeline_page": in_request(app.get_timeline_page),
+        "helper:schedule_range[month]": in_request(
+            lambda: app.stores().session_index.schedule_range(month_start, today + timedelta(days=31))
+        ),
+    }
+
+
+def route_benchmarks(user: str) -> Dict[str, Callable[[], object]]:
+    client = app.app.test_client()
+    headers = user_headers(user)
+
+    def get(path: str) -> Callable[[], object]:
+        def run():
+            response = client.get(path, headers=headers)
+            response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+
+        return run
+
+    return {f"route:{path}": get(path) for path in ROUTES}
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print per-benchmark changes in median time; return the regressions."""
+    regressions = []
+    print(f"{'benchmark':<64}{'base ms':>10}{'now ms':>10}{'change':>9}")
+    for name, current in results["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<64}{'-':>10}{current['median_ms']:>10.3f}{'new':>9}")
+            continue
+        change = current["median_ms"] / previous["median_ms"] - 1 if previous["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<64}{previous['median_ms']:>10.3f}{current['median_ms']:>10.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="last day of history (default today)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown, as a fraction")
+    args = parser.parse_args(argv)
+
+    today = date.today()
+    dataset = load(args.years, args.users, args.seed, args.end or today)
+    user = bench_user(args.users)
+    benchmarks = {**helper_benchmarks(today, user), **route_benchmarks(user)}
+    results = {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": _numpy_version(),
+            "params": {"years": args.years, "users": args.users, "seed": args.seed, "repeat": args.repeat},
+            "dataset": dataset,
+        },
+        "results": {name: measure(func, args.repeat) for name, func in benchmarks.items()},
+    }
+
+    for name, timing in results["results"].items():
+        print(f"{name:<64}{timing['median_ms']:>10.3f} ms  (p95 {timing['p95_ms']:.3f})")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than the {args.threshold:.0%} threshold", file=sys.stderr)
+            return 1
+    return 0
+
+
+def _numpy_version() -> str:
+    try:
+        import numpy
+    except ImportError:
+        return "not installed"
+    return numpy.__version__
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Per-request latency as the number of users grows.
+
+Loads synthetic histories for more and more users into an in-memory store
+(each user in their own partition) and, at every step, times the main
+routes for a random sample of users through the Flask test client, acting
+as each user with the user header.  With per-user partitions the medians
+should stay flat however many users share the deployment; the run fails if
+the median of any route at the largest step exceeds the smallest step's by
+more than ``--threshold``.
+
+Usage::
+
+    python -m benchmarks.bench_users --steps 1 100 1000 10000 --days 28
+    python -m benchmarks.bench_users --steps 10 1000 30000 --out users.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+os.environ.setdefault("MUSCLE_LOG_STORAGE", "memory")
+
+import app  # noqa: E402
+from benchmarks.synthetic import user_history  # noqa: E402
+from catalog import load_catalog  # noqa: E402
+
+
+ROUTES = (
+    "/",
+    "/nutrition",
+    "/api/schedule",
+    "/api/changes",
+    "/api/analytics/overview",
+    "/api/analytics/series?body_part=legs&exercise=Back+Squat&exercise=Leg+Press",
+)
+
+
+def histories(first: int, last: int, days: int, seed: int, end: date) -> Iterator[Dict]:
+    """Rows for users ``first``..``last - 1``, seeded per user like ``synthetic.generate``."""
+    body_parts = load_catalog().body_parts
+    start = end - timedelta(days=days - 1)
+    for user in range(first, last):
+        rng = random.Random(seed * 1_000_003 + user)
+        yield from user_history(rng, start, days, f"user-{user}", body_parts)
+
+
+def load(first: int, last: int, days: int, seed: int, end: date) -> int:
+    rows = 0
+    batch: List[Dict] = []
+    for row in histories(first, last, days, seed, end):
+        batch.append(app._import_record(row))
+        rows += 1
+        if len(batch) == 1000:
+            app.storage().append(batch, app._apply_records)
+            batch = []
+    if batch:
+        app.storage().append(batch, app._apply_records)
+    return rows
+
+
+def measure(users: int, samples: int, rng: random.Random) -> Dict[str, Dict[str, float]]:
+    """Route timings over ``samples`` requests per route, each as a random user."""
+    client = app.app.test_client()
+    header = app.app.config["USER_HEADER"]
+    results = {}
+    for path in ROUTES:
+        timings = []
+        for index in range(samples + 1):
+            headers = {header: f"user-{rng.randrange(users)}"}
+            started = time.perf_counter()
+            response = client.get(path, headers=headers)
+            response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+            if index:  # the first request only warms up
+                timings.append(elapsed)
+        timings.sort()
+        results[path] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 3),
+        }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[1, 100, 1000, 10000], help="user counts to measure at")
+    parser.add_argument("--days", type=int, default=28, help="days of history per user")
+    parser.add_argument("--samples", type=int, default=200, help="requests per route and step")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed median growth, as a fraction")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    end = date.today()
+    rng = random.Random(args.seed)
+    steps = sorted(set(args.steps))
+    results = {}
+    loaded = 0
+    print(f"{'users':>8}{'rows':>10}{'load s':>9}  " + "".join(f"{path[:22]:>24}" for path in ROUTES))
+    for users in steps:
+        started = time.perf_counter()
+        rows = load(loaded, users, args.days, args.seed, end)
+        load_seconds = time.perf_counter() - started
+        loaded = users
+        gc.collect()  # settle the collector after the load, not inside the timings
+        timings = measure(users, args.samples, rng)
+        results[users] = {"rows": rows, "partitions": len(app.partitions()), "routes": timings}
+        cells = "".join(f"{timings[path]['median_ms']:>21.3f} ms" for path in ROUTES)
+        print(f"{users:>8}{rows:>10}{load_seconds:>9.1f}  {cells}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump({"params": vars(args), "results": results}, handle, indent=2)
+
+    smallest, largest = results[steps[0]]["routes"], results[steps[-1]]["routes"]
+    growing = [
+        path
+        for path in ROUTES
+        if largest[path]["median_ms"] > smallest[path]["median_ms"] * (1 + args.threshold)
+    ]
+    for path in growing:
+        print(
+            f"{path}: median grew from {smallest[path]['median_ms']:.3f} ms to {largest[path]['median_ms']:.3f} ms",
+            file=sys.stderr,
+        )
+    return 1 if growing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""Drive a running app with a mix of concurrent reads and writes.
+
+Starts the app in a subprocess (``flask run``, memory backend unless
+``--data-dir`` is given), optionally seeds it with a synthetic history
+through ``/api/import``, then lets ``--users`` virtual users loop over a
+weighted mix of page reads, session submissions and nutrition posts for
+``--seconds``.  Reports throughput and p50/p95/p99 latency per route and
+exits non-zero when a route's p95 exceeds its budget or requests fail.
+
+Point ``--url`` at an already running server to load-test that instead.
+
+Usage::
+
+    python -m benchmarks.load_test --users 16 --seconds 30 --seed-years 2
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --budget home=50
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.synthetic import generate
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (weight, method, path); paths are fixed so results stay comparable.
+MIX: Dict[str, Tuple[int, str, str]] = {
+    "home": (25, "GET", "/"),
+    "schedule": (10, "GET", "/schedule"),
+    "api_schedule": (10, "GET", "/api/schedule"),
+    "analytics": (5, "GET", "/analytics"),
+    "api_overview": (10, "GET", "/api/analytics/overview"),
+    "api_series": (10, "GET", "/api/analytics/series?body_part=legs&exercise=Back+Squat"),
+    "nutrition": (10, "GET", "/nutrition"),
+    "intake_series": (5, "GET", "/api/intake/series?days=30"),
+    "post_session": (8, "POST", "/workouts/new"),
+    "post_nutrition": (7, "POST", "/nutrition"),
+}
+
+# Default p95 budgets in milliseconds; override with --budget NAME=MS.
+BUDGETS_MS: Dict[str, float] = {
+    "home": 50,
+    "schedule": 50,
+    "api_schedule": 50,
+    "analytics": 50,
+    "api_overview": 50,
+    "api_series": 50,
+    "nutrition": 75,
+    "intake_series": 50,
+    "post_session": 100,
+    "post_nutrition": 100,
+}
+
+SESSION_MOVEMENTS = (
+    ("legs", "Back Squat"),
+    ("chest", "Barbell Bench Press"),
+    ("back", "Bent Over Row"),
+    ("shoulders", "Overhead Press"),
+    ("arms", "Barbell Curl"),
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, data_dir: Optional[str]) -> subprocess.Popen:
+    env = dict(os.environ)
+    if data_dir:
+        env.update(MUSCLE_LOG_STORAGE="journal", MUSCLE_LOG_DATA_DIR=data_dir)
+    else:
+        env["MUSCLE_LOG_STORAGE"] = "memory"
+    return subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload", "--with-threads"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(host: str, port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=2)
+            connection.request("GET", "/metrics")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on {host}:{port} did not start within {timeout:.0f}s")
+
+
+def seed(host: str, port: int, years: float) -> Dict:
+    body = "".join(json.dumps(row) + "\n" for row in generate(years)).encode("utf-8")
+    connection = http.client.HTTPConnection(host, port, timeout=600)
+    connection.request("POST", "/api/import", body, {"Content-Type": "application/x-ndjson"})
+    response = connection.getresponse()
+    report = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"seeding failed: {response.status} {report}")
+    return report
+
+
+def _form_body(rng: random.Random, name: str) -> str:
+    day = date.today() - timedelta(days=rng.randrange(60))
+    if name == "post_session":
+        payload = [
+            {"body_part": body_part, "exercise": exercise, "sets": 3, "reps": rng.choice((5, 8, 10)),
+             "weight": rng.choice((40, 60, 80, 100))}
+            for body_part, exercise in rng.sample(SESSION_MOVEMENTS, rng.randint(2, 4))
+        ]
+        return urlencode(
+            {
+                "workout_date": day.isoformat(),
+                "body_weight": f"{rng.uniform(70, 80):.1f}",
+                "session_note": "load test",
+                "session_payload": json.dumps(payload),
+            }
+        )
+    return urlencode(
+        {
+            "log_date": day.isoformat(),
+            "log_calories": rng.randint(300, 900),
+            "log_protein": rng.randint(20, 60),
+            "log_fat": rng.randint(10, 40),
+            "log_carb": rng.randint(30, 120),
+            "log_notes": "load test",
+        }
+    )
+
+
+def virtual_user(
+    host: str,
+    port: int,
+    seed_value: int,
+    stop: threading.Event,
+    think: float,
+    revalidate: bool,
+    samples: Dict[str, List[float]],
+    failures: Dict[str, int],
+) -> None:
+    """Loop over ``MIX`` until ``stop``; latencies are appended to ``samples`` (ms)."""
+    rng = random.Random(seed_value)
+    names = list(MIX)
+    weights = [MIX[name][0] for name in names]
+    etags: Dict[str, str] = {}
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    while not stop.is_set():
+        name = rng.choices(names, weights)[0]
+        _, method, path = MIX[name]
+        headers = {}
+        body = None
+        if method == "POST":
+            body = _form_body(rng, name)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif revalidate and path in etags:
+            headers["If-None-Match"] = etags[path]
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            failures[name] = failures.get(name, 0) + 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        expected = (302,) if method == "POST" else (200, 304)
+        if response.status not in expected:
+            failures[name] = failures.get(name, 0) + 1
+        else:
+            samples.setdefault(name, []).append(elapsed)
+            if response.getheader("ETag"):
+                etags[path] = response.getheader("ETag")
+        if response.will_close:
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+        if think:
+            stop.wait(rng.expovariate(1 / think))
+    connection.close()
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(samples: Dict[str, List[float]], failures: Dict[str, int], elapsed: float, budgets: Dict[str, float]) -> List[str]:
+    """Print per-route figures and return the routes over budget or failing."""
+    problems = []
+    print(f"{'route':<16}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'budget':>9}{'errors':>8}")
+    total = 0
+    for name in MIX:
+        ordered = sorted(samples.get(name, ()))
+        errors = failures.get(name, 0)
+        total += len(ordered)
+        budget = budgets.get(name)
+        if not ordered:
+            print(f"{name:<16}{0:>10}{'-':>9}{'-':>9}{'-':>9}{'-':>9}{budget or '-':>9}{errors:>8}")
+            if errors:
+                problems.append(f"{name}: {errors} failed requests")
+            continue
+        p50, p95, p99 = (percentile(ordered, fraction) for fraction in (0.5, 0.95, 0.99))
+        flag = ""
+        if budget is not None and p95 > budget:
+            problems.append(f"{name}: p95 {p95:.1f} ms over the {budget:g} ms budget")
+            flag = "  OVER"
+        if errors:
+            problems.append(f"{name}: {errors} failed requests")
+        print(
+            f"{name:<16}{len(ordered):>10}{len(ordered) / elapsed:>9.1f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}"
+            f"{budget if budget is not None else '-':>9}{errors:>8}{flag}"
+        )
+    print(f"total {total:,} requests in {elapsed:.1f}s ({total / elapsed:,.1f} req/s)")
+    return problems
+
+
+def _budget(text: str) -> Tuple[str, float]:
+    name, _, value = text.partition("=")
+    if name not in MIX or not value:
+        raise argparse.ArgumentTypeError(f"expected NAME=MS with NAME one of: {', '.join(MIX)}")
+    return name, float(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between requests, in seconds")
+    parser.add_argument("--seed-years", type=float, default=1.0, help="years of synthetic history to import first (0 for none)")
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match like a browser with a warm cache")
+    parser.add_argument("--url", help="test this running server instead of starting one")
+    parser.add_argument("--data-dir", help="run the started server on the journal backend in this directory")
+    parser.add_argument("--budget", type=_budget, action="append", default=[], help="p95 budget NAME=MS (repeatable)")
+    args = parser.parse_args(argv)
+
+    budgets = {**BUDGETS_MS, **dict(args.budget)}
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", _free_port()
+        server = start_server(port, args.data_dir)
+    try:
+        wait_ready(host, port)
+        if args.seed_years:
+            imported = seed(host, port, args.seed_years)
+            print(f"seeded {imported['rows']:,} rows ({imported['sessions']:,} sessions, {imported['nutrition']:,} logs)")
+
+        stop = threading.Event()
+        per_user = [({}, {}) for _ in range(args.users)]
+        threads = [
+            threading.Thread(
+                target=virtual_user,
+                args=(host, port, index, stop, args.think, args.revalidate, samples, failures),
+            )
+            for index, (samples, failures) in enumerate(per_user)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        stop.wait(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    samples: Dict[str, List[float]] = {}
+    failures: Dict[str, int] = {}
+    for user_samples, user_failures in per_user:
+        for name, values in user_samples.items():
+            samples.setdefault(name, []).extend(values)
+        for name, count in user_failures.items():
+            failures[name] = failures.get(name, 0) + count
+
+    problems = report(samples, failures, elapsed, budgets)
+    if problems:
+        for problem in problems:
+            print(f"FAILED: {problem}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Hammer the in-memory stores from parallel writers and readers.
+
+Writers store sessions of exactly ``--movements`` movements plus nutrition
+logs; readers check, on every pass, that what they see is consistent: whole
+sessions only, every index agreeing on the number of movements and logs,
+and counts that never go backwards.  Prints throughput and exits non-zero on
+the first inconsistency.
+
+Usage::
+
+    python -m benchmarks.stress_concurrency --writers 4 --readers 8 --seconds 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("MUSCLE_LOG_STORAGE", "memory")
+
+import app  # noqa: E402
+
+
+SETS, REPS, CALORIES = 3, 5, 500.0
+
+
+def writer(stop: threading.Event, seed: int, movements: int, counter: list, errors: list) -> None:
+    rng = random.Random(seed)
+    catalog = [(key, name) for key, data in app.catalog().body_parts.items() for name in data["exercises"]]
+    while not stop.is_set():
+        day = date.today() - timedelta(days=rng.randrange(365))
+        try:
+            if rng.random() < 0.25:
+                app.record_nutrition(app.build_nutrition_entry(day, calories=CALORIES))
+            else:
+                payload = [
+                    {"body_part": body_part, "exercise": name, "sets": SETS, "reps": REPS, "weight": 40}
+                    for body_part, name in rng.sample(catalog, movements)
+                ]
+                app.record_workouts(app.build_session_entries(day, 75.0, "", payload))
+        except Exception as exc:  # report the first failure from any thread
+            errors.append(exc)
+            stop.set()
+            return
+        counter[0] += 1
+
+
+def check(stores: "app.Stores", movements: int, seen: list) -> None:
+    sessions = stores.session_index.sessions()
+    for session in sessions:
+        if len(session.movements) != movements or session.total_sets != movements * SETS:
+            raise AssertionError(f"torn session {session.id}: {len(session.movements)} movements")
+    counts = (
+        len(stores.workouts),
+        len(sessions) * movements,
+        len(stores.workout_columns),
+        sum(len(day) for day in stores.session_index.sessions_by_date().values()) * movements,
+    )
+    if len(set(counts)) != 1:
+        raise AssertionError(f"movement counts disagree: {counts}")
+    ledger = stores.nutrition_ledger
+    if len(ledger) != len(stores.nutrition_logs):
+        raise AssertionError(f"ledger has {len(ledger)} logs, store has {len(stores.nutrition_logs)}")
+    total = ledger.range_totals(date.min, date.max)["calories"] if len(ledger) else 0.0
+    if abs(total - CALORIES * len(ledger)) > 1e-6:
+        raise AssertionError(f"ledger totals {total} for {len(ledger)} logs")
+    if counts[0] < seen[0] or len(ledger) < seen[1]:
+        raise AssertionError("counts went backwards")
+    seen[:] = [counts[0], len(ledger)]
+
+
+def reader(stop: threading.Event, movements: int, counter: list, errors: list) -> None:
+    client = app.app.test_client()
+    seen = [0, 0]
+    paths = ["/", "/nutrition", "/api/schedule", "/api/analytics/overview"]
+    while not stop.is_set():
+        try:
+            with app.partitions().get(app.DEFAULT_USER).read() as stores:
+                check(stores, movements, seen)
+            response = client.get(paths[counter[0] % len(paths)])
+            if response.status_code != 200:
+                raise AssertionError(f"{response.request.path} returned {response.status_code}")
+        except Exception as exc:  # report the first failure from any thread
+            errors.append(exc)
+            stop.set()
+            return
+        counter[0] += 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--movements", type=int, default=4, help="movements per session")
+    args = parser.parse_args(argv)
+
+    stop = threading.Event()
+    errors: list = []
+    write_counts = [[0] for _ in range(args.writers)]
+    read_counts = [[0] for _ in range(args.readers)]
+    threads = [
+        threading.Thread(target=writer, args=(stop, seed, args.movements, write_counts[seed], errors))
+        for seed in range(args.writers)
+    ] + [
+        threading.Thread(target=reader, args=(stop, args.movements, read_counts[idx], errors))
+        for idx in range(args.readers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    stop.wait(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    writes = sum(count[0] for count in write_counts)
+    reads = sum(count[0] for count in read_counts)
+    print(f"writes         {writes:>10,}  ({writes / elapsed:,.0f}/s)")
+    print(f"checked reads  {reads:>10,}  ({reads / elapsed:,.0f}/s)")
+    print(f"sessions       {len(app.stores().session_index):>10,}")
+    if not errors:
+        try:
+            with app.partitions().get(app.DEFAULT_USER).read() as stores:
+                check(stores, args.movements, [0, 0])
+        except AssertionError as exc:
+            errors.append(exc)
+    if errors:
+        print(f"FAILED: {errors[0]}", file=sys.stderr)
+        return 1
+    print("consistent")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
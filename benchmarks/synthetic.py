@@ -0,0 +1,144 @@
+"""Reproducible synthetic training and nutrition histories.
+
+Rows come out in the bulk-import format (see ``bulk``), so they can be fed to
+``app.run_import``, written to a file for ``flask import``, or loaded by the
+benchmarks.  Each user trains a push/pull/legs style split on 3-5 days a
+week, progresses their working weights over time, drifts in body weight and
+logs two to four meals a day.  The same seed always yields the same rows.
+
+Usage::
+
+    python -m benchmarks.synthetic --years 5 --out history.jsonl
+    python -m benchmarks.synthetic --years 1 --users 100 --format csv --out users.csv
+"""
+
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from bulk import FORMATS, write_rows
+from catalog import load_catalog
+
+
+SPLITS = (("chest", "shoulders", "arms"), ("back", "arms"), ("legs",), ("chest", "back"), ("shoulders", "legs"))
+HEAVY_KEYWORDS = ("Deadlift", "Squat", "Leg Press", "Bench Press", "Row")
+BODYWEIGHT_EXERCISES = {"Push-up", "Pull-up", "Bench Dip"}
+MEALS = ("Breakfast", "Lunch", "Dinner", "Snack")
+
+
+def _starting_load(rng: random.Random, name: str) -> float:
+    if name in BODYWEIGHT_EXERCISES:
+        return 0.0
+    load = rng.uniform(12, 45)
+    if any(keyword in name for keyword in HEAVY_KEYWORDS):
+        load *= 2.2
+    return load
+
+
+def _round_load(load: float) -> float:
+    return round(load / 2.5) * 2.5
+
+
+def user_history(
+    rng: random.Random, start: date, days: int, user: Optional[str] = None, body_parts: Optional[Dict] = None
+) -> Iterator[Dict]:
+    """Rows for one user's ``days`` days starting at ``start``, in date order."""
+    body_parts = body_parts or load_catalog().body_parts
+    loads = {
+        (body_part, name): _starting_load(rng, name)
+        for body_part, data in body_parts.items()
+        for name in data["exercises"]
+    }
+    training_days = set(rng.sample(range(7), rng.randint(3, 5)))
+    body_weight = rng.uniform(58, 95)
+    maintenance = body_weight * rng.uniform(29, 34)
+    split_index = 0
+    extra = {"user": user} if user else {}
+
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        body_weight += rng.gauss(0.0, 0.08)
+        if day.weekday() in training_days and rng.random() > 0.1:
+            movements: List[Dict] = []
+            for body_part in SPLITS[split_index % len(SPLITS)]:
+                for name in rng.sample(body_parts[body_part]["exercises"], rng.randint(2, 3)):
+                    key = (body_part, name)
+                    loads[key] *= 1.0 + rng.uniform(0.0, 0.004)  # slow progressive overload
+                    if rng.random() < 0.02:
+                        loads[key] *= 0.9  # deload week
+                    movements.append(
+                        {
+                            "body_part": body_part,
+                            "exercise": name,
+                            "sets": rng.randint(3, 5),
+                            "reps": rng.choice((5, 6, 8, 8, 10, 12)),
+                            "weight": _round_load(loads[key]),
+                            "note": "PR attempt" if rng.random() < 0.03 else "",
+                        }
+                    )
+            split_index += 1
+            yield {
+                "type": "session",
+                "date": day.isoformat(),
+                "body_weight": round(body_weight, 1),
+                "session_note": rng.choice(("", "", "", "Felt strong", "Short on time", "Gym was busy")),
+                "movements": movements,
+                **extra,
+            }
+
+        target = maintenance * rng.uniform(0.85, 1.15)
+        meals = rng.randint(2, 4)
+        for meal in range(meals):
+            calories = target / meals * rng.uniform(0.7, 1.3)
+            yield {
+                "type": "nutrition",
+                "date": day.isoformat(),
+                "body_weight": round(body_weight, 1) if meal == 0 and rng.random() < 0.5 else None,
+                "calories": round(calories),
+                "protein": round(calories * rng.uniform(0.2, 0.35) / 4),
+                "fat": round(calories * rng.uniform(0.2, 0.35) / 9),
+                "carb": round(calories * rng.uniform(0.35, 0.5) / 4),
+                "notes": MEALS[meal] if meal < len(MEALS) else "",
+                **extra,
+            }
+
+
+def generate(years: float = 1.0, users: int = 1, seed: int = 7, end: Optional[date] = None) -> Iterator[Dict]:
+    """Import-format rows for ``users`` histories of ``years`` years each, ending at ``end``.
+
+    Rows carry a ``user`` key when ``users > 1``, so ``flask import`` puts
+    each history in its own user's stores.
+    """
+    end = end or date.today()
+    days = max(int(years * 365), 1)
+    start = end - timedelta(days=days - 1)
+    body_parts = load_catalog().body_parts
+    for user in range(users):
+        rng = random.Random(seed * 1_000_003 + user)
+        yield from user_history(rng, start, days, f"user-{user}" if users > 1 else None, body_parts)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="last day of history (default today)")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--out", help="defaults to stdout")
+    args = parser.parse_args(argv)
+
+    handle = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        for chunk in write_rows(generate(args.years, args.users, args.seed, args.end), args.format):
+            handle.write(chunk)
+    finally:
+        if args.out:
+            handle.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
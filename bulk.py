@@ -0,0 +1,235 @@
+"""Streaming bulk import and export of workout sessions and nutrition logs.
+
+Two input formats are accepted.
+
+JSONL, one object per line::
+
+    {"type": "session", "date": "2024-05-01", "body_weight": 72.5, "session_note": "",
+     "movements": [{"body_part": "legs", "exercise": "Back Squat", "sets": 5, "reps": 5, "weight": 100}]}
+    {"type": "nutrition", "date": "2024-05-01", "body_weight": 72.4, "calories": 2400,
+     "protein": 160, "fat": 70, "carb": 260, "notes": ""}
+
+CSV with a header row, one movement or nutrition log per row::
+
+    type,date,session,body_weight,session_note,body_part,exercise,sets,reps,weight,note,calories,protein,fat,carb,notes
+
+Consecutive ``session`` rows sharing ``date`` and ``session`` (any label the
+source tracker used) form one session.  Either format may add a ``user``
+column naming whose history the row belongs to.
+
+Rows are converted by a caller-supplied function and committed in batches, so
+a file is never held in memory and each batch costs one durable write.
+Exports are written in the same formats, as a stream of text chunks, so an
+export can be imported again as-is.
+"""
+
+import csv
+import io
+import json
+import re
+import zlib
+from datetime import date
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+FORMATS = ("jsonl", "csv")
+MAX_REPORTED_ERRORS = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+SESSION_FIELDS = ("type", "date", "session", "body_weight", "session_note")
+MOVEMENT_FIELDS = ("body_part", "exercise", "sets", "reps", "weight", "note")
+NUTRITION_FIELDS = ("calories", "protein", "fat", "carb", "notes")
+CSV_FIELDS = SESSION_FIELDS + MOVEMENT_FIELDS + NUTRITION_FIELDS
+
+# Text streams are read with ``errors="surrogateescape"`` (see ``open_text``), so
+# bytes that are not valid UTF-8 show up as lone surrogates in their line.
+_UNDECODABLE = re.compile("[\udc80-\udcff]")
+UNDECODABLE_ERROR = "Line is not valid UTF-8."
+
+
+class ImportRowError(ValueError):
+    """A row that cannot be imported; reported with its line number."""
+
+
+def parse_iso_date(value) -> date:
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ImportRowError(f"Invalid date {value!r}; expected YYYY-MM-DD.")
+
+
+def detect_format(name: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    name = (name or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "jsonl"
+    return None
+
+
+def open_text(stream: BinaryIO) -> io.TextIOWrapper:
+    """A text view of a binary import stream for ``read_rows``.
+
+    Undecodable bytes do not abort the read: the rows holding them are
+    reported as errors, with their line numbers, like any other bad row.
+    """
+    return io.TextIOWrapper(stream, encoding="utf-8", errors="surrogateescape", newline="")
+
+
+def read_rows(stream: io.TextIOBase, fmt: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield ``(line, row)`` pairs, with CSV movements already grouped into sessions."""
+    if fmt == "jsonl":
+        return _read_jsonl(stream)
+    if fmt == "csv":
+        return _group_csv_sessions(_read_csv(stream))
+    raise ValueError(f"Unsupported import format: {fmt!r}")
+
+
+def _read_jsonl(stream: io.TextIOBase) -> Iterator[Tuple[int, Dict]]:
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        if _UNDECODABLE.search(line):
+            yield line_no, {"type": "invalid", "error": UNDECODABLE_ERROR}
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, {"type": "invalid", "error": f"Invalid JSON: {exc.msg}."}
+            continue
+        if not isinstance(row, dict):
+            row = {"type": "invalid", "error": "Each line must be a JSON object."}
+        yield line_no, row
+
+
+def _read_csv(stream: io.TextIOBase) -> Iterator[Tuple[int, Dict]]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        if any(isinstance(value, str) and _UNDECODABLE.search(value) for value in row.values()):
+            row = {"type": "invalid", "error": UNDECODABLE_ERROR}
+        yield reader.line_num, row
+
+
+def _group_csv_sessions(rows: Iterable[Tuple[int, Dict]]) -> Iterator[Tuple[int, Dict]]:
+    pending: Optional[Dict] = None
+    pending_line = 0
+    for line_no, row in rows:
+        if (row.get("type") or "session").strip() != "session":
+            if pending is not None:
+                yield pending_line, pending
+                pending = None
+            yield line_no, row
+            continue
+
+        key = (row.get("user"), row.get("date"), row.get("session"))
+        if pending is None or pending["_key"] != key:
+            if pending is not None:
+                yield pending_line, pending
+            pending_line = line_no
+            pending = {
+                "_key": key,
+                "type": "session",
+                "date": row.get("date"),
+                "body_weight": row.get("body_weight"),
+                "session_note": row.get("session_note") or "",
+                "movements": [],
+            }
+            if row.get("user"):
+                pending["user"] = row["user"]
+        pending["movements"].append({field: row.get(field, "") for field in MOVEMENT_FIELDS})
+    if pending is not None:
+        yield pending_line, pending
+
+
+def import_rows(
+    rows: Iterable[Tuple[int, Dict]],
+    to_record: Callable[[Dict], Dict],
+    commit: Callable[[List[Dict]], None],
+    batch_size: int = 1000,
+) -> Dict:
+    """Convert rows with ``to_record`` and commit them in groups of ``batch_size``.
+
+    ``to_record`` raises ``ValueError`` for rows that fail validation; those
+    are reported (up to ``MAX_REPORTED_ERRORS``) and the rest still go in.
+    """
+    report = {"rows": 0, "sessions": 0, "movements": 0, "nutrition": 0, "error_count": 0, "errors": []}
+    batch: List[Dict] = []
+
+    def flush() -> None:
+        commit(batch)
+        for record in batch:
+            if record["kind"] == "workouts":
+                report["sessions"] += 1
+                report["movements"] += len(record["entries"])
+            else:
+                report["nutrition"] += 1
+        batch.clear()
+
+    for line_no, row in rows:
+        report["rows"] += 1
+        try:
+            batch.append(to_record(row))
+        except ValueError as exc:
+            report["error_count"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": line_no, "error": str(exc)})
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return report
+
+
+def write_rows(rows: Iterable[Dict], fmt: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Serialize rows in the import format as text chunks of about ``chunk_size`` characters."""
+    if fmt == "jsonl":
+        lines = _jsonl_lines(rows)
+    elif fmt == "csv":
+        lines = _csv_lines(rows)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt!r}")
+
+    buffer: List[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _jsonl_lines(rows: Iterable[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, separators=(",", ":")) + "\n"
+
+
+def _csv_lines(rows: Iterable[Dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        if row["type"] == "session":
+            session = {field: row.get(field) for field in SESSION_FIELDS}
+            for movement in row["movements"]:
+                writer.writerow({**session, **movement})
+        else:
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Encode and gzip-compress text chunks as they are produced."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # +16: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,80 @@
+"""Bounded cache of computed page fragments with tag-based invalidation.
+
+Fragments (a day's summary, a calendar window, ...) are stored with the tags
+they depend on, typically the dates they cover.  A write invalidates only the
+tags it touches, and the least recently used fragments are evicted once
+``max_entries`` is reached.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Set, Tuple
+
+
+class FragmentCache:
+    """LRU cache keyed by fragment, invalidated by tag.
+
+    Lookups may come from several reader threads at once; a fragment is
+    computed outside the lock, so two readers may occasionally compute the
+    same fragment, but the bookkeeping stays consistent.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[object, Tuple[Hashable, ...]]]" = OrderedDict()
+        self._by_tag: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object], tags: Iterable[Hashable] = ()):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        value = compute()
+        tags = tuple(tags)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, tags)
+                for tag in tags:
+                    self._by_tag.setdefault(tag, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, tags: Iterable[Hashable]) -> None:
+        """Drop every fragment carrying one of ``tags``."""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._by_tag.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def _drop(self, key: Hashable) -> None:
+        _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,172 @@
+"""Exercise catalog loaded from ``catalog.json`` and compiled into lookup indexes.
+
+The data file maps body-part keys to a label, a colour and their exercises::
+
+    {"body_parts": {"legs": {"label": "Legs", "color": "#1b4332",
+                             "exercises": ["Back Squat", "Romanian Deadlift", ...]}}}
+
+``compile_catalog`` turns it into an immutable ``Catalog`` with hash indexes
+(valid body-part/exercise pairs, exercise -> body parts, exercise id <->
+name) and a prefix index for autocomplete, so validating a movement is a
+single set lookup.  ``CatalogFile`` keeps the compiled catalog for a path
+and recompiles it when the file changes, without a restart.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogError(ValueError):
+    """The catalog data file is malformed."""
+
+
+def exercise_id(name: str) -> str:
+    """Stable URL-safe id for an exercise name, e.g. ``romanian-deadlift``."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+class Catalog:
+    """One compiled version of the catalog; never modified after construction."""
+
+    def __init__(self, body_parts: Dict[str, Dict], version: str, modified: datetime) -> None:
+        # key -> {"label", "color", "exercises"}: the shape templates and the front-end use.
+        self.body_parts = body_parts
+        self.version = version
+        self.modified = modified
+        self._pairs = frozenset((key, name) for key, data in body_parts.items() for name in data["exercises"])
+        body_parts_for: Dict[str, List[str]] = {}
+        for key, data in body_parts.items():
+            for name in data["exercises"]:
+                body_parts_for.setdefault(name, []).append(key)
+        self._body_parts_for = {name: tuple(keys) for name, keys in body_parts_for.items()}
+        self._ids = {name: exercise_id(name) for name in self._body_parts_for}
+        self._names = {ident: name for name, ident in self._ids.items()}
+        if len(self._names) != len(self._ids):
+            raise CatalogError("Two exercises share the same id; rename one of them.")
+
+        prefixes: Dict[str, List[str]] = {}
+        for name in sorted(self._body_parts_for):
+            words = name.lower().split()
+            starts = {" ".join(words[index:]) for index in range(len(words))}
+            keys = {text[:length] for text in starts for length in range(1, len(text) + 1)}
+            for key in keys:
+                prefixes.setdefault(key, []).append(name)
+        self._prefixes = {key: tuple(names) for key, names in prefixes.items()}
+
+        self.json = json.dumps(
+            {
+                "version": version,
+                "body_parts": body_parts,
+                "exercises": {
+                    self._ids[name]: {"name": name, "body_parts": list(keys)}
+                    for name, keys in self._body_parts_for.items()
+                },
+            },
+            separators=(",", ":"),
+        )
+
+    def label(self, body_part: str) -> Optional[str]:
+        data = self.body_parts.get(body_part)
+        return data["label"] if data else None
+
+    def has_exercise(self, body_part: str, exercise: str) -> bool:
+        return (body_part, exercise) in self._pairs
+
+    def body_parts_for(self, exercise: str) -> Tuple[str, ...]:
+        """Body-part keys listing ``exercise``, in catalog order."""
+        return self._body_parts_for.get(exercise, ())
+
+    def exercise_id(self, name: str) -> Optional[str]:
+        return self._ids.get(name)
+
+    def exercise_name(self, ident: str) -> Optional[str]:
+        return self._names.get(ident)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Exercise names where ``prefix`` starts the name or one of its words, alphabetically."""
+        key = " ".join(prefix.lower().split())
+        return list(self._prefixes.get(key, ())[:limit]) if key else []
+
+
+def compile_catalog(payload: Dict, version: str, modified: datetime) -> Catalog:
+    """Validate a decoded data file and compile it."""
+    raw_parts = payload.get("body_parts") if isinstance(payload, dict) else None
+    if not isinstance(raw_parts, dict) or not raw_parts:
+        raise CatalogError("The catalog needs a non-empty 'body_parts' object.")
+    body_parts: Dict[str, Dict] = {}
+    for key, data in raw_parts.items():
+        if not isinstance(data, dict) or not str(data.get("label") or "").strip():
+            raise CatalogError(f"Body part {key!r} needs a label.")
+        exercises = data.get("exercises")
+        if not isinstance(exercises, list) or not all(isinstance(name, str) and name.strip() for name in exercises):
+            raise CatalogError(f"Body part {key!r} needs a list of exercise names.")
+        names = [name.strip() for name in exercises]
+        if len(set(names)) != len(names):
+            raise CatalogError(f"Body part {key!r} lists an exercise twice.")
+        body_parts[key] = {"label": data["label"].strip(), "color": data.get("color", ""), "exercises": names}
+    return Catalog(body_parts, version, modified)
+
+
+def load_catalog(path: str = DEFAULT_PATH) -> Catalog:
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    modified = datetime.fromtimestamp(os.stat(path).st_mtime, timezone.utc)
+    try:
+        payload = json.loads(raw)
+    except ValueError as exc:
+        raise CatalogError(f"{path} is not valid JSON: {exc}") from None
+    return compile_catalog(payload, hashlib.sha1(raw).hexdigest()[:12], modified)
+
+
+class CatalogFile:
+    """The compiled catalog for ``path``, reloaded when the file changes.
+
+    ``refresh`` looks at the file at most every ``check_interval`` seconds.
+    A change that fails to load is logged and the previous catalog stays in
+    use.  Readers take ``current`` once and keep using that catalog, so a
+    reload never changes the rules half-way through a validation.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, check_interval: float = 1.0) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stamp = self._file_stamp()
+        self._checked = time.monotonic()
+        self.current = load_catalog(path)
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> Catalog:
+        if time.monotonic() - self._checked < self.check_interval:
+            return self.current
+        with self._lock:
+            if time.monotonic() - self._checked < self.check_interval:
+                return self.current
+            self._checked = time.monotonic()
+            stamp = self._file_stamp()
+            if stamp != self._stamp:
+                # Remember the stamp even on failure: retry on the next change, not every check.
+                self._stamp = stamp
+                try:
+                    self.current = load_catalog(self.path)
+                except (OSError, CatalogError) as exc:
+                    logger.warning("Keeping the previous exercise catalog: %s", exc)
+        return self.current
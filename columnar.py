@@ -0,0 +1,168 @@
+"""Column-oriented copy of the workout movements for bulk analytics.
+
+Movements are appended to typed ``array`` columns (date ordinals, body-part
+and exercise codes, weight, sets, reps).  The kernels below aggregate whole
+columns at once: with NumPy installed they run as vectorized operations over
+zero-copy views of the arrays, otherwise they fall back to a single tight loop
+over the columns.
+"""
+
+from array import array
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+try:  # NumPy is optional; the kernels work without it, just slower.
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# array typecode -> NumPy kind, combined with the platform item size.
+_NUMPY_KINDS = {"l": "i", "H": "u", "d": "f"}
+
+
+def epley_1rm(weight: float, reps: int) -> float:
+    """Estimated one-rep max (Epley formula)."""
+    return weight * (1 + reps / 30.0) if reps > 0 else 0.0
+
+
+class _Codes:
+    """Interns strings to dense integer codes."""
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def copy(self) -> "_Codes":
+        clone = _Codes()
+        clone.names = list(self.names)
+        clone._codes = dict(self._codes)
+        return clone
+
+
+class ColumnarWorkouts:
+    """Typed columns with one row per movement, in write order."""
+
+    def __init__(self) -> None:
+        self.ordinals = array("l")
+        self.body_parts = array("H")
+        self.exercises = array("H")
+        self.weights = array("d")
+        self.sets = array("l")
+        self.reps = array("l")
+        self.body_part_codes = _Codes()
+        self.exercise_codes = _Codes()
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def copy(self) -> "ColumnarWorkouts":
+        """An independent copy, to hand to another process while writes go on."""
+        clone = ColumnarWorkouts()
+        for name in ("ordinals", "body_parts", "exercises", "weights", "sets", "reps"):
+            setattr(clone, name, array(getattr(self, name).typecode, getattr(self, name)))
+        clone.body_part_codes = self.body_part_codes.copy()
+        clone.exercise_codes = self.exercise_codes.copy()
+        return clone
+
+    def add_entries(self, entries: Iterable[Dict]) -> None:
+        for entry in entries:
+            self.ordinals.append(entry["date"].toordinal())
+            self.body_parts.append(self.body_part_codes.code(entry["body_part"]))
+            self.exercises.append(self.exercise_codes.code(entry["name"]))
+            self.weights.append(entry.get("weight") or 0.0)
+            self.sets.append(entry.get("sets", 0))
+            self.reps.append(entry.get("reps", 0))
+
+    # ------------------------------------------------------------------ #
+    # Kernels
+    # ------------------------------------------------------------------ #
+
+    def _views(self):
+        """Zero-copy NumPy views over the columns.
+
+        The views pin the arrays' buffers, so they must not outlive the kernel
+        that created them (appending to an exported array raises BufferError).
+        """
+        return tuple(
+            np.frombuffer(column, dtype=f"{_NUMPY_KINDS[column.typecode]}{column.itemsize}")
+            for column in (self.ordinals, self.body_parts, self.exercises, self.weights, self.sets, self.reps)
+        )
+
+    def exercise_volume(self) -> Dict[str, float]:
+        """Total tonnage (weight x sets x reps) per exercise."""
+        names = self.exercise_codes.names
+        if np is not None and len(self):
+            _, _, exercises, weights, sets, reps = self._views()
+            totals = np.bincount(exercises, weights=weights * sets * reps, minlength=len(names))
+            return {name: round(float(total), 1) for name, total in zip(names, totals)}
+
+        totals = [0.0] * len(names)
+        for code, weight, set_count, rep_count in zip(self.exercises, self.weights, self.sets, self.reps):
+            totals[code] += weight * set_count * rep_count
+        return {name: round(total, 1) for name, total in zip(names, totals)}
+
+    def estimated_1rm(self) -> Dict[str, float]:
+        """Best Epley estimated one-rep max per exercise."""
+        names = self.exercise_codes.names
+        if np is not None and len(self):
+            _, _, exercises, weights, _, reps = self._views()
+            estimates = np.where(reps > 0, weights * (1 + reps / 30.0), 0.0)
+            best = np.zeros(len(names))
+            np.maximum.at(best, exercises, estimates)
+            return {name: round(float(value), 1) for name, value in zip(names, best)}
+
+        best = [0.0] * len(names)
+        for code, weight, rep_count in zip(self.exercises, self.weights, self.reps):
+            estimate = epley_1rm(weight, rep_count)
+            if estimate > best[code]:
+                best[code] = estimate
+        return {name: round(value, 1) for name, value in zip(names, best)}
+
+    def weekly_tonnage(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict[date, float]:
+        """Tonnage per training week, keyed by the Monday starting the week."""
+        low = start.toordinal() if start else 0
+        high = end.toordinal() if end else 1 << 40
+        if np is not None and len(self):
+            ordinals, _, _, weights, sets, reps = self._views()
+            mask = (ordinals >= low) & (ordinals <= high)
+            # Ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) // 7 numbers the weeks.
+            weeks = (ordinals[mask] - 1) // 7
+            if not weeks.size:
+                return {}
+            first = int(weeks.min())
+            totals = np.bincount(weeks - first, weights=(weights * sets * reps)[mask])
+            return {
+                date.fromordinal((first + offset) * 7 + 1): round(float(total), 1)
+                for offset, total in enumerate(totals)
+                if total
+            }
+
+        totals: Dict[int, float] = {}
+        for ordinal, weight, set_count, rep_count in zip(self.ordinals, self.weights, self.sets, self.reps):
+            if low <= ordinal <= high:
+                week = (ordinal - 1) // 7
+                totals[week] = totals.get(week, 0.0) + weight * set_count * rep_count
+        return {date.fromordinal(week * 7 + 1): round(total, 1) for week, total in sorted(totals.items()) if total}
+
+    def body_part_distribution(self) -> Dict[str, Dict[str, float]]:
+        """Working sets per body part and their share of all sets."""
+        names = self.body_part_codes.names
+        if np is not None and len(self):
+            _, body_parts, _, _, sets, _ = self._views()
+            counts = [int(value) for value in np.bincount(body_parts, weights=sets, minlength=len(names))]
+        else:
+            counts = [0] * len(names)
+            for code, set_count in zip(self.body_parts, self.sets):
+                counts[code] += set_count
+        total = sum(counts) or 1
+        return {
+            name: {"sets": count, "share": round(count / total, 4)}
+            for name, count in zip(names, counts)
+        }
@@ -0,0 +1,142 @@
+"""Left-right concurrency control for the in-memory stores.
+
+Two copies of the state are kept.  Readers pin whichever copy is published
+when they start and never wait for a writer.  The writer applies a change to
+the standby copy, publishes it, waits until the readers still pinned on the
+previous copy have left, and then replays the same change there.  A write
+(say, every movement of a session) therefore becomes visible to readers all
+at once, and no reader ever sees an index half-way through an update.
+
+Startup loads only build the published copy; ``settle`` (run in the
+background) or the first write replays them onto the standby copy.
+
+``Partitions`` keeps one such pair per key (a user), each with its own
+writer lock, so a write only ever waits for readers of its own partition.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Generic, Iterator, List, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class LeftRight(Generic[T]):
+    """Two copies of ``factory()`` kept in step by ``write``."""
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._copies = (factory(), factory())
+        self._active = 0
+        self._readers = [0, 0]
+        self._changed = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._pending: List[Callable[[T], None]] = []
+
+    @property
+    def active(self) -> T:
+        """The published copy, unpinned: only for code that runs while nothing writes."""
+        return self._copies[self._active]
+
+    @property
+    def copies(self) -> Tuple[T, T]:
+        """Both copies, for inspection (counters and the like) only."""
+        return self._copies
+
+    def acquire(self) -> int:
+        """Pin the published copy and return its slot for ``copy`` / ``release``."""
+        with self._changed:
+            slot = self._active
+            self._readers[slot] += 1
+        self._local.pins = getattr(self._local, "pins", 0) + 1
+        return slot
+
+    def release(self, slot: int) -> None:
+        self._local.pins -= 1
+        with self._changed:
+            self._readers[slot] -= 1
+            if not self._readers[slot]:
+                self._changed.notify_all()
+
+    def copy(self, slot: int) -> T:
+        return self._copies[slot]
+
+    @contextmanager
+    def read(self) -> Iterator[T]:
+        slot = self.acquire()
+        try:
+            yield self._copies[slot]
+        finally:
+            self.release(slot)
+
+    def load(self, change: Callable[[T], None]) -> None:
+        """Apply ``change`` to the published copy only, before readers start.
+
+        The standby copy catches up in ``settle`` or on the next ``write``.
+        """
+        with self._write_lock:
+            change(self._copies[self._active])
+            self._pending.append(change)
+
+    def settle(self) -> None:
+        """Replay loaded changes onto the standby copy."""
+        with self._write_lock:
+            self._settle()
+
+    def _settle(self) -> None:
+        standby = self._copies[1 - self._active]
+        while self._pending:
+            self._pending.pop(0)(standby)
+
+    def write(self, change: Callable[[T], None]) -> None:
+        """Apply ``change`` to both copies; readers switch to it in one step.
+
+        ``change`` runs once per copy, so it must be deterministic.  The
+        calling thread must not hold a pin: it would wait for itself.
+        """
+        if getattr(self._local, "pins", 0):
+            raise RuntimeError("Release read pins before writing.")
+        with self._write_lock:
+            self._settle()
+            standby = 1 - self._active
+            change(self._copies[standby])
+            with self._changed:
+                self._active = standby
+                self._changed.wait_for(lambda: not self._readers[1 - standby])
+            change(self._copies[1 - standby])
+
+
+class Partitions(Generic[T]):
+    """A ``LeftRight`` of ``factory()`` per key, created by the first write to it."""
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._partitions: Dict[str, LeftRight[T]] = {}
+        self._lock = threading.Lock()
+        # Stands in for keys nothing was written to yet, so reads never create partitions.
+        self._empty = LeftRight(factory)
+
+    def __len__(self) -> int:
+        return len(self._partitions)
+
+    def get(self, key: str) -> LeftRight[T]:
+        """The partition for ``key``, created if needed: for writers."""
+        partition = self._partitions.get(key)
+        if partition is None:
+            with self._lock:
+                partition = self._partitions.get(key)
+                if partition is None:
+                    partition = self._partitions[key] = LeftRight(self._factory)
+        return partition
+
+    def peek(self, key: str) -> LeftRight[T]:
+        """The partition for ``key``, or a shared empty one: for readers."""
+        return self._partitions.get(key, self._empty)
+
+    def items(self) -> List[Tuple[str, LeftRight[T]]]:
+        return list(self._partitions.items())
+
+    def settle(self) -> None:
+        for _, partition in self.items():
+            partition.settle()
@@ -0,0 +1,860 @@
+"""In-memory indexes kept up to date as workouts and nutrition logs are written."""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import count, groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from columnar import epley_1rm
+from models import Movement, Session
+
+
+SessionKey = Tuple[date, str]
+
+
+def _merge_sorted(target: List, items: List) -> None:
+    """Insert ``items`` into the sorted list ``target``.
+
+    Small batches are bisected in place; large ones (bulk loads) are appended
+    and merged by a single sort, which is linear for already-sorted runs.
+    """
+    if len(items) > 64:
+        target.extend(items)
+        target.sort()
+    else:
+        for item in items:
+            insort(target, item)
+
+
+def _movement_sort_key(movement: Movement) -> Tuple:
+    return (movement.body_part, movement.name)
+
+
+def _schedule_payload(session: Session, movement: Movement) -> Dict:
+    return {
+        "body_part": movement.body_part,
+        "body_part_label": movement.body_part_label,
+        "name": movement.name,
+        "weight": movement.weight,
+        "sets": movement.sets,
+        "reps": movement.reps,
+        "total_reps": movement.total_reps,
+        "notes": movement.notes,
+        "session_note": session.session_note,
+        "session_id": session.id,
+        "calories_burned": session.calories_burned,
+        "calories_target": session.calories_target,
+        "protein_g": session.protein_g,
+        "fat_g": session.fat_g,
+        "carb_g": session.carb_g,
+    }
+
+
+class SessionIndex:
+    """Sessions built from stored movement entries, ordered by (date, id).
+
+    Entries are folded into their ``Session`` as they are written, so readers
+    get sessions, per-date groupings and the calendar schedule without
+    regrouping the full workout history.
+    """
+
+    def __init__(self) -> None:
+        self._sessions: Dict[str, Session] = {}
+        self._keys: List[SessionKey] = []
+        self._by_date: Dict[date, List[Session]] = defaultdict(list)
+        self._schedule: Dict[str, List[Dict]] = {}
+        self._stale_dates = set()
+        self._legacy_ids = count()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add_entries(self, entries: Iterable[Dict]) -> Tuple[List[Session], List[Movement]]:
+        """Fold entries into their sessions; return the sessions created and the movements added."""
+        created: List[Session] = []
+        movements: List[Movement] = []
+        touched: Dict[str, Session] = {}
+        # A session's entries are written together, so each run of them is folded in one step.
+        for sid, run in groupby(entries, key=self._session_id):
+            run = list(run)
+            session = self._sessions.get(sid)
+            if session is None:
+                session = self._sessions[sid] = Session.from_entry(sid, run[0])
+                self._by_date[session.date].append(session)
+                created.append(session)
+            movements.extend(session.add_entries(run))
+            touched[sid] = session
+
+        created.sort(key=lambda s: (s.date, s.id))
+        _merge_sorted(self._keys, [(session.date, session.id) for session in created])
+        for session in touched.values():
+            session.movements.sort(key=_movement_sort_key)
+        for day in {session.date for session in touched.values()}:
+            self._by_date[day].sort(key=lambda s: s.id, reverse=True)
+            self._stale_dates.add(day)
+        return created, movements
+
+    def _session_id(self, entry: Dict) -> str:
+        sid = entry.get("session_id")
+        if not sid:
+            sid = f"legacy-{entry['date'].strftime('%Y%m%d')}-{next(self._legacy_ids)}"
+        return sid
+
+    def sessions(self) -> List[Session]:
+        """All sessions, newest first."""
+        return [self._sessions[sid] for _, sid in reversed(self._keys)]
+
+    def recent(self, limit: int) -> List[Session]:
+        return [self._sessions[sid] for _, sid in reversed(self._keys[-limit:])] if limit > 0 else []
+
+    def sessions_by_date(self) -> Dict[date, List[Session]]:
+        return self._by_date
+
+    def latest_date(self) -> Optional[date]:
+        return self._keys[-1][0] if self._keys else None
+
+    def page(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        before: Optional[SessionKey] = None,
+        limit: int = 256,
+    ) -> Tuple[List[Session], Optional[SessionKey]]:
+        """Up to ``limit`` sessions dated ``start``..``end`` (open when ``None``), newest first.
+
+        Pass the returned cursor as ``before`` to continue; it is ``None``
+        once the range is exhausted.  Cursors are keys, not positions, so
+        sessions written between pages do not shift the walk.
+        """
+        if before is None and end is not None:
+            before = (end + timedelta(days=1),)
+        stop = bisect_left(self._keys, before) if before else len(self._keys)
+        low = bisect_left(self._keys, (start,)) if start else 0
+        keys = self._keys[max(stop - limit, low):stop]
+        sessions = [self._sessions[sid] for _, sid in reversed(keys)]
+        return sessions, (keys[0] if len(keys) == limit else None)
+
+    def day_page(
+        self, before: Optional[SessionKey] = None, days: int = 7
+    ) -> Tuple[List[Tuple[date, List[Session]]], Optional[SessionKey]]:
+        """The sessions of up to ``days`` training dates before ``before``, newest date first.
+
+        Each date comes with all of its sessions (newest id first).  The
+        cursor is the key of the oldest session returned, or ``None`` when no
+        older sessions remain; like ``page`` it is a key, not a position.
+        """
+        position = bisect_left(self._keys, before) if before else len(self._keys)
+        grouped: List[Tuple[date, List[Session]]] = []
+        while position and len(grouped) < days:
+            day = self._keys[position - 1][0]
+            first = bisect_left(self._keys, (day,), 0, position)
+            grouped.append((day, [self._sessions[sid] for _, sid in reversed(self._keys[first:position])]))
+            position = first
+        return grouped, (self._keys[position] if position and grouped else None)
+
+    def schedule_range(self, start: date, end: date) -> Dict[str, List[Dict]]:
+        """Calendar payloads keyed by ISO date for sessions between ``start`` and ``end``."""
+        first = bisect_left(self._keys, (start,))
+        last = bisect_left(self._keys, (end + timedelta(days=1),))
+        schedule: Dict[str, List[Dict]] = {}
+        for day, _ in self._keys[first:last]:
+            date_key = day.strftime("%Y-%m-%d")
+            if date_key not in schedule:
+                schedule[date_key] = self._schedule_for(day, date_key)
+        return schedule
+
+    def _schedule_for(self, day: date, date_key: str) -> List[Dict]:
+        payloads = self._schedule.get(date_key)
+        if payloads is None or day in self._stale_dates:
+            # Concurrent readers may rebuild the same day; the stale mark is
+            # only cleared once the fresh payloads are in place.
+            payloads = self._schedule[date_key] = [
+                _schedule_payload(session, movement)
+                for session in self._by_date[day]
+                for movement in session.movements
+            ]
+            self._stale_dates.discard(day)
+        return payloads
+
+
+class WeightTimeline:
+    """Body-weight readings from sessions and nutrition logs, ordered by date.
+
+    Session weights take precedence over nutrition-log weights, the same
+    order in which the daily targets have always picked a reference weight.
+    """
+
+    def __init__(self) -> None:
+        self._session_points: List[Tuple[date, str, float]] = []
+        self._log_points: List[Tuple[date, int, float]] = []
+        self._log_seq = count()
+
+    def add_sessions(self, sessions: List[Session]) -> None:
+        _merge_sorted(
+            self._session_points,
+            [(s.date, s.id, s.body_weight) for s in sessions if s.body_weight],
+        )
+
+    def add_logs(self, entries: Iterable[Dict]) -> None:
+        # Among logs sharing a date the earliest one wins, hence the negated sequence.
+        points = []
+        for entry in entries:
+            seq = next(self._log_seq)
+            if entry.get("weight"):
+                points.append((entry["date"], -seq, entry["weight"]))
+        _merge_sorted(self._log_points, points)
+
+    def latest(self, default: float = 70.0) -> float:
+        for points in (self._session_points, self._log_points):
+            if points:
+                return points[-1][2]
+        return default
+
+    def daily(self) -> Dict[date, float]:
+        """The reading that counts for each date with one, by the same precedence as ``latest``."""
+        readings = {day: weight for day, _, weight in self._log_points}
+        readings.update((day, weight) for day, _, weight in self._session_points)
+        return readings
+
+    def as_of(self, day: date, default: float = 70.0) -> float:
+        """Latest weight recorded on or before ``day``, by the same precedence as ``latest``."""
+        bound = (day + timedelta(days=1),)
+        for points in (self._session_points, self._log_points):
+            position = bisect_left(points, bound)
+            if position:
+                return points[position - 1][2]
+        return default
+
+    def __len__(self) -> int:
+        return len(self._session_points) + len(self._log_points)
+
+
+class ExerciseSeriesIndex:
+    """Per-exercise, per-date training aggregates for the analytics chart.
+
+    For every (body part, exercise) pair it keeps the heaviest load lifted on
+    each date, and the total reps on each date for every load, so a chart
+    series is a lookup rather than a scan over every movement.
+    """
+
+    def __init__(self) -> None:
+        self._max_weight: Dict[Tuple[str, str], Dict[date, float]] = defaultdict(dict)
+        self._reps_by_weight: Dict[Tuple[str, str], Dict[float, Dict[date, int]]] = defaultdict(
+            lambda: defaultdict(dict)
+        )
+        self.body_parts: Dict[str, None] = {}
+
+    def add_entries(self, entries: Iterable[Dict]) -> None:
+        for entry in entries:
+            key = (entry["body_part"], entry["name"])
+            day = entry["date"]
+            weight = entry.get("weight") or 0.0
+            max_weights = self._max_weight[key]
+            max_weights[day] = max(max_weights.get(day, 0.0), weight)
+            reps = self._reps_by_weight[key][weight]
+            reps[day] = reps.get(day, 0) + entry.get("sets", 0) * entry.get("reps", 0)
+            self.body_parts.setdefault(entry["body_part"])
+
+    def weights(self, body_part: str, exercises: Iterable[str]) -> List[float]:
+        loads = set()
+        for name in exercises:
+            loads.update(w for w in self._reps_by_weight.get((body_part, name), {}) if w > 0)
+        return sorted(loads)
+
+    def series(self, body_part: str, exercises: Iterable[str], weight: Optional[float] = None) -> Dict:
+        """Chart labels plus one aligned series per exercise with data.
+
+        Without ``weight`` each point is the day's heaviest load; with it, the
+        day's total reps performed at exactly that load.
+        """
+        per_exercise: List[Tuple[str, Dict[date, float]]] = []
+        for name in exercises:
+            key = (body_part, name)
+            if weight is None:
+                points = {day: round(value, 1) for day, value in self._max_weight.get(key, {}).items()}
+            else:
+                points = self._reps_by_weight.get(key, {}).get(weight, {})
+            if points:
+                per_exercise.append((name, points))
+
+        labels = sorted({day for _, points in per_exercise for day in points})
+        return {
+            "labels": [day.isoformat() for day in labels],
+            "series": [
+                {"exercise": name, "data": [points.get(day) for day in labels]}
+                for name, points in per_exercise
+            ],
+        }
+
+
+class ProgressionIndex:
+    """Personal records and recent progression per exercise, updated as sessions are written.
+
+    Every exercise keeps its heaviest load, best estimated one-rep max
+    (Epley) and best volume day, plus one point per training day (best
+    estimate, volume, top load) for the progression window, so queries never
+    look at the movement history.  Ties go to the earliest date, which keeps
+    the records independent of the order sessions arrive in.
+    """
+
+    def __init__(self) -> None:
+        self._records: Dict[str, Dict[str, Dict]] = {}
+        # name -> day -> [best estimated 1RM, volume, top load]
+        self._days: Dict[str, Dict[date, List[float]]] = defaultdict(dict)
+        self._dates: Dict[str, List[date]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @staticmethod
+    def _improve(records: Dict[str, Dict], kind: str, value: float, day: date, **detail) -> None:
+        current = records.get(kind)
+        if current is None or value > current["value"] or (value == current["value"] and day < current["date"]):
+            records[kind] = {"value": value, "date": day, **detail}
+
+    def add_entries(self, entries: Iterable[Dict]) -> None:
+        for entry in entries:
+            name = entry["name"]
+            day = entry["date"]
+            weight = entry.get("weight") or 0.0
+            sets = entry.get("sets", 0)
+            reps = entry.get("reps", 0)
+            estimate = epley_1rm(weight, reps)
+
+            points = self._days[name]
+            point = points.get(day)
+            if point is None:
+                point = points[day] = [0.0, 0.0, 0.0]
+                insort(self._dates[name], day)
+            point[0] = max(point[0], estimate)
+            point[1] += weight * sets * reps
+            point[2] = max(point[2], weight)
+
+            records = self._records.setdefault(name, {})
+            self._improve(records, "heaviest_weight", weight, day, sets=sets, reps=reps)
+            self._improve(records, "best_e1rm", estimate, day, weight=weight, reps=reps)
+            self._improve(records, "best_volume_day", point[1], day)
+
+    def records(self, name: str) -> Optional[Dict]:
+        """PRs for one exercise, or ``None`` when it has never been trained."""
+        records = self._records.get(name)
+        if records is None:
+            return None
+        dates = self._dates[name]
+        return {
+            **{
+                kind: {**record, "value": round(record["value"], 1), "date": record["date"].isoformat()}
+                for kind, record in records.items()
+            },
+            "training_days": len(dates),
+            "first_trained": dates[0].isoformat(),
+            "last_trained": dates[-1].isoformat(),
+        }
+
+    def all_records(self) -> Dict[str, Dict]:
+        return {name: self.records(name) for name in sorted(self._records)}
+
+    def progression(self, name: str, window: int = 8) -> Dict:
+        """The last ``window`` training days of an exercise and the trend across them.
+
+        The trend is the change in best estimated 1RM from the first to the
+        last day, and its least-squares slope per week.
+        """
+        points = self._days.get(name, {})
+        days = self._dates.get(name, [])[-window:] if window > 0 else []
+        recent = [
+            {
+                "date": day.isoformat(),
+                "best_e1rm": round(points[day][0], 1),
+                "volume": round(points[day][1], 1),
+                "top_weight": round(points[day][2], 1),
+            }
+            for day in days
+        ]
+        trend = None
+        if len(days) >= 2:
+            first, last = points[days[0]][0], points[days[-1]][0]
+            xs = [(day - days[0]).days for day in days]
+            ys = [points[day][0] for day in days]
+            mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+            spread = sum((x - mean_x) ** 2 for x in xs)
+            slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread if spread else 0.0
+            trend = {
+                "e1rm_change": round(last - first, 1),
+                "e1rm_change_pct": round((last - first) / first * 100, 1) if first else None,
+                "e1rm_per_week": round(slope * 7, 2),
+                "average_volume": round(sum(points[day][1] for day in days) / len(days), 1),
+            }
+        return {"recent": recent, "trend": trend}
+
+
+MACROS = ("calories", "protein", "fat", "carb")
+
+
+class NutritionLedger:
+    """Nutrition logs with per-day totals and per-macro prefix sums.
+
+    ``_prefix[macro][k]`` holds the macro's total from ``_origin`` up to (but
+    not including) day ``_origin + k``, over a dense run of days, so the total
+    for any date range is a difference of two slots.  Entries are kept newest
+    date first (in write order within a date) for paging through the raw log.
+    """
+
+    def __init__(self) -> None:
+        self._days: Dict[date, Dict] = {}
+        self._dates: List[date] = []
+        self._origin: Optional[int] = None
+        self._prefix: Dict[str, List[float]] = {macro: [0.0] for macro in MACROS}
+        self._entries: List[Tuple[int, int, Dict]] = []
+        self._seq = count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_logs(self, entries: List[Dict]) -> None:
+        """Fold a batch of logs in, recomputing the prefix sums once for the whole batch."""
+        if not entries:
+            return
+        created = []
+        for entry in entries:
+            day = entry["date"]
+            totals = self._days.get(day)
+            if totals is None:
+                totals = self._days[day] = {macro: 0.0 for macro in MACROS}
+                totals["weight"] = None
+                created.append(day)
+            for macro in MACROS:
+                totals[macro] += entry.get(macro, 0.0)
+            totals["weight"] = entry.get("weight") or totals["weight"]
+        _merge_sorted(self._dates, created)
+
+        ordinals = [entry["date"].toordinal() for entry in entries]
+        self._update_prefix(min(ordinals), max(ordinals))
+        _merge_sorted(self._entries, [(-ordinal, next(self._seq), entry) for ordinal, entry in zip(ordinals, entries)])
+
+    def _update_prefix(self, first: int, last: int) -> None:
+        """Recompute the prefix sums from day ``first`` on, covering at least up to day ``last``."""
+        if self._origin is not None:
+            # The last day the prefix sums already cover.
+            last = max(last, self._origin + len(self._prefix[MACROS[0]]) - 2)
+        if self._origin is None or first < self._origin:
+            self._origin = first
+        # Slots up to the first day the batch touches stay valid, as far as they reach.
+        start = min(first - self._origin, len(self._prefix[MACROS[0]]) - 1)
+        stop = last - self._origin + 1
+        rows = [self._days.get(date.fromordinal(self._origin + slot)) for slot in range(start, stop)]
+        for macro in MACROS:
+            prefix = self._prefix[macro]
+            del prefix[start + 1:]
+            running = prefix[start]
+            for row in rows:
+                if row is not None:
+                    running += row[macro]
+                prefix.append(running)
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+
+    def range_totals(self, start: date, end: date) -> Dict[str, float]:
+        """Macro totals for ``start``..``end`` inclusive, in constant time."""
+        if self._origin is None:
+            return {macro: 0.0 for macro in MACROS}
+        size = len(self._prefix[MACROS[0]])
+        low = min(max(start.toordinal() - self._origin, 0), size - 1)
+        high = min(max(end.toordinal() - self._origin + 1, 0), size - 1)
+        if high <= low:
+            return {macro: 0.0 for macro in MACROS}
+        return {
+            macro: round(self._prefix[macro][high] - self._prefix[macro][low], 1)
+            for macro in MACROS
+        }
+
+    def average(self, days: int, end: date) -> Dict[str, float]:
+        """Average daily intake over the ``days`` days ending on ``end``."""
+        totals = self.range_totals(end - timedelta(days=days - 1), end)
+        return {macro: round(value / days, 1) for macro, value in totals.items()}
+
+    def daily_history(self, offset: int = 0, limit: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        """Rounded per-day totals, newest day first."""
+        stop = len(self._dates) - offset
+        start = 0 if limit is None else max(stop - limit, 0)
+        history = []
+        for day in reversed(self._dates[start:max(stop, 0)]):
+            totals = self._days[day]
+            history.append(
+                (day.strftime("%Y-%m-%d"), {**{m: round(totals[m], 1) for m in MACROS}, "weight": totals["weight"]})
+            )
+        return history
+
+    def day_count(self) -> int:
+        return len(self._dates)
+
+    def entries(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Raw log entries, newest date first."""
+        stop = None if limit is None else offset + limit
+        return [entry for _, _, entry in self._entries[offset:stop]]
+
+    def page(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        after: Optional[Tuple[int, int]] = None,
+        limit: int = 256,
+    ) -> Tuple[List[Dict], Optional[Tuple[int, int]]]:
+        """Up to ``limit`` entries dated ``start``..``end`` in ``entries`` order, plus a cursor.
+
+        Pass the cursor back as ``after`` to continue; it is ``None`` once the
+        range is exhausted.
+        """
+        if after is not None:
+            low = bisect_left(self._entries, (after[0], after[1] + 1))
+        else:
+            low = bisect_left(self._entries, (-end.toordinal(),)) if end else 0
+        high = bisect_left(self._entries, (-start.toordinal() + 1,)) if start else len(self._entries)
+        chunk = self._entries[low:min(low + limit, high)]
+        cursor = (chunk[-1][0], chunk[-1][1]) if len(chunk) == limit else None
+        return [entry for _, _, entry in chunk], cursor
+
+
+class DailySummaryTable:
+    """Per-date training and intake totals, materialized as records are written.
+
+    Each row holds what a daily summary would otherwise re-add on every call:
+    the summed session targets, calories burned, duration, the body weight of
+    the day's newest session and the macros consumed.  Dates are kept sorted,
+    so a window of days is a bisect plus a slice.
+    """
+
+    SESSION_FIELDS = ("calories_target", "protein_g", "fat_g", "carb_g", "calories_burned", "duration_minutes")
+
+    def __init__(self) -> None:
+        self._rows: Dict[date, Dict] = {}
+        self._dates: List[date] = []
+        self._newest_session: Dict[date, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def _row(self, day: date, created: List[date]) -> Dict:
+        row = self._rows.get(day)
+        if row is None:
+            row = self._rows[day] = {
+                "session_count": 0,
+                "reference_weight": None,
+                **{field: 0.0 for field in self.SESSION_FIELDS},
+                **{macro: 0.0 for macro in MACROS},
+            }
+            created.append(day)
+        return row
+
+    def add_sessions(self, sessions: Iterable[Session]) -> None:
+        created: List[date] = []
+        for session in sessions:
+            day = session.date
+            row = self._row(day, created)
+            row["session_count"] += 1
+            for field in self.SESSION_FIELDS:
+                row[field] += getattr(session, field) or 0.0
+            # Summaries fall back to the newest session's body weight, as listed first per date.
+            if session.id > self._newest_session.get(day, ""):
+                self._newest_session[day] = session.id
+                row["reference_weight"] = session.body_weight
+        _merge_sorted(self._dates, created)
+
+    def add_logs(self, entries: Iterable[Dict]) -> None:
+        created: List[date] = []
+        for entry in entries:
+            row = self._row(entry["date"], created)
+            for macro in MACROS:
+                row[macro] += entry.get(macro, 0.0)
+        _merge_sorted(self._dates, created)
+
+    def get(self, day: date) -> Optional[Dict]:
+        return self._rows.get(day)
+
+    def window(self, start: date, end: date) -> Dict[date, Dict]:
+        """Rows for the dates in ``start``..``end`` that have any data."""
+        first = bisect_left(self._dates, start)
+        last = bisect_left(self._dates, end + timedelta(days=1))
+        return {day: self._rows[day] for day in self._dates[first:last]}
+
+
+RESOLUTIONS = ("day", "week", "month", "year")
+# What ``TimeSeriesRollups.add_points`` wrote: the new buckets and the new bucket starts, per (series, resolution).
+RollupChanges = Tuple[Dict[Tuple[str, str], Dict[date, List[float]]], Dict[Tuple[str, str], List[date]]]
+
+
+def _bucket_number(day: date, resolution: str) -> int:
+    """Consecutive numbering of the buckets at ``resolution``; weeks start on Monday."""
+    if resolution == "day":
+        return day.toordinal()
+    if resolution == "week":
+        # Ordinal 1 (0001-01-01) is a Monday, as in the columnar weekly kernel.
+        return (day.toordinal() - 1) // 7
+    if resolution == "month":
+        return day.year * 12 + day.month - 1
+    return day.year
+
+
+def bucket_start(day: date, resolution: str) -> date:
+    """The first date of the bucket holding ``day``."""
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    if resolution == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def pick_resolution(start: date, end: date, max_points: int) -> str:
+    """The finest resolution at which ``start``..``end`` spans at most ``max_points`` buckets."""
+    for resolution in RESOLUTIONS:
+        if _bucket_number(end, resolution) - _bucket_number(start, resolution) < max_points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+class TimeSeriesRollups:
+    """Per-series aggregates at day, week, month and year resolution.
+
+    ``fields`` maps each stored field to how a bucket combines it, ``sum`` or
+    ``max``; ``averages`` maps further reported fields to the summed field
+    they divide by the bucket's days with data.  A point lands in its bucket
+    at every resolution as it is written, so a chart over any range reads at
+    most one bucket per point it draws.
+    """
+
+    def __init__(self, fields: Dict[str, str], averages: Optional[Dict[str, str]] = None) -> None:
+        self._fields = tuple(fields.items())
+        self._averages = tuple(
+            (name, [field for field, _ in self._fields].index(source)) for name, source in (averages or {}).items()
+        )
+        # How each bucket column combines, the trailing day count included.
+        self._combiners = tuple(max if kind == "max" else sum for _, kind in self._fields) + (sum,)
+        # series -> resolution -> bucket start -> [field values..., days with data]
+        self._buckets: Dict[str, Dict[str, Dict[date, List[float]]]] = defaultdict(
+            lambda: {resolution: {} for resolution in RESOLUTIONS}
+        )
+        self._starts: Dict[str, Dict[str, List[date]]] = defaultdict(
+            lambda: {resolution: [] for resolution in RESOLUTIONS}
+        )
+        # day -> its week, month and year bucket starts; histories repeat the same dates.
+        self._bucket_starts: Dict[date, Tuple[date, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _combine(self, rows: Iterable[List[float]]) -> List[float]:
+        """Rows of field values (and a trailing day count, if they all have one) combined column by column."""
+        return [combine(column) for combine, column in zip(self._combiners, zip(*rows))]
+
+    def add_points(self, points: Iterable[Tuple[str, date, List[float]]]) -> "RollupChanges":
+        """Fold a batch of ``(series, day, values)`` points, ``values`` in field order.
+
+        Points go into their day buckets first; each week, month and year
+        bucket the batch touches then takes the batch's day totals in one
+        step, and new bucket starts are merged into the sorted lists once.
+        Returns the buckets written, for ``replay`` onto an identical copy.
+        """
+        by_series: Dict[str, Dict[date, List[List[float]]]] = defaultdict(lambda: defaultdict(list))
+        for series, day, values in points:
+            by_series[series][day].append(values)
+
+        updates: Dict[Tuple[str, str], Dict[date, List[float]]] = {}
+        created: Dict[Tuple[str, str], List[date]] = {}
+        for series, by_day in by_series.items():
+            buckets = self._buckets[series]
+            days = buckets["day"]
+            written = updates[series, "day"] = {}
+            new_days = []
+            # Per coarser resolution: bucket start -> the batch's day totals, each ending in 1 for a new day.
+            coarse: Tuple[Dict[date, List[List[float]]], ...] = tuple(defaultdict(list) for _ in RESOLUTIONS[1:])
+            for day, rows in by_day.items():
+                totals = list(rows[0]) if len(rows) == 1 else self._combine(rows)
+                bucket = days.get(day)
+                if bucket is None:
+                    totals.append(1)
+                    written[day] = totals
+                    new_days.append(day)
+                else:
+                    totals.append(0)
+                    written[day] = self._combine((bucket, totals))
+                starts = self._bucket_starts.get(day)
+                if starts is None:
+                    starts = self._bucket_starts[day] = tuple(
+                        bucket_start(day, resolution) for resolution in RESOLUTIONS[1:]
+                    )
+                for groups, start in zip(coarse, starts):
+                    groups[start].append(totals)
+            if new_days:
+                created[series, "day"] = new_days
+
+            for resolution, groups in zip(RESOLUTIONS[1:], coarse):
+                existing = buckets[resolution]
+                written = updates[series, resolution] = {}
+                new_starts = []
+                for start, rows in groups.items():
+                    bucket = existing.get(start)
+                    if bucket is None:
+                        new_starts.append(start)
+                    else:
+                        rows.append(bucket)
+                    written[start] = rows[0] if len(rows) == 1 else self._combine(rows)
+                if new_starts:
+                    created[series, resolution] = new_starts
+
+        changes = (updates, {key: sorted(starts) for key, starts in created.items()})
+        self.replay(changes)
+        return changes
+
+    def replay(self, changes: "RollupChanges") -> None:
+        """Write buckets returned by ``add_points`` on a copy that was in the same state as this one.
+
+        Buckets are replaced, never changed in place, so both copies can
+        hold the same lists.
+        """
+        updates, created = changes
+        for (series, resolution), buckets in updates.items():
+            self._buckets[series][resolution].update(buckets)
+        for (series, resolution), starts in created.items():
+            _merge_sorted(self._starts[series][resolution], starts)
+
+    def span(self, series: str) -> Optional[Tuple[date, date]]:
+        """The first and last dates with data in ``series``."""
+        days = self._starts.get(series, {}).get("day")
+        return (days[0], days[-1]) if days else None
+
+    def query(
+        self,
+        series: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        max_points: int = 120,
+        resolution: Optional[str] = None,
+    ) -> Dict:
+        """Buckets of ``series`` covering ``start``..``end`` (the series' own span when ``None``).
+
+        Without a ``resolution`` the finest one that fits the range in
+        ``max_points`` buckets is used.  Buckets without data are left out,
+        so a sparse series returns fewer points.
+        """
+        span = self.span(series)
+        start = start or (span[0] if span else date.today())
+        end = end or (span[1] if span else start)
+        resolution = resolution or pick_resolution(start, end, max_points)
+        starts = self._starts.get(series, {}).get(resolution, [])
+        first = bisect_left(starts, bucket_start(start, resolution))
+        last = bisect_right(starts, end)
+        buckets = self._buckets[series][resolution] if series in self._buckets else {}
+        rows = [buckets[day] for day in starts[first:last]]
+
+        values: Dict[str, List[float]] = {}
+        for position, (name, _) in enumerate(self._fields):
+            values[name] = [round(float(row[position]), 1) for row in rows]
+        for name, position in self._averages:
+            values[name] = [round(row[position] / row[-1], 1) for row in rows]
+        return {
+            "resolution": resolution,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "labels": [day.isoformat() for day in starts[first:last]],
+            "days": [row[-1] for row in rows],
+            **values,
+        }
+
+
+class ExerciseRollups(TimeSeriesRollups):
+    """Training rollups per exercise name: top load, best estimated 1RM, volume, sets and reps."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"top_weight": "max", "best_e1rm": "max", "volume": "sum", "sets": "sum", "reps": "sum"}
+        )
+
+    def add_entries(self, entries: Iterable[Dict]) -> RollupChanges:
+        points = []
+        for entry in entries:
+            weight = entry.get("weight") or 0.0
+            sets = entry.get("sets", 0)
+            reps = entry.get("reps", 0)
+            values = [weight, epley_1rm(weight, reps), weight * sets * reps, sets, sets * reps]
+            points.append((entry["name"], entry["date"], values))
+        return self.add_points(points)
+
+
+class NutritionRollups(TimeSeriesRollups):
+    """Intake rollups per macro: the bucket total and the average over days logged.
+
+    Every log counts towards each macro's days, so the macros share one
+    series of buckets, one column per macro, and a log is a single point.
+    """
+
+    SERIES = "intake"
+
+    def __init__(self) -> None:
+        super().__init__(
+            {macro: "sum" for macro in MACROS}, averages={f"{macro}_average": macro for macro in MACROS}
+        )
+
+    def add_logs(self, entries: Iterable[Dict]) -> RollupChanges:
+        return self.add_points(
+            [(self.SERIES, entry["date"], [entry.get(macro, 0.0) for macro in MACROS]) for entry in entries]
+        )
+
+    def query(
+        self,
+        series: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        max_points: int = 120,
+        resolution: Optional[str] = None,
+    ) -> Dict:
+        """``TimeSeriesRollups.query`` for the macro ``series``: its ``total`` and ``daily_average``."""
+        result = super().query(self.SERIES, start, end, max_points, resolution)
+        total, daily_average = result[series], result[f"{series}_average"]
+        for macro in MACROS:
+            del result[macro], result[f"{macro}_average"]
+        return {**result, "total": total, "daily_average": daily_average}
+
+
+class ChangeFeed:
+    """Sessions and nutrition logs in the order they were written, by storage seq.
+
+    A client that remembers the seq it last synced to asks ``since`` for what
+    came after it, so a repeat visit costs work proportional to the new
+    activity rather than to the whole history.  A session that a later write
+    adds to moves to that write's seq; its earlier place is skipped.
+    """
+
+    def __init__(self) -> None:
+        # (seq, arrival, kind, item); ``arrival`` keeps items from ever being compared.
+        self._changes: List[Tuple[int, int, str, object]] = []
+        self._arrivals = count()
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def add(self, changes: Iterable[Tuple[int, str, object]]) -> None:
+        """Record ``(seq, kind, item)`` changes, which may arrive out of seq order."""
+        _merge_sorted(self._changes, sorted((seq, next(self._arrivals), kind, item) for seq, kind, item in changes))
+
+    def since(self, seq: int, limit: int = 500) -> Tuple[List[Tuple[int, str, object]], int, bool]:
+        """Changes written after ``seq``, the seq to resume from, and whether more remain.
+
+        A page holds about ``limit`` changes but never ends part-way through
+        a seq, so records written together are delivered together.
+        """
+        start = bisect_right(self._changes, (seq, float("inf")))
+        stop = min(start + limit, len(self._changes))
+        while start < stop < len(self._changes) and self._changes[stop][0] == self._changes[stop - 1][0]:
+            stop += 1
+        page = [
+            (change_seq, kind, item)
+            for change_seq, _, kind, item in self._changes[start:stop]
+            if kind != "session" or item.seq == change_seq
+        ]
+        cursor = self._changes[stop - 1][0] if stop > start else seq
+        return page, cursor, stop < len(self._changes)
@@ -0,0 +1,141 @@
+"""Background jobs for analytics too heavy to compute inside a request.
+
+A job is a function run in a local process pool on inputs copied out of the
+stores.  Its id is derived from who asked, what was asked (the job kind and
+its parameters) and the data version the inputs were copied at, so:
+
+* asking again while the job runs returns the same job (requests coalesce);
+* a finished job doubles as the cached result for that data version;
+* a write bumps the version, and the next request starts a fresh job.
+
+Clients submit, then poll the job until its status is ``done`` or ``failed``.
+Finished jobs are kept up to ``max_jobs``, oldest dropped first.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Job:
+    """One submitted job; ``future`` carries its outcome."""
+
+    id: str
+    kind: str
+    owner: str
+    params: Dict
+    version: int
+    submitted: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "pending"
+        return "failed" if self.future.cancelled() or self.future.exception() else "done"
+
+    def to_json(self) -> Dict:
+        payload = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "version": self.version,
+            "status": self.status,
+            "submitted": self.submitted.isoformat(timespec="seconds"),
+        }
+        if payload["status"] == "done":
+            payload["result"] = self.future.result()
+        elif payload["status"] == "failed":
+            payload["error"] = "Job was cancelled." if self.future.cancelled() else str(self.future.exception())
+        return payload
+
+
+class JobRunner:
+    """Runs jobs in a process pool started on first use."""
+
+    def __init__(self, workers: int = 2, max_jobs: int = 512) -> None:
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def job_id(owner: str, kind: str, params: Dict, version: int) -> str:
+        key = json.dumps([owner, kind, params, version], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def submit(
+        self,
+        owner: str,
+        kind: str,
+        params: Dict,
+        version: int,
+        function: Callable,
+        prepare: Callable[[], Tuple],
+    ) -> Job:
+        """The job for these inputs, started unless one is already running or done.
+
+        ``prepare`` copies the inputs out of the stores; it only runs when a
+        new job starts, and ``function(*prepare())`` runs in the pool.
+        """
+        job_id = self.job_id(owner, kind, params, version)
+        existing = self._reusable(job_id)
+        if existing is not None:
+            return existing
+        args = prepare()
+        with self._lock:
+            existing = self._jobs.get(job_id)
+            if existing is not None and existing.status != "failed":
+                return existing  # another request started it meanwhile
+            job = Job(job_id, kind, owner, params, version)
+            job.future = self._start(function, args)
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            self._evict()
+        return job
+
+    def _reusable(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status == "failed":
+                return None
+            self._jobs.move_to_end(job_id)
+            return job
+
+    def _start(self, function: Callable, args: Tuple) -> Future:
+        if self._pool is None:
+            # Workers are spawned rather than forked: the server's threads and locks stay behind.
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return self._pool.submit(function, *args)
+        except BrokenProcessPool:
+            logger.warning("Restarting the job pool after a worker died.")
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool.submit(function, *args)
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[: max(len(self._jobs) - self.max_jobs, 0)]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,243 @@
+"""In-process instrumentation exported in the Prometheus text format.
+
+Collected when ``MUSCLE_LOG_METRICS`` is not ``0``:
+
+* request latency per route, method and status, and response bytes per route;
+* time spent in helpers decorated with ``timed`` and in Jinja rendering;
+* time spent encoding JSON responses, and the bytes produced;
+* entries scanned per data source (``count_scanned``).
+
+With metrics disabled ``timed`` returns the function unchanged and no
+request hooks are installed, so the only remaining cost is an early return
+in ``count_scanned``.
+
+Setting ``MUSCLE_LOG_PROFILE_DIR`` additionally lets a single request opt in
+to cProfile with ``?profile=1``; the stats are written to that directory as
+``<timestamp>-<endpoint>.prof``.
+"""
+
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, Response, before_render_template, g, request, template_rendered
+from flask.json.provider import DefaultJSONProvider
+
+
+ENABLED = os.environ.get("MUSCLE_LOG_METRICS", "1").lower() not in ("0", "false", "no")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Labels = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Labels = (), buckets=LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                running = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    running += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_label_text(self.label_names, labels, le)} {running}")
+                lines.append(f"{self.name}_sum{_label_text(self.label_names, labels)} {total:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.label_names, labels)} {running}")
+        return lines
+
+
+class Gauges:
+    """Values read from a callback at scrape time, e.g. cache counters."""
+
+    def __init__(self, name: str, help_text: str, label_name: str, read: Callable[[], Dict[str, float]]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_label_text((self.label_name,), (key,))} {value:g}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List = []
+
+    def add(self, metric):
+        """Register ``metric``; adding one already registered (another app's init) is a no-op."""
+        if metric not in self._metrics:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.add(
+    Histogram("muscle_log_request_seconds", "Request latency.", ("route", "method", "status"))
+)
+RESPONSE_BYTES = REGISTRY.add(
+    Counter("muscle_log_response_bytes_total", "Bytes in non-streamed response bodies.", ("route",))
+)
+HELPER_SECONDS = REGISTRY.add(Histogram("muscle_log_helper_seconds", "Time spent in instrumented helpers.", ("helper",)))
+RENDER_SECONDS = REGISTRY.add(Histogram("muscle_log_render_seconds", "Jinja template rendering time.", ("template",)))
+JSON_SECONDS = REGISTRY.add(Histogram("muscle_log_json_encode_seconds", "Time spent encoding JSON responses."))
+JSON_BYTES = REGISTRY.add(Counter("muscle_log_json_bytes_total", "Characters of JSON produced for responses."))
+ENTRIES_SCANNED = REGISTRY.add(
+    Counter("muscle_log_entries_scanned_total", "Entries read to build responses.", ("source",))
+)
+
+
+def timed(name: str):
+    """Record the decorated function's run time under ``helper=name``."""
+
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                HELPER_SECONDS.observe(time.perf_counter() - started, (name,))
+
+        return wrapper
+
+    return decorator
+
+
+def count_scanned(source: str, amount: int) -> None:
+    if ENABLED:
+        ENTRIES_SCANNED.inc(amount, (source,))
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs) -> str:
+        started = time.perf_counter()
+        text = super().dumps(obj, **kwargs)
+        JSON_SECONDS.observe(time.perf_counter() - started)
+        JSON_BYTES.inc(len(text))
+        return text
+
+
+def _route_label() -> str:
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def init_app(app: Flask, profile_dir: Optional[str] = None, gauges: Iterable[Gauges] = ()) -> None:
+    """Serve ``/metrics`` and, when enabled, install the request and rendering hooks."""
+    for gauge in gauges:
+        REGISTRY.add(gauge)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    if ENABLED:
+        app.json = TimedJSONProvider(app)
+
+        @app.before_request
+        def start_request_timer():
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop("metrics_started", None)
+            if started is not None:
+                route = _route_label()
+                REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, (route, request.method, str(response.status_code))
+                )
+                if not response.is_streamed:
+                    RESPONSE_BYTES.inc(response.calculate_content_length() or 0, (route,))
+            return response
+
+        def start_render(sender, template, context, **extra):
+            g.setdefault("metrics_renders", []).append(time.perf_counter())
+
+        def finish_render(sender, template, context, **extra):
+            starts = g.get("metrics_renders")
+            if starts:
+                RENDER_SECONDS.observe(time.perf_counter() - starts.pop(), (template.name or "<string>",))
+
+        before_render_template.connect(start_render, app, weak=False)
+        template_rendered.connect(finish_render, app, weak=False)
+
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+        @app.before_request
+        def start_profile():
+            if request.args.get("profile") == "1":
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+        @app.teardown_request
+        def dump_profile(exc=None):
+            profiler = g.pop("profiler", None)
+            if profiler is not None:
+                profiler.disable()
+                name = f"{int(time.time() * 1000)}-{request.endpoint or 'unmatched'}.prof"
+                profiler.dump_stats(os.path.join(profile_dir, name))
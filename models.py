@@ -0,0 +1,163 @@
+"""Normalized session and movement records held by the in-memory stores.
+
+Stored movement entries repeat their session's note, body weight and energy
+targets, and their body part's label.  In memory each session is kept once,
+and its movements are compact slotted records pointing back to it.  Body-part
+keys, labels and exercise names are interned, so each distinct string is
+held once however many movements use it.
+
+Movements still expose the session-level fields (``date``, ``session_note``,
+``calories_burned``, ...) as read-only properties, and both classes answer
+``record["field"]`` and ``record.get("field")``, so templates and callers
+written against the old movement dicts keep working.
+"""
+
+import sys
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+
+
+class _FieldAccess:
+    """Dict-style read access to attributes, for code written against the old dicts."""
+
+    __slots__ = ()
+
+    def __getitem__(self, name: str):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name: str, default=None):
+        return getattr(self, name, default)
+
+
+@dataclass(eq=False, slots=True)
+class Movement(_FieldAccess):
+    """One exercise performed in a session."""
+
+    session: "Session" = field(repr=False)
+    body_part: str
+    body_part_label: str
+    name: str
+    weight: float
+    sets: int
+    reps: int
+    # The movement's own note; ``notes`` falls back to the session note.
+    note: str = ""
+
+    @property
+    def total_reps(self) -> int:
+        return self.sets * self.reps
+
+    @property
+    def notes(self) -> str:
+        return self.note or self.session.session_note
+
+    @property
+    def date(self) -> date:
+        return self.session.date
+
+    @property
+    def session_id(self) -> str:
+        return self.session.id
+
+    @property
+    def session_note(self) -> str:
+        return self.session.session_note
+
+    @property
+    def body_weight(self) -> Optional[float]:
+        return self.session.body_weight
+
+    @property
+    def calories_burned(self) -> float:
+        return self.session.calories_burned
+
+    @property
+    def calories_target(self) -> float:
+        return self.session.calories_target
+
+    @property
+    def protein_g(self) -> float:
+        return self.session.protein_g
+
+    @property
+    def fat_g(self) -> float:
+        return self.session.fat_g
+
+    @property
+    def carb_g(self) -> float:
+        return self.session.carb_g
+
+    @property
+    def session_duration_minutes(self) -> float:
+        return self.session.duration_minutes
+
+
+@dataclass(eq=False, slots=True)
+class Session(_FieldAccess):
+    """A logged workout session and its movements."""
+
+    id: str
+    date: date
+    session_note: str = ""
+    body_weight: Optional[float] = None
+    calories_target: float = 0.0
+    calories_burned: float = 0.0
+    protein_g: float = 0.0
+    fat_g: float = 0.0
+    carb_g: float = 0.0
+    duration_minutes: float = 0.0
+    movements: List[Movement] = field(default_factory=list)
+    total_sets: int = 0
+    total_reps: int = 0
+    # Storage seq of the newest write that added to the session.
+    seq: int = 0
+
+    @classmethod
+    def from_entry(cls, sid: str, entry: Dict) -> "Session":
+        """A session carrying the session-level fields of a stored movement entry."""
+        return cls(
+            id=sid,
+            date=entry["date"],
+            session_note=entry.get("session_note", ""),
+            body_weight=entry.get("body_weight"),
+            calories_target=entry.get("calories_target", 0.0),
+            calories_burned=entry.get("calories_burned", 0.0),
+            protein_g=entry.get("protein_g", 0.0),
+            fat_g=entry.get("fat_g", 0.0),
+            carb_g=entry.get("carb_g", 0.0),
+            duration_minutes=entry.get("session_duration_minutes", 0.0),
+        )
+
+    def add_entries(self, entries: List[Dict]) -> List[Movement]:
+        """Append the movements described by stored entries of this session, in order."""
+        intern = sys.intern
+        movements = []
+        for entry in entries:
+            note = entry.get("entry_note")
+            if note is None:
+                # Older entries only kept the note merged with the session note.
+                note = entry.get("notes", "")
+                if note == self.session_note:
+                    note = ""
+            sets, reps = entry["sets"], entry["reps"]
+            movements.append(
+                Movement(
+                    self,
+                    intern(entry["body_part"]),
+                    intern(entry["body_part_label"]),
+                    intern(entry["name"]),
+                    entry["weight"],
+                    sets,
+                    reps,
+                    note,
+                )
+            )
+            self.seq = max(self.seq, entry.get("seq", 0))
+            self.total_sets += sets
+            self.total_reps += sets * reps
+        self.movements.extend(movements)
+        return movements
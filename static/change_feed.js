@@ -0,0 +1,144 @@
+// Local copy of the logged sessions and nutrition, kept current from /api/changes.
+//
+// The copy lives in localStorage with the cursor it was synced to, so a
+// repeat visit downloads only what was written since.  It is tagged with the
+// user the feed answered for: another user signing in on the same browser
+// starts from an empty copy rather than building on someone else's.
+//
+// The copy is a cache of the records themselves, not of anything computed
+// from them: pages render first from the windowed endpoints and start the
+// sync in the background; once it is done the calendars read their entries
+// from the copy.  Totals, series and other aggregates always come from the
+// server's rollup and summary endpoints.  A history too large to keep in
+// localStorage would be downloaded in full on every visit, so after a copy
+// fails to fit the sync is skipped for a while and the pages stay on the
+// windowed endpoints.
+(function () {
+  const STORAGE_KEY = "muscle-log-changes";
+  const OVER_QUOTA_KEY = "muscle-log-changes-over-quota";
+  const OVER_QUOTA_RETRY_MS = 7 * 24 * 60 * 60 * 1000;
+
+  function emptyCopy(user) {
+    return { user: user === undefined ? null : user, cursor: 0, sessions: {}, nutrition: {} };
+  }
+
+  function readCopy() {
+    try {
+      const stored = JSON.parse(localStorage.getItem(STORAGE_KEY));
+      if (stored && "user" in stored && Number.isInteger(stored.cursor) && stored.sessions && stored.nutrition) {
+        return stored;
+      }
+    } catch (error) {
+      // Unreadable copies are rebuilt from scratch.
+    }
+    return emptyCopy();
+  }
+
+  function writeCopy(copy) {
+    try {
+      localStorage.setItem(STORAGE_KEY, JSON.stringify(copy));
+      localStorage.removeItem(OVER_QUOTA_KEY);
+    } catch (error) {
+      // Over quota: this page still uses the copy; later visits skip the sync.
+      localStorage.removeItem(STORAGE_KEY);
+      try {
+        localStorage.setItem(OVER_QUOTA_KEY, String(Date.now()));
+      } catch (ignored) {
+        // Storage is unavailable altogether; every visit syncs in full.
+      }
+    }
+  }
+
+  function overQuota() {
+    try {
+      return Date.now() - Number(localStorage.getItem(OVER_QUOTA_KEY) || 0) < OVER_QUOTA_RETRY_MS;
+    } catch (error) {
+      return false;
+    }
+  }
+
+  let pending = null;
+  let synced = null;
+
+  async function pull(url) {
+    if (overQuota()) {
+      return null;
+    }
+    let copy = readCopy();
+    let more = true;
+    while (more) {
+      const response = await fetch(`${url}?since=${copy.cursor}`);
+      if (!response.ok) {
+        throw new Error(`Change feed answered ${response.status}`);
+      }
+      const page = await response.json();
+      if (page.user !== copy.user) {
+        // The cursor belongs to another user's copy: start over from the beginning.
+        const restart = copy.cursor !== 0;
+        copy = emptyCopy(page.user);
+        if (restart) {
+          continue;
+        }
+      } else if (page.reset) {
+        copy = emptyCopy(page.user);
+      }
+      page.sessions.forEach((session) => {
+        copy.sessions[session.id] = session;
+      });
+      page.nutrition.forEach((entry) => {
+        copy.nutrition[entry.seq] = entry;
+      });
+      copy.cursor = page.cursor;
+      more = page.more;
+    }
+    writeCopy(copy);
+    synced = copy;
+    return copy;
+  }
+
+  // Calendar entries keyed by ISO date, shaped like /api/schedule answers.
+  function scheduleMap(copy) {
+    const byDate = {};
+    Object.values(copy.sessions).forEach((session) => {
+      (byDate[session.date] = byDate[session.date] || []).push(session);
+    });
+    const schedule = {};
+    Object.entries(byDate).forEach(([dateKey, sessions]) => {
+      sessions.sort((a, b) => (a.id < b.id ? 1 : a.id > b.id ? -1 : 0));
+      schedule[dateKey] = sessions.flatMap((session) =>
+        session.movements.map((movement) => ({
+          body_part: movement.body_part,
+          body_part_label: movement.body_part_label,
+          name: movement.name,
+          weight: movement.weight,
+          sets: movement.sets,
+          reps: movement.reps,
+          total_reps: movement.sets * movement.reps,
+          notes: movement.note || session.session_note,
+          session_note: session.session_note,
+          session_id: session.id,
+          calories_burned: session.calories_burned,
+          calories_target: session.calories_target,
+          protein_g: session.protein_g,
+          fat_g: session.fat_g,
+          carb_g: session.carb_g,
+        }))
+      );
+    });
+    return schedule;
+  }
+
+  window.ChangeFeed = {
+    // One sync per page load; later callers share it.  Resolves to the copy,
+    // or to null when the sync is skipped because the copy does not fit.
+    sync(url) {
+      pending = pending || pull(url);
+      return pending;
+    },
+    // The copy once a sync has finished, without waiting for one.
+    current() {
+      return synced;
+    },
+    scheduleMap,
+  };
+})();
@@ -0,0 +1,437 @@
+"""Durable storage for workout and nutrition records.
+
+Writes are expressed as records::
+
+    {"kind": "workouts", "entries": [...]}   # every movement of one session
+    {"kind": "nutrition", "entry": {...}}
+
+plus a ``"user"`` key on records that belong to a user other than the
+default one.
+
+Each backend assigns records a monotonically increasing ``seq`` and hands
+them, in batches, to an ``apply`` callback, which keeps the in-memory stores and indexes
+in step.  ``JournalStorage`` appends records to a JSONL journal and folds the
+journal into a compacted snapshot once it holds ``compact_after`` records and
+at least half as many records as the snapshot, so startup only reads one snapshot plus a
+short journal tail while compaction work stays linear in the data written.  Several worker processes
+may share one data directory: ``refresh`` picks up records written by the
+other workers.  Within a process the backends are safe to share between
+threads; ``apply`` is never called concurrently.
+"""
+
+import fcntl
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+Record = Dict
+ApplyFn = Callable[[List[Record]], None]
+
+SNAPSHOT_NAME = "snapshot.json"
+LOCK_NAME = ".lock"
+JOURNAL_NAME = re.compile(r"journal-(\d+)\.jsonl")
+# Snapshots are written with their generation as the first key; see _compact.
+_SNAPSHOT_HEAD = re.compile(rb'\{"generation":(\d+)')
+
+# Histories repeat the same few thousand dates; parse each once.
+_parse_date = lru_cache(maxsize=8192)(date.fromisoformat)
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode_entry(entry: Dict) -> Dict:
+    entry["date"] = _parse_date(entry["date"])
+    return entry
+
+
+# One encoder for every record: ``json.dumps`` with options builds a new one per call.
+_encoder = json.JSONEncoder(separators=(",", ":"), default=_json_default)
+
+
+def encode_record(record: Record) -> str:
+    return _encoder.encode(record)
+
+
+def _table_entries(record: Record) -> Tuple[str, List[Dict], int, Optional[str]]:
+    """The snapshot table, entries, seq and user of ``record``, copied before ``apply`` stamps them."""
+    entries = record["entries"] if record["kind"] == "workouts" else [record["entry"]]
+    return record["kind"], [dict(entry) for entry in entries], record["seq"], record.get("user")
+
+
+def decode_record(payload: Dict) -> Record:
+    if payload["kind"] == "workouts":
+        for entry in payload["entries"]:
+            _decode_entry(entry)
+    else:
+        _decode_entry(payload["entry"])
+    return payload
+
+
+class MemoryStorage:
+    """Keeps records for the lifetime of the process only."""
+
+    def __init__(self) -> None:
+        self.seq = 0
+        self._mutex = threading.Lock()
+
+    def load(self, apply: ApplyFn) -> None:
+        pass
+
+    def refresh(self, apply: ApplyFn) -> None:
+        pass
+
+    def append(self, records: List[Record], apply: ApplyFn, compact: bool = True) -> None:
+        with self._mutex:
+            for record in records:
+                self.seq += 1
+                record["seq"] = self.seq
+            apply(records)
+
+    def compact(self, apply: ApplyFn) -> None:
+        pass
+
+    def maybe_compact(self, apply: ApplyFn) -> None:
+        pass
+
+
+class JournalStorage:
+    """Append-only JSONL journal with periodically compacted snapshots.
+
+    ``snapshot.json`` holds every record up to its ``seq`` in a compact,
+    row-oriented layout; ``journal-<generation>.jsonl`` holds the records
+    written since.  Compaction writes generation ``n + 1`` and removes the old
+    journal while holding the exclusive lock, so readers under the shared lock
+    always see a consistent pair of files.  A compaction that crashes after
+    replacing the snapshot leaves the old journal behind; workers tell from
+    the snapshot's generation that it is stale, and the next compaction
+    removes it.
+    """
+
+    def __init__(self, data_dir: str, compact_after: int = 5000, fsync: bool = True) -> None:
+        self.data_dir = data_dir
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self.seq = 0
+        self.generation = 0
+        self._journal: Optional[BinaryIO] = None
+        self._offset = 0
+        self._journal_records = 0
+        # What compaction folds in for each record of the journal, so it does
+        # not have to parse back what this process has already read or written.
+        self._tail: List[Tuple[str, List[Dict], int, Optional[str]]] = []
+        self._snapshot_records = 0
+        # (inode, mtime) of the snapshot last known not to be ahead of our journal.
+        self._snapshot_stamp: Optional[Tuple[int, int]] = None
+        # flock() serializes processes; this serializes threads of this one.
+        self._mutex = threading.Lock()
+        os.makedirs(data_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------ #
+    # File layout
+    # ------------------------------------------------------------------ #
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.data_dir, name)
+
+    def _journal_path(self, generation: int) -> str:
+        return self._path(f"journal-{generation}.jsonl")
+
+    @contextmanager
+    def _locked(self, mode: int) -> Iterator[None]:
+        with self._mutex, open(self._path(LOCK_NAME), "a") as handle:
+            fcntl.flock(handle, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _stamp_snapshot(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._path(SNAPSHOT_NAME))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _snapshot_is_newer(self) -> bool:
+        """Whether a compaction has moved the snapshot past the journal we read.
+
+        Normally the journal disappearing says so, but a compaction that
+        crashed after replacing the snapshot leaves the old journal behind.
+        The snapshot's generation is only read when a stat shows it changed.
+        """
+        stamp = self._stamp_snapshot()
+        if stamp == self._snapshot_stamp:
+            return False
+        try:
+            with open(self._path(SNAPSHOT_NAME), "rb") as handle:
+                head = _SNAPSHOT_HEAD.match(handle.read(64))
+        except FileNotFoundError:
+            head = None
+        if head and int(head.group(1)) > self.generation:
+            return True
+        self._snapshot_stamp = stamp
+        return False
+
+    def _open_journal(self, generation: int) -> None:
+        if self._journal is not None:
+            self._journal.close()
+        path = self._journal_path(generation)
+        open(path, "a").close()
+        self.generation = generation
+        self._journal = open(path, "rb")
+        self._offset = 0
+        self._journal_records = 0
+        self._tail = []
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+
+    def load(self, apply: ApplyFn) -> None:
+        with self._locked(fcntl.LOCK_SH):
+            self._snapshot_stamp = self._stamp_snapshot()
+            snapshot = self._read_snapshot()
+            apply(list(_records_from_snapshot(snapshot)))
+            self.seq = snapshot["seq"]
+            self._snapshot_records = snapshot["records"]
+            self._open_journal(snapshot["generation"])
+            self._catch_up(apply)
+
+    def refresh(self, apply: ApplyFn) -> None:
+        """Apply records other processes appended since the last call."""
+        with self._mutex:
+            if not self._has_news():
+                return
+        with self._locked(fcntl.LOCK_SH):
+            self._catch_up(apply)
+
+    def _has_news(self) -> bool:
+        if os.fstat(self._journal.fileno()).st_size > self._offset:
+            return True
+        return not os.path.exists(self._journal_path(self.generation)) or self._snapshot_is_newer()
+
+    def _catch_up(self, apply: ApplyFn) -> None:
+        while True:
+            self._journal.seek(self._offset)
+            records = []
+            for line in self._journal:
+                if not line.endswith(b"\n"):
+                    break  # torn write from a crashed process
+                self._offset += len(line)
+                record = decode_record(json.loads(line))
+                self._journal_records += 1
+                self._tail.append(_table_entries(record))
+                if record["seq"] > self.seq:
+                    self.seq = record["seq"]
+                    records.append(record)
+            if records:
+                apply(records)
+            if os.path.exists(self._journal_path(self.generation)):
+                if not self._snapshot_is_newer():
+                    return
+            elif os.path.exists(self._journal_path(self.generation + 1)):
+                self._open_journal(self.generation + 1)
+                continue
+            # Compacted more than once since we last looked, or a compaction
+            # crashed before removing our journal: resume from the snapshot.
+            self._snapshot_stamp = self._stamp_snapshot()
+            snapshot = self._read_snapshot()
+            apply(list(_records_from_snapshot(snapshot, after_seq=self.seq)))
+            self.seq = max(self.seq, snapshot["seq"])
+            self._open_journal(snapshot["generation"])
+
+    def _read_snapshot(self) -> Dict:
+        try:
+            with open(self._path(SNAPSHOT_NAME), encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {"generation": 0, "seq": 0, "records": 0, "workouts": None, "nutrition": None}
+
+    # ------------------------------------------------------------------ #
+    # Writing
+    # ------------------------------------------------------------------ #
+
+    def append(self, records: List[Record], apply: ApplyFn, compact: bool = True) -> None:
+        """Durably append ``records`` (as one group commit) and apply them.
+
+        Bulk writers pass ``compact=False`` and call ``maybe_compact`` once at the end.
+        """
+        with self._locked(fcntl.LOCK_EX):
+            self._catch_up(apply)
+            lines = []
+            for record in records:
+                self.seq += 1
+                record["seq"] = self.seq
+                lines.append(encode_record(record) + "\n")
+                self._tail.append(_table_entries(record))
+            payload = "".join(lines).encode("utf-8")
+            with open(self._journal_path(self.generation), "r+b") as handle:
+                handle.truncate(self._offset)
+                handle.seek(self._offset)
+                handle.write(payload)
+                handle.flush()
+                if self.fsync:
+                    os.fsync(handle.fileno())
+            self._offset += len(payload)
+            self._journal_records += len(records)
+            apply(records)
+            if compact and self._should_compact():
+                self._compact()
+
+    def compact(self, apply: ApplyFn) -> None:
+        """Fold the journal into a new snapshot now."""
+        with self._locked(fcntl.LOCK_EX):
+            self._catch_up(apply)
+            if self._journal_records:
+                self._compact()
+
+    def maybe_compact(self, apply: ApplyFn) -> None:
+        """Fold the journal into a new snapshot if it has grown enough to be worth rewriting."""
+        with self._locked(fcntl.LOCK_EX):
+            self._catch_up(apply)
+            if self._should_compact():
+                self._compact()
+
+    def _should_compact(self) -> bool:
+        # Rewriting the snapshot only once the journal holds half as many
+        # records keeps compaction work linear in the data written.
+        return self._journal_records >= max(self.compact_after, self._snapshot_records // 2)
+
+    def _compact(self) -> None:
+        snapshot = self._read_snapshot()
+        seq = snapshot["seq"]
+        record_count = snapshot["records"]
+        tables = {
+            "workouts": _Table.from_snapshot(snapshot["workouts"]),
+            "nutrition": _Table.from_snapshot(snapshot["nutrition"]),
+        }
+        for kind, entries, seq, user in self._tail:
+            record_count += 1
+            tables[kind].extend(entries, seq, user)
+
+        generation = self.generation + 1
+        compacted = {
+            "generation": generation,  # first, so _snapshot_is_newer can read it alone
+            "seq": seq,
+            "records": record_count,
+            "workouts": tables["workouts"].to_snapshot(),
+            "nutrition": tables["nutrition"].to_snapshot(),
+        }
+        temp_path = self._path(SNAPSHOT_NAME + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            handle.write(_encoder.encode(compacted))
+            handle.flush()
+            if self.fsync:
+                os.fsync(handle.fileno())
+        os.replace(temp_path, self._path(SNAPSHOT_NAME))
+        self._snapshot_stamp = self._stamp_snapshot()
+        self._snapshot_records = record_count
+        self._open_journal(generation)
+        # The journal just folded in, and any a crashed compaction left behind.
+        for name in os.listdir(self.data_dir):
+            match = JOURNAL_NAME.fullmatch(name)
+            if match and int(match.group(1)) < generation:
+                os.remove(self._path(name))
+
+
+class _Table:
+    """Row-oriented table used inside snapshots: shared field names, list rows."""
+
+    def __init__(self, fields: List[str], rows: List[List]) -> None:
+        self.fields = fields
+        self.rows = rows
+        self._positions = {name: idx for idx, name in enumerate(fields)}
+        # Entries written by the same code share their key order: the row slots
+        # for each order, or None when they are the fields' own leading slots.
+        self._layouts: Dict[Tuple[str, ...], Optional[List[int]]] = {}
+
+    @classmethod
+    def from_snapshot(cls, payload: Optional[Dict]) -> "_Table":
+        if not payload:
+            return cls([], [])
+        return cls(payload["fields"], payload["rows"])
+
+    def _layout(self, names: Tuple[str, ...]) -> Optional[List[int]]:
+        if names in self._layouts:
+            return self._layouts[names]
+        for name in names:
+            if name not in self._positions:
+                self._positions[name] = len(self.fields)
+                self.fields.append(name)
+                for row in self.rows:
+                    row.append(None)
+        layout = [self._positions[name] for name in names]
+        self._layouts[names] = None if layout == list(range(len(names))) else layout
+        return self._layouts[names]
+
+    def extend(self, entries: List[Dict], seq: int, user: Optional[str] = None) -> None:
+        extra, tail = (("seq", "user"), (seq, user)) if user else (("seq",), (seq,))
+        for entry in entries:
+            layout = self._layout(tuple(entry) + extra)
+            width = len(self.fields)
+            if layout is None:
+                row = [*entry.values(), *tail]
+                if len(row) < width:
+                    row.extend([None] * (width - len(row)))
+            else:
+                row = [None] * width
+                for position, value in zip(layout, (*entry.values(), *tail)):
+                    row[position] = value
+            self.rows.append(row)
+
+    def to_snapshot(self) -> Dict:
+        return {"fields": self.fields, "rows": self.rows}
+
+
+def _records_from_snapshot(snapshot: Dict, after_seq: int = 0) -> Iterator[Record]:
+    """Rebuild records from a snapshot, skipping those up to ``after_seq``.
+
+    Workout rows come back as one record per user so each user's session
+    index can be built with one sort instead of one insert per session; each
+    entry keeps the ``seq`` it was written with.
+    """
+    workouts = snapshot.get("workouts")
+    if workouts and workouts["rows"]:
+        fields = workouts["fields"]
+        seq_at = fields.index("seq")
+        by_user: Dict[Optional[str], List[Dict]] = {}
+        for row in workouts["rows"]:
+            if row[seq_at] > after_seq:
+                entry = _decode_entry(dict(zip(fields, row)))
+                by_user.setdefault(entry.pop("user", None), []).append(entry)
+        for user, entries in by_user.items():
+            seq = max(entry["seq"] for entry in entries)
+            yield _with_user({"kind": "workouts", "entries": entries, "seq": seq}, user)
+    nutrition = snapshot.get("nutrition")
+    if nutrition and nutrition["rows"]:
+        fields = nutrition["fields"]
+        seq_at = fields.index("seq")
+        for row in nutrition["rows"]:
+            if row[seq_at] > after_seq:
+                entry = _decode_entry(dict(zip(fields, row)))
+                user = entry.pop("user", None)
+                yield _with_user({"kind": "nutrition", "entry": entry, "seq": entry.pop("seq")}, user)
+
+
+def _with_user(record: Record, user: Optional[str]) -> Record:
+    if user:
+        record["user"] = user
+    return record
+
+
+def open_storage(backend: str, data_dir: str) -> "MemoryStorage | JournalStorage":
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "journal":
+        return JournalStorage(data_dir)
+    raise ValueError(f"Unknown storage backend: {backend!r}")
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules live at the repository root, which is not a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MUSCLE_LOG_STORAGE", "memory")
+os.environ.setdefault("MUSCLE_LOG_TEMPLATE_CACHE", "")
+
+
+@pytest.fixture
+def flask_app():
+    """A fresh app on in-memory storage."""
+    import app
+
+    return app.create_app({"STORAGE_BACKEND": "memory", "TEMPLATE_CACHE_DIR": ""})
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
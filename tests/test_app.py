@@ -0,0 +1,237 @@
+"""Pages and APIs through the test client, on a fresh in-memory app per test."""
+
+import io
+import json
+import re
+from datetime import date, timedelta
+
+import app as muscle_log
+from benchmarks.synthetic import generate
+
+
+DAY = date(2024, 3, 1)
+
+
+def log_weight(client, day, weight):
+    response = client.post("/nutrition", data={"log_date": day.isoformat(), "log_weight": str(weight)})
+    assert response.status_code == 302
+
+
+def summary(flask_app, day):
+    with flask_app.test_request_context("/"):
+        return muscle_log.daily_summary(day)
+
+
+def test_daily_summary_uses_the_weight_as_of_its_date(flask_app, client):
+    log_weight(client, DAY, 80.0)
+    log_weight(client, DAY + timedelta(days=10), 90.0)
+    assert summary(flask_app, DAY + timedelta(days=5))["body_weight"] == 80.0
+    assert summary(flask_app, DAY + timedelta(days=5))["target"] == muscle_log._baseline_macros(80.0)
+    assert summary(flask_app, DAY + timedelta(days=12))["body_weight"] == 90.0
+
+    # A back-dated reading reaches the cached summaries of the days after it.
+    log_weight(client, DAY + timedelta(days=3), 85.0)
+    assert summary(flask_app, DAY + timedelta(days=5))["body_weight"] == 85.0
+    assert summary(flask_app, DAY + timedelta(days=2))["body_weight"] == 80.0
+
+
+def test_pages_revalidate_until_a_write_changes_the_etag(client):
+    first = client.get("/dashboard")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert "X-Muscle-Log-User" in first.headers["Vary"]
+
+    again = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.get_data() == b""
+    assert again.headers["ETag"] == etag
+
+    log_weight(client, DAY, 80.0)
+    changed = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert client.get("/dashboard", headers={"If-None-Match": changed.headers["ETag"]}).status_code == 304
+
+
+def test_etags_follow_the_requesting_users_data(client):
+    other = {"X-Muscle-Log-User": "other"}
+    etag = client.get("/analytics", headers=other).headers["ETag"]
+    log_weight(client, DAY, 80.0)
+    assert client.get("/analytics", headers={**other, "If-None-Match": etag}).status_code == 304
+
+
+def test_per_day_pages_change_etag_with_the_date(client, monkeypatch):
+    response = client.get("/")
+    etag = response.headers["ETag"]
+    assert response.get_etag()[0].endswith(date.today().isoformat())
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(muscle_log, "date", Tomorrow)
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_dashboard_timeline_pages_through_every_training_day(client):
+    rows = generate(years=90 / 365, end=DAY)
+    body = "".join(json.dumps(row) + "\n" for row in rows)
+    assert client.post("/api/import?format=jsonl", data=body).get_json()["error_count"] == 0
+    with client.application.test_request_context("/"):
+        training_days = sorted(muscle_log.stores().session_index.sessions_by_date(), reverse=True)
+
+    seen, url = [], "/dashboard/timeline"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(re.findall(r'timeline-date-label">(\d{4}-\d{2}-\d{2})<', response.get_data(as_text=True)))
+        url = response.headers.get("X-Next-Page")
+    assert seen == [day.isoformat() for day in training_days]
+    assert len(seen) > muscle_log.TIMELINE_DAYS_PER_PAGE
+
+
+def test_malformed_timeline_cursors_are_rejected(client):
+    for cursor in ("nonsense", "2024-13-01:abc", "2024-03-01"):
+        assert client.get(f"/dashboard/timeline?cursor={cursor}").status_code == 400
+
+
+def import_sessions(client, *sessions):
+    rows = [
+        {
+            "type": "session",
+            "date": day.isoformat(),
+            "body_weight": 80,
+            "movements": [
+                {"body_part": "legs", "exercise": exercise, "sets": sets, "reps": reps, "weight": weight}
+                for exercise, sets, reps, weight in movements
+            ],
+        }
+        for day, movements in sessions
+    ]
+    body = "".join(json.dumps(row) + "\n" for row in rows)
+    assert client.post("/api/import?format=jsonl", data=body).get_json()["error_count"] == 0
+
+
+def test_analytics_series_aggregates_per_day_on_the_server(client):
+    import_sessions(
+        client,
+        (DAY, [("Back Squat", 3, 5, 100), ("Back Squat", 2, 3, 110), ("Leg Press", 3, 10, 150)]),
+        (DAY, [("Back Squat", 1, 8, 100)]),
+        (DAY + timedelta(days=2), [("Back Squat", 3, 5, 105)]),
+    )
+    query = "body_part=legs&exercise=Back+Squat&exercise=Leg+Press&exercise=Unknown"
+
+    top = client.get(f"/api/analytics/series?{query}").get_json()
+    assert top["labels"] == [DAY.isoformat(), (DAY + timedelta(days=2)).isoformat()]
+    assert top["series"] == [
+        {"exercise": "Back Squat", "data": [110.0, 105.0]},
+        {"exercise": "Leg Press", "data": [150.0, None]},
+    ]
+
+    # At one load: the day's reps at exactly that weight, across sessions.
+    at_load = client.get(f"/api/analytics/series?{query}&weight=100").get_json()
+    assert at_load == {"labels": [DAY.isoformat()], "series": [{"exercise": "Back Squat", "data": [3 * 5 + 8]}]}
+    assert client.get(f"/api/analytics/weights?{query}").get_json() == {"weights": [100.0, 105.0, 110.0, 150.0]}
+
+
+def test_schedule_api_returns_only_the_requested_window(client):
+    import_sessions(
+        client,
+        (DAY - timedelta(days=1), [("Leg Press", 3, 10, 150)]),
+        (DAY, [("Back Squat", 3, 5, 100)]),
+        (DAY + timedelta(days=6), [("Back Squat", 3, 5, 105), ("Leg Press", 2, 12, 140)]),
+        (DAY + timedelta(days=7), [("Leg Press", 3, 10, 150)]),
+    )
+    first, last = DAY.isoformat(), (DAY + timedelta(days=6)).isoformat()
+    schedule = client.get(f"/api/schedule?from={first}&to={last}").get_json()
+    assert list(schedule) == [first, last]
+    assert [(item["name"], item["weight"]) for item in schedule[last]] == [("Back Squat", 105.0), ("Leg Press", 140.0)]
+
+    # Without a window: the month 'from' falls in.
+    month = client.get(f"/api/schedule?from={DAY.replace(day=1).isoformat()}").get_json()
+    assert list(month) == [(DAY + timedelta(days=offset)).isoformat() for offset in (0, 6, 7)]
+
+    assert client.get(f"/api/schedule?from={last}&to={first}").status_code == 400
+    too_long = (DAY + timedelta(days=muscle_log.MAX_SCHEDULE_WINDOW_DAYS)).isoformat()
+    assert client.get(f"/api/schedule?from={first}&to={too_long}").status_code == 400
+
+
+def test_progression_api_reports_records_by_exercise_id(client):
+    import_sessions(
+        client,
+        (DAY, [("Back Squat", 3, 5, 100)]),
+        (DAY + timedelta(days=7), [("Back Squat", 1, 1, 120), ("Leg Press", 3, 10, 150)]),
+    )
+    records = client.get("/api/progression").get_json()
+    assert list(records) == ["Back Squat", "Leg Press"]
+    assert records["Back Squat"]["heaviest_weight"] == {"value": 120.0, "date": "2024-03-08", "sets": 1, "reps": 1}
+
+    detail = client.get("/api/progression/back-squat?window=5").get_json()
+    assert (detail["exercise"], detail["id"]) == ("Back Squat", "back-squat")
+    assert [point["date"] for point in detail["recent"]] == ["2024-03-01", "2024-03-08"]
+    assert detail["trend"]["e1rm_change"] == round(120 * (1 + 1 / 30) - 100 * (1 + 5 / 30), 1)
+    assert client.get("/api/progression/romanian-deadlift").status_code == 404
+    assert client.get("/api/progression/no-such-exercise").status_code == 404
+
+
+def test_changes_feed_pages_from_a_cursor_without_gaps_or_repeats(client):
+    import_sessions(client, *[(DAY + timedelta(days=day), [("Back Squat", 3, 5, 100 + day)]) for day in range(5)])
+    for day in range(4):
+        log_weight(client, DAY + timedelta(days=day), 80.0 + day)
+
+    first = client.get("/api/changes").get_json()
+    assert (first["user"], first["more"], first["reset"]) == (muscle_log.DEFAULT_USER, False, False)
+    assert first["cursor"] == first["version"]
+    everything = [item["seq"] for item in first["sessions"] + first["nutrition"]]
+    assert len(everything) == 9
+
+    seen, cursor, more = [], 0, True
+    while more:
+        page = client.get(f"/api/changes?since={cursor}&limit=2").get_json()
+        assert len(page["sessions"]) + len(page["nutrition"]) <= 2
+        seen.extend(item["seq"] for item in page["sessions"] + page["nutrition"])
+        cursor, more = page["cursor"], page["more"]
+    assert seen == sorted(everything)
+
+    # Only what was written after the cursor; a cursor from another dataset starts over.
+    log_weight(client, DAY, 79.0)
+    latest = client.get(f"/api/changes?since={cursor}").get_json()
+    assert [(item["date"], item["weight"]) for item in latest["nutrition"]] == [(DAY.isoformat(), 79.0)]
+    assert latest["sessions"] == []
+    reset = client.get(f"/api/changes?since={latest['version'] + 100}").get_json()
+    assert reset["reset"] and len(reset["sessions"]) + len(reset["nutrition"]) == 10
+
+    other = client.get("/api/changes", headers={"X-Muscle-Log-User": "other"}).get_json()
+    assert (other["user"], other["sessions"], other["nutrition"]) == ("other", [], [])
+
+
+def test_each_user_reads_and_writes_only_their_own_partition(flask_app, client):
+    ana = {"X-Muscle-Log-User": "ana"}
+    body = "".join(json.dumps(row) + "\n" for row in generate(years=20 / 365, end=DAY))
+    imported = client.post("/api/import?format=jsonl", data=body, headers=ana).get_json()
+    assert imported["error_count"] == 0
+
+    window = f"/api/schedule?from={(DAY - timedelta(days=30)).isoformat()}&to={DAY.isoformat()}"
+    assert client.get(window, headers=ana).get_json()
+    assert client.get(window).get_json() == {}
+    assert client.get(window, headers={"X-Muscle-Log-User": "bo"}).get_json() == {}
+    assert client.get("/api/export", headers={"X-Muscle-Log-User": "bo"}).get_data() == b""
+    with flask_app.app_context():
+        # Reading as a user with no data does not create a partition for them.
+        assert [user for user, _ in muscle_log.partitions().items()] == ["ana"]
+
+    # Without a user to act for, rows go to the user their own column names.
+    rows = [
+        {"type": "nutrition", "date": DAY.isoformat(), "calories": 100, "user": "bo"},
+        {"type": "nutrition", "date": DAY.isoformat(), "calories": 200},
+        {"type": "nutrition", "date": DAY.isoformat(), "calories": 300, "user": "not a name"},
+    ]
+    with flask_app.app_context():
+        report = muscle_log.run_import(io.StringIO("".join(json.dumps(row) + "\n" for row in rows)), "jsonl")
+    assert report["nutrition"] == 2
+    assert "Malformed user name" in report["errors"][0]["error"]
+    for headers, calories in (({"X-Muscle-Log-User": "bo"}, 100.0), ({}, 200.0)):
+        feed = client.get("/api/changes", headers=headers).get_json()
+        assert [item["calories"] for item in feed["nutrition"]] == [calories]
@@ -0,0 +1,68 @@
+"""The synthetic history generator and short runs of the benchmark harnesses."""
+
+import io
+import json
+import os
+from datetime import date
+
+import app as muscle_log
+from benchmarks import bench_import, bench_suite, load_test
+from benchmarks.synthetic import generate
+from bulk import write_rows
+
+END = date(2024, 6, 30)
+
+
+def test_synthetic_histories_are_reproducible_and_importable(flask_app):
+    rows = list(generate(years=30 / 365, users=2, end=END))
+    assert rows == list(generate(years=30 / 365, users=2, end=END))
+    assert rows != list(generate(years=30 / 365, users=2, seed=8, end=END))
+    assert {row["user"] for row in rows} == {"user-0", "user-1"}
+    assert all("user" not in row for row in generate(years=30 / 365, end=END))
+    assert {row["type"] for row in rows} == {"session", "nutrition"}
+    assert min(row["date"] for row in rows) >= "2024-06-01" and max(row["date"] for row in rows) <= END.isoformat()
+
+    for fmt in ("jsonl", "csv"):
+        text = "".join(write_rows(rows, fmt))
+        with flask_app.app_context():
+            report = muscle_log.run_import(io.StringIO(text, newline=""), fmt)
+        assert report["error_count"] == 0, report["errors"][:3]
+        assert report["rows"] == len(rows)
+
+
+
+def test_bench_suite_writes_results_and_compares_runs(flask_app, monkeypatch, tmp_path, capsys):
+    # The suite runs against the default app; give it a fresh one so other tests never see its data.
+    monkeypatch.setattr(muscle_log, "_default_app", flask_app)
+    out = tmp_path / "results.json"
+    args = ["--years", "0.1", "--end", END.isoformat(), "--repeat", "2"]
+    assert bench_suite.main(args + ["--out", str(out)]) == 0
+    results = json.loads(out.read_text())
+    assert results["meta"]["dataset"]["rows"] > 0
+    assert any(name.startswith("route:") for name in results["results"])
+    assert all(timing["runs"] == 2 and timing["median_ms"] > 0 for timing in results["results"].values())
+    printed = capsys.readouterr().out
+    assert all(name in printed for name in results["results"])
+
+    assert bench_suite.main(args + ["--compare", str(out), "--threshold", "100"]) == 0
+
+
+def test_load_test_drives_every_route_of_a_started_server(tmp_path, capsys):
+    # Budgets far above any machine's latency: this checks the harness, not the timings.
+    budgets = [arg for name in load_test.MIX for arg in ("--budget", f"{name}=60000")]
+    argv = ["--users", "2", "--seconds", "1", "--seed-years", "0.05", "--data-dir", str(tmp_path)] + budgets
+    assert load_test.main(argv) == 0
+    printed = capsys.readouterr().out
+    assert printed.startswith("seeded ")
+    for name in load_test.MIX:
+        row = next(line for line in printed.splitlines() if line.startswith(f"{name} "))
+        requests, errors = int(row.split()[1]), int(row.split()[-1])
+        assert requests > 0 and errors == 0, row
+    assert any(name.startswith("journal-") for name in os.listdir(tmp_path))
+
+
+def test_bench_import_reports_rows_per_second_for_each_backend(capsys):
+    assert bench_import.main(["--years", "0.1", "--runs", "1", "--target", "0"]) == 0
+    printed = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in printed] == ["memory", "journal"]
+    assert bench_import.main(["--years", "0.1", "--runs", "1", "--backends", "memory", "--target", "1e12"]) == 1
@@ -0,0 +1,162 @@
+"""Bulk import and export through ``/api/import`` and ``/api/export``."""
+
+import gzip
+import json
+from datetime import date
+
+import app
+from benchmarks.synthetic import generate
+
+
+def jsonl(*rows):
+    return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+
+def session_row(day="2024-03-01", **movement):
+    return {
+        "type": "session",
+        "date": day,
+        "body_weight": 80,
+        "movements": [{"body_part": "legs", "exercise": "Back Squat", "sets": 3, "reps": 5, "weight": 100, **movement}],
+    }
+
+
+def nutrition_row(day="2024-03-01", calories=2000):
+    return {"type": "nutrition", "date": day, "calories": calories}
+
+
+def import_body(client, body, fmt="jsonl"):
+    response = client.post(f"/api/import?format={fmt}", data=body)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_overflowing_numbers_are_row_errors(client):
+    report = import_body(client, jsonl(nutrition_row(), session_row(sets=1e400), session_row(reps=1e400), nutrition_row()))
+    assert report["nutrition"] == 2
+    assert report["sessions"] == 0
+    assert [error["line"] for error in report["errors"]] == [2, 3]
+    assert "numeric field" in report["errors"][0]["error"]
+
+
+def test_bad_rows_are_reported_by_line_and_the_rest_imported(client):
+    body = (
+        jsonl(nutrition_row())
+        + b'{"type": "nutrition", "date": "2024-03-02", "notes": "caf\xe9"}\n'
+        + jsonl(
+            nutrition_row(day="2024-02-30"),
+            session_row(exercise="Bench Press"),
+            session_row(body_part="wings"),
+            {"type": "meal", "date": "2024-03-01"},
+        )
+        + b"not json\n"
+        + jsonl(session_row(day="2024-03-03"))
+    )
+    report = import_body(client, body)
+    assert report["rows"] == 8
+    assert (report["sessions"], report["movements"], report["nutrition"]) == (1, 1, 1)
+    assert report["error_count"] == 6
+    errors = {error["line"]: error["error"] for error in report["errors"]}
+    assert errors[2] == "Line is not valid UTF-8."
+    assert "Invalid date '2024-02-30'" in errors[3]
+    assert "invalid body part / exercise" in errors[4]
+    assert "invalid body part / exercise" in errors[5]
+    assert "Unknown row type 'meal'" in errors[6]
+    assert errors[7].startswith("Invalid JSON")
+
+
+def test_csv_rows_with_undecodable_bytes_are_row_errors(client):
+    body = (
+        b"type,date,session,body_weight,body_part,exercise,sets,reps,weight,calories\n"
+        b"session,2024-03-01,a,80,legs,Back Squat,3,5,100,\n"
+        b"nutrition,2024-03-01,,,,,,,,2000\xff\n"
+        b"session,2024-03-01,a,80,legs,Leg Press,3,10,150,\n"
+        b"session,not-a-date,b,80,legs,Leg Press,3,10,150,\n"
+    )
+    report = import_body(client, body, fmt="csv")
+    assert (report["sessions"], report["movements"], report["nutrition"]) == (2, 2, 0)
+    assert [(error["line"], error["error"][:12]) for error in report["errors"]] == [
+        (3, "Line is not "),
+        (5, "Invalid date"),
+    ]
+
+
+def synthetic_body(days=60):
+    return jsonl(*generate(years=days / 365, end=date(2024, 6, 30)))
+
+
+def exported(client, fmt="jsonl"):
+    response = client.get(f"/api/export?format={fmt}")
+    assert response.status_code == 200
+    return response.get_data()
+
+
+def comparable(body):
+    """Exported JSONL rows without the session ids, which a re-import assigns afresh."""
+    rows = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    for row in rows:
+        row.pop("session", None)
+    return sorted(rows, key=lambda row: json.dumps(row, sort_keys=True))
+
+
+def fresh_client():
+    return app.create_app({"STORAGE_BACKEND": "memory", "TEMPLATE_CACHE_DIR": ""}).test_client()
+
+
+def test_export_imports_back_to_the_same_history(client):
+    report = import_body(client, synthetic_body())
+    assert report["error_count"] == 0 and report["sessions"] and report["nutrition"]
+    original = exported(client)
+
+    for fmt in ("jsonl", "csv"):
+        copy = fresh_client()
+        again = import_body(copy, exported(client, fmt), fmt=fmt)
+        assert again["error_count"] == 0
+        assert (again["sessions"], again["movements"], again["nutrition"]) == (
+            report["sessions"],
+            report["movements"],
+            report["nutrition"],
+        )
+        assert comparable(exported(copy)) == comparable(original)
+
+
+def test_export_is_gzipped_when_the_client_accepts_it(client):
+    import_body(client, synthetic_body())
+    for fmt in ("jsonl", "csv"):
+        plain = client.get(f"/api/export?format={fmt}")
+        assert "Content-Encoding" not in plain.headers
+        packed = client.get(f"/api/export?format={fmt}", headers={"Accept-Encoding": "gzip"})
+        assert packed.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in packed.headers["Vary"]
+        assert gzip.decompress(packed.get_data()) == plain.get_data()
+
+
+def test_both_copies_of_the_stores_agree_after_imports(client, flask_app):
+    # The second import lands on buckets the first one created.
+    import_body(client, synthetic_body(days=40))
+    import_body(client, jsonl(*generate(years=40 / 365, seed=8, end=date(2024, 7, 20))))
+    with flask_app.app_context():
+        first, second = app.partitions().get(app.DEFAULT_USER).copies
+
+    def rollups(stores):
+        queries = [
+            stores.exercise_rollups.query(name, resolution=resolution)
+            for name in sorted(stores.exercise_rollups._buckets)
+            for resolution in ("day", "week", "month", "year")
+        ]
+        queries += [
+            stores.nutrition_rollups.query(macro, resolution=resolution)
+            for macro in ("calories", "protein", "fat", "carb")
+            for resolution in ("day", "week", "month", "year")
+        ]
+        return queries
+
+    assert rollups(first) == rollups(second)
+
+    def movements(stores):
+        return [
+            (movement.session.id, movement.name, movement.weight, movement.sets, movement.reps)
+            for movement in stores.workouts
+        ]
+
+    assert movements(first) == movements(second)
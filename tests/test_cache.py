@@ -0,0 +1,73 @@
+"""Fragment cache: per-date tags, LRU eviction, and the stores' invalidation on writes."""
+
+from datetime import date, datetime, timedelta, timezone
+
+from app import WEIGHT_TAG, Stores
+from cache import FragmentCache
+
+
+DAY = date(2024, 3, 1)
+
+
+def days(start, count):
+    return [start + timedelta(days=offset) for offset in range(count)]
+
+
+class Computes:
+    """A fragment computation that counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_invalidating_a_date_drops_only_the_fragments_covering_it():
+    cache = FragmentCache()
+    march, april, day = Computes(), Computes(), Computes()
+    cache.get_or_compute("march", march, tags=days(DAY, 31))
+    cache.get_or_compute("april", april, tags=days(date(2024, 4, 1), 30))
+    cache.get_or_compute("day", day, tags=(DAY + timedelta(days=9),))
+
+    cache.invalidate([DAY + timedelta(days=9)])
+    assert len(cache) == 1
+    for key, compute in (("march", march), ("april", april), ("day", day)):
+        cache.get_or_compute(key, compute, tags=())
+    assert (march.calls, april.calls, day.calls) == (2, 1, 2)
+    assert cache.stats()["invalidations"] == 2
+
+    cache.invalidate([date(2023, 1, 1)])
+    assert len(cache) == 3
+
+
+def test_eviction_forgets_the_evicted_fragments_tags():
+    cache = FragmentCache(max_entries=2)
+    for index, day in enumerate(days(DAY, 3)):
+        cache.get_or_compute(index, Computes(), tags=(day,))
+    assert cache.stats()["evictions"] == 1
+    assert DAY not in cache._by_tag
+    cache.invalidate([DAY])
+    assert cache.stats()["invalidations"] == 0
+
+
+def nutrition(seq, day, weight=None):
+    return {"kind": "nutrition", "seq": seq, "entry": {"date": day, "calories": 2000.0, "weight": weight}}
+
+
+def test_writes_invalidate_the_dates_they_touch():
+    stores = Stores()
+    modified = datetime.now(timezone.utc)
+    stores.apply([nutrition(1, DAY)], modified)
+    first, second, weighted = Computes(), Computes(), Computes()
+    stores.fragments.get_or_compute("first", first, tags=(DAY,))
+    stores.fragments.get_or_compute("second", second, tags=(DAY + timedelta(days=1),))
+    stores.fragments.get_or_compute("weighted", weighted, tags=(DAY + timedelta(days=2), WEIGHT_TAG))
+
+    stores.apply([nutrition(2, DAY + timedelta(days=1))], modified)
+    assert set(stores.fragments._entries) == {"first", "weighted"}
+
+    # A new weight reading reaches every fragment that depends on weights.
+    stores.apply([nutrition(3, DAY + timedelta(days=20), weight=80.0)], modified)
+    assert set(stores.fragments._entries) == {"first"}
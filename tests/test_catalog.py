@@ -0,0 +1,78 @@
+"""Catalog lookups, validation of the data file and hot reload."""
+
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from catalog import CatalogError, CatalogFile, compile_catalog
+
+
+NOW = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+PAYLOAD = {
+    "body_parts": {
+        "legs": {"label": "Legs", "color": "#1b4332", "exercises": ["Back Squat", "Romanian Deadlift"]},
+        "back": {"label": "Back", "exercises": ["Deadlift", "Romanian Deadlift"]},
+    }
+}
+
+
+def test_reverse_lookups_and_completion():
+    catalog = compile_catalog(PAYLOAD, "v1", NOW)
+    assert catalog.has_exercise("legs", "Back Squat")
+    assert not catalog.has_exercise("back", "Back Squat")
+    assert catalog.body_parts_for("Romanian Deadlift") == ("legs", "back")
+    assert catalog.body_parts_for("Curl") == ()
+    assert catalog.exercise_id("Romanian Deadlift") == "romanian-deadlift"
+    assert catalog.exercise_name("romanian-deadlift") == "Romanian Deadlift"
+    assert catalog.exercise_name("curl") is None
+    assert catalog.label("back") == "Back"
+
+    # A prefix of the name or of any later word, case and spacing ignored.
+    assert catalog.complete("dead") == ["Deadlift", "Romanian Deadlift"]
+    assert catalog.complete("  ROMANIAN   d") == ["Romanian Deadlift"]
+    assert catalog.complete("dead", limit=1) == ["Deadlift"]
+    assert catalog.complete("") == []
+
+    exported = json.loads(catalog.json)
+    assert exported["exercises"]["romanian-deadlift"] == {"name": "Romanian Deadlift", "body_parts": ["legs", "back"]}
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {},
+        {"body_parts": {"legs": {"exercises": ["Squat"]}}},
+        {"body_parts": {"legs": {"label": "Legs", "exercises": "Squat"}}},
+        {"body_parts": {"legs": {"label": "Legs", "exercises": ["Squat", " Squat "]}}},
+        {"body_parts": {"legs": {"label": "Legs", "exercises": ["Leg-Press", "Leg Press"]}}},
+    ],
+)
+def test_malformed_catalogs_are_refused(payload):
+    with pytest.raises(CatalogError):
+        compile_catalog(payload, "v1", NOW)
+
+
+def write(path, payload, mtime):
+    path.write_text(json.dumps(payload) if isinstance(payload, dict) else payload)
+    os.utime(path, (mtime, mtime))
+
+
+def test_file_reloads_on_change_and_keeps_the_last_good_catalog(tmp_path):
+    path = tmp_path / "catalog.json"
+    write(path, PAYLOAD, 1_000)
+    catalogs = CatalogFile(str(path), check_interval=0)
+    first = catalogs.current
+    assert catalogs.refresh() is first
+
+    extended = json.loads(json.dumps(PAYLOAD))
+    extended["body_parts"]["legs"]["exercises"].append("Leg Press")
+    write(path, extended, 2_000)
+    second = catalogs.refresh()
+    assert second.has_exercise("legs", "Leg Press") and not first.has_exercise("legs", "Leg Press")
+    assert second.version != first.version
+
+    write(path, "{not json", 3_000)
+    assert catalogs.refresh() is second
@@ -0,0 +1,86 @@
+"""Columnar kernels checked against plain loops over the movement entries."""
+
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+import columnar
+from columnar import ColumnarWorkouts, epley_1rm
+
+
+EXERCISES = {"legs": ["Back Squat", "Leg Press"], "chest": ["Bench Press"], "back": ["Deadlift", "Row"]}
+
+
+def entries(count=500, seed=3):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    rows = []
+    for _ in range(count):
+        body_part = rng.choice(sorted(EXERCISES))
+        rows.append(
+            {
+                "date": start + timedelta(days=rng.randrange(120)),
+                "body_part": body_part,
+                "name": rng.choice(EXERCISES[body_part]),
+                "weight": float(rng.randrange(0, 200, 5)),
+                "sets": rng.randint(1, 5),
+                "reps": rng.randint(0, 12),
+            }
+        )
+    return rows
+
+
+@pytest.fixture(params=["numpy", "loops"])
+def kernels(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(columnar, "np", None)
+    return request.param
+
+
+def test_kernels_match_loops_over_the_entries(kernels):
+    rows = entries()
+    columns = ColumnarWorkouts()
+    columns.add_entries(rows[:200])
+    columns.add_entries(rows[200:])
+
+    volume = defaultdict(float)
+    best = defaultdict(float)
+    sets = defaultdict(int)
+    for entry in rows:
+        volume[entry["name"]] += entry["weight"] * entry["sets"] * entry["reps"]
+        best[entry["name"]] = max(best[entry["name"]], epley_1rm(entry["weight"], entry["reps"]))
+        sets[entry["body_part"]] += entry["sets"]
+    assert columns.exercise_volume() == {name: round(total, 1) for name, total in volume.items()}
+    assert columns.estimated_1rm() == {name: round(value, 1) for name, value in best.items()}
+    distribution = columns.body_part_distribution()
+    assert {name: share["sets"] for name, share in distribution.items()} == sets
+    assert sum(share["share"] for share in distribution.values()) == pytest.approx(1, abs=1e-3)
+
+    start, end = date(2024, 2, 1), date(2024, 3, 15)
+    weekly = defaultdict(float)
+    for entry in rows:
+        if start <= entry["date"] <= end:
+            weekly[entry["date"] - timedelta(days=entry["date"].weekday())] += (
+                entry["weight"] * entry["sets"] * entry["reps"]
+            )
+    expected = {week: round(total, 1) for week, total in sorted(weekly.items()) if total}
+    assert columns.weekly_tonnage(start, end) == expected
+    assert all(week.weekday() == 0 for week in columns.weekly_tonnage())
+
+
+def test_empty_stores_and_independent_copies(kernels):
+    columns = ColumnarWorkouts()
+    assert columns.exercise_volume() == {}
+    assert columns.weekly_tonnage() == {}
+    assert columns.body_part_distribution() == {}
+
+    columns.add_entries(entries(10))
+    before = columns.exercise_volume()
+    clone = columns.copy()
+    clone.add_entries(entries(5, seed=4))
+    assert (len(columns), len(clone)) == (10, 15)
+    assert columns.exercise_volume() == before
@@ -0,0 +1,97 @@
+"""Left-right stores: whole batches only, pinned copies left alone, and the app under parallel load."""
+
+import threading
+import time
+
+import pytest
+
+from benchmarks import stress_concurrency
+from concurrency import LeftRight
+
+
+BATCH = 5
+BATCHES = 100
+
+
+def test_readers_never_see_a_half_applied_batch():
+    pair = LeftRight(list)
+    stop = threading.Event()
+    failures = []
+
+    def write():
+        for batch in range(BATCHES):
+            def change(items, batch=batch):
+                for _ in range(BATCH):
+                    items.append(batch)
+                    time.sleep(0)  # give readers every chance to look mid-batch
+
+            pair.write(change)
+        stop.set()
+
+    def read():
+        seen = 0
+        while not stop.is_set():
+            with pair.read() as items:
+                count = len(items)
+                expected = [batch for batch in range(count // BATCH) for _ in range(BATCH)]
+                if count % BATCH or count < seen or items != expected:
+                    failures.append(list(items))
+                    return
+                seen = count
+            time.sleep(0)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not failures
+    with pair.read() as items:
+        assert len(items) == BATCHES * BATCH
+
+
+def test_writer_replays_onto_a_pinned_copy_only_after_release():
+    pair = LeftRight(list)
+    pair.write(lambda items: items.append(1))
+    slot = pair.acquire()
+    pinned = pair.copy(slot)
+
+    written = threading.Event()
+
+    def write():
+        pair.write(lambda items: items.append(2))
+        written.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    assert not written.wait(0.2)
+    assert pinned == [1]
+    # New readers already get the published copy with the write in it.
+    with pair.read() as current:
+        assert current == [1, 2]
+
+    pair.release(slot)
+    assert written.wait(5)
+    writer.join()
+    assert pinned == [1, 2]
+
+
+def test_write_while_pinned_is_refused():
+    pair = LeftRight(list)
+    with pair.read():
+        with pytest.raises(RuntimeError):
+            pair.write(lambda items: items.append(1))
+
+
+def test_loads_reach_the_standby_copy_on_settle():
+    pair = LeftRight(list)
+    pair.load(lambda items: items.extend([1, 2]))
+    assert pair.active == [1, 2]
+    assert [len(copy) for copy in pair.copies] in ([2, 0], [0, 2])
+    pair.settle()
+    assert pair.copies == ([1, 2], [1, 2])
+
+
+def test_stores_stay_consistent_under_parallel_writers_and_readers(capsys):
+    assert stress_concurrency.main(["--writers", "2", "--readers", "4", "--seconds", "1"]) == 0
+    assert "consistent" in capsys.readouterr().out
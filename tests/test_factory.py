@@ -0,0 +1,42 @@
+"""The app factory: independent apps, lazily opened storage and the template cache."""
+
+import os
+
+import app as muscle_log
+
+
+def journal_app(data_dir, **config):
+    return muscle_log.create_app(
+        {"STORAGE_BACKEND": "journal", "DATA_DIR": str(data_dir), "TEMPLATE_CACHE_DIR": "", **config}
+    )
+
+
+def test_storage_opens_on_first_use_and_apps_keep_their_own_data(tmp_path):
+    data_dir = tmp_path / "data"
+    client = journal_app(data_dir).test_client()
+    assert not data_dir.exists()
+    # The first request opens it.
+    assert client.get("/api/catalog").status_code == 200
+    assert data_dir.exists()
+
+    response = client.post("/nutrition", data={"log_date": "2024-03-01", "log_weight": "80"})
+    assert response.status_code == 302
+
+    # A second app on the same directory loads what the first wrote; one on memory storage sees nothing.
+    reopened = journal_app(data_dir).test_client().get("/api/changes").get_json()
+    assert [item["weight"] for item in reopened["nutrition"]] == [80.0]
+    memory = muscle_log.create_app({"STORAGE_BACKEND": "memory", "TEMPLATE_CACHE_DIR": ""})
+    assert memory.test_client().get("/api/changes").get_json()["nutrition"] == []
+
+
+def test_compile_templates_fills_the_bytecode_cache(tmp_path):
+    cache_dir = tmp_path / "templates"
+    flask_app = journal_app(tmp_path / "data", TEMPLATE_CACHE_DIR=str(cache_dir))
+    result = flask_app.test_cli_runner().invoke(args=["compile-templates"])
+    assert result.exit_code == 0, result.output
+    assert len(os.listdir(cache_dir)) == len(flask_app.jinja_env.list_templates())
+    assert not (tmp_path / "data").exists()
+
+    uncached = journal_app(tmp_path / "data").test_cli_runner().invoke(args=["compile-templates"])
+    assert uncached.exit_code != 0
+    assert "No template cache directory" in uncached.output
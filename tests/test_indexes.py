@@ -0,0 +1,367 @@
+"""Indexes checked against the plain scans they replace."""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from columnar import epley_1rm
+from indexes import (
+    MACROS,
+    RESOLUTIONS,
+    DailySummaryTable,
+    NutritionLedger,
+    ProgressionIndex,
+    SessionIndex,
+    TimeSeriesRollups,
+    WeightTimeline,
+    bucket_start,
+    pick_resolution,
+)
+from models import Session
+
+
+DAY = date(2024, 3, 1)
+
+
+def session(day, sid, weight):
+    return Session(id=sid, date=day, body_weight=weight)
+
+
+def test_weight_as_of_takes_the_latest_reading_up_to_the_day():
+    timeline = WeightTimeline()
+    timeline.add_logs([{"date": DAY, "weight": 80.0}, {"date": DAY + timedelta(days=10), "weight": 78.0}])
+    assert timeline.as_of(DAY - timedelta(days=1)) == 70.0
+    assert timeline.as_of(DAY) == 80.0
+    assert timeline.as_of(DAY + timedelta(days=9)) == 80.0
+    assert timeline.as_of(DAY + timedelta(days=10)) == 78.0
+    assert timeline.as_of(DAY + timedelta(days=400)) == timeline.latest() == 78.0
+
+    # Session weights win over logs, as they do for ``latest``.
+    timeline.add_sessions([session(DAY + timedelta(days=5), "s1", 82.0)])
+    assert timeline.as_of(DAY + timedelta(days=4)) == 80.0
+    assert timeline.as_of(DAY + timedelta(days=5)) == 82.0
+    assert timeline.as_of(DAY + timedelta(days=20)) == timeline.latest() == 82.0
+
+
+def random_logs(rng, count, first, span):
+    return [
+        {
+            "date": first + timedelta(days=rng.randrange(span)),
+            **{macro: float(rng.randrange(0, 3000)) for macro in MACROS},
+        }
+        for _ in range(count)
+    ]
+
+
+def test_ledger_range_totals_match_summing_the_logs():
+    rng = random.Random(3)
+    ledger = NutritionLedger()
+    logs = []
+    # Batches land after, before, inside and across the days already covered.
+    for offset, span in ((0, 30), (60, 10), (-40, 20), (-50, 200), (5, 1)):
+        first = DAY + timedelta(days=offset)
+        batch = random_logs(rng, rng.randrange(1, 40), first, span)
+        ledger.add_logs(batch)
+        logs.extend(batch)
+        assert len(ledger) == len(logs)
+        for _ in range(200):
+            start = DAY + timedelta(days=rng.randrange(-80, 200))
+            end = start + timedelta(days=rng.randrange(-3, 120))
+            expected = {
+                macro: round(sum(log[macro] for log in logs if start <= log["date"] <= end), 1) for macro in MACROS
+            }
+            assert ledger.range_totals(start, end) == expected, (start, end)
+
+
+def test_ledger_pages_walk_the_logs_newest_first():
+    rng = random.Random(5)
+    ledger = NutritionLedger()
+    logs = random_logs(rng, 300, DAY, 90)
+    for offset in range(0, len(logs), 70):
+        ledger.add_logs(logs[offset:offset + 70])
+    start, end = DAY + timedelta(days=10), DAY + timedelta(days=60)
+    expected = sorted(
+        (log for log in logs if start <= log["date"] <= end), key=lambda log: log["date"], reverse=True
+    )
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = ledger.page(start, end, cursor, limit=17)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert seen == expected
+    assert ledger.entries() == sorted(logs, key=lambda log: log["date"], reverse=True)
+
+
+def brute_force_rollup(points, series, start, end, resolution):
+    """``TimeSeriesRollups.query`` for one series, recomputed from the raw points."""
+    buckets = {}
+    for name, day, (top, total) in points:
+        if name != series:
+            continue
+        key = bucket_start(day, resolution)
+        if not bucket_start(start, resolution) <= key <= end:
+            continue
+        bucket = buckets.setdefault(key, {"top": top, "total": 0, "days": set()})
+        bucket["top"] = max(bucket["top"], top)
+        bucket["total"] += total
+        bucket["days"].add(day)
+    keys = sorted(buckets)
+    return {
+        "labels": [key.isoformat() for key in keys],
+        "days": [len(buckets[key]["days"]) for key in keys],
+        "top": [round(float(buckets[key]["top"]), 1) for key in keys],
+        "total": [round(float(buckets[key]["total"]), 1) for key in keys],
+        "average": [round(buckets[key]["total"] / len(buckets[key]["days"]), 1) for key in keys],
+    }
+
+
+def test_rollups_match_brute_force_at_every_resolution():
+    rng = random.Random(11)
+    rollups = TimeSeriesRollups({"top": "max", "total": "sum"}, averages={"average": "total"})
+    points = []
+    # Later batches revisit days, weeks and years earlier ones created, and reach before them.
+    for offset, span in ((0, 400), (-300, 900), (100, 7), (0, 1), (-800, 100)):
+        batch = [
+            (
+                rng.choice(("a", "b", "c")),
+                DAY + timedelta(days=offset + rng.randrange(span)),
+                [rng.randrange(0, 500), rng.randrange(0, 500)],
+            )
+            for _ in range(rng.randrange(1, 300))
+        ]
+        rollups.add_points(batch)
+        points.extend(batch)
+
+        for series in ("a", "b", "c", "missing"):
+            for resolution in RESOLUTIONS:
+                for _ in range(10):
+                    start = DAY + timedelta(days=rng.randrange(-900, 900))
+                    end = start + timedelta(days=rng.randrange(0, 700))
+                    result = rollups.query(series, start, end, resolution=resolution)
+                    expected = brute_force_rollup(points, series, start, end, resolution)
+                    assert result["resolution"] == resolution
+                    assert {key: result[key] for key in expected} == expected, (series, resolution, start, end)
+
+
+def test_pick_resolution_keeps_ranges_within_max_points():
+    rollups = TimeSeriesRollups({"total": "sum"})
+    rollups.add_points([("s", DAY + timedelta(days=day), [1]) for day in range(0, 3000, 3)])
+    for days, max_points, resolution in ((50, 120, "day"), (500, 120, "week"), (2000, 120, "month"), (2999, 10, "year")):
+        end = DAY + timedelta(days=days)
+        assert pick_resolution(DAY, end, max_points) == resolution
+        result = rollups.query("s", DAY, end, max_points=max_points)
+        assert result["resolution"] == resolution
+        assert len(result["labels"]) <= max_points
+
+
+def movement_entry(day, sid):
+    return {
+        "date": day,
+        "session_id": sid,
+        "body_part": "legs",
+        "body_part_label": "Legs",
+        "name": "Back Squat",
+        "weight": 100.0,
+        "sets": 3,
+        "reps": 5,
+    }
+
+
+def walk_days(index, days):
+    pages, cursor = [], None
+    while True:
+        page, cursor = index.day_page(cursor, days)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+def test_day_pages_cover_every_training_day_once_newest_first():
+    rng = random.Random(13)
+    index = SessionIndex()
+    entries = [
+        movement_entry(DAY + timedelta(days=rng.randrange(120)), f"s{rng.randrange(60):02d}") for _ in range(200)
+    ]
+    # A session id keeps the date of its first entry.
+    dates = {}
+    for entry in entries:
+        entry["date"] = dates.setdefault(entry["session_id"], entry["date"])
+    index.add_entries(entries)
+
+    expected = {}
+    for entry in entries:
+        expected.setdefault(entry["date"], set()).add(entry["session_id"])
+    for days in (1, 3, 7, 1000):
+        pages = walk_days(index, days)
+        assert all(len(page) == days for page in pages[:-1])
+        walked = [(day, [session.id for session in sessions]) for page in pages for day, sessions in page]
+        assert [day for day, _ in walked] == sorted(expected, reverse=True)
+        for day, ids in walked:
+            assert ids == sorted(expected[day], reverse=True)
+
+
+def test_day_page_cursors_survive_writes_between_pages():
+    index = SessionIndex()
+    index.add_entries([movement_entry(DAY + timedelta(days=day), f"s{day}") for day in range(0, 30, 2)])
+    first, cursor = index.day_page(None, 5)
+    assert [day for day, _ in first] == [DAY + timedelta(days=day) for day in (28, 26, 24, 22, 20)]
+
+    # Newer sessions do not shift the cursor; older ones show up further along.
+    index.add_entries([movement_entry(DAY + timedelta(days=40), "new"), movement_entry(DAY + timedelta(days=3), "old")])
+    rest = []
+    while cursor is not None:
+        page, cursor = index.day_page(cursor, 5)
+        rest.extend(day for day, _ in page)
+    assert rest == [DAY + timedelta(days=day) for day in (18, 16, 14, 12, 10, 8, 6, 4, 3, 2, 0)]
+
+
+def session_state(index):
+    return [
+        (session.date, session.id, session.total_sets, session.total_reps, [move.name for move in session.movements])
+        for session in index.sessions()
+    ]
+
+
+def test_sessions_folded_in_batches_match_one_build():
+    rng = random.Random(21)
+    names = ["Back Squat", "Leg Press", "Lunge"]
+    entries = []
+    for sid in range(40):
+        day = DAY + timedelta(days=rng.randrange(20))
+        for _ in range(rng.randint(1, 4)):
+            entry = movement_entry(day, f"s{sid:02d}")
+            entry.update(name=rng.choice(names), sets=rng.randint(1, 5), reps=rng.randint(1, 12))
+            entries.append(entry)
+
+    whole = SessionIndex()
+    whole.add_entries(entries)
+    batched = SessionIndex()
+    # Batch boundaries fall inside sessions too: later entries join the session already built.
+    cuts = sorted(rng.sample(range(1, len(entries)), 15))
+    for start, stop in zip([0] + cuts, cuts + [len(entries)]):
+        batched.add_entries(entries[start:stop])
+
+    assert session_state(batched) == session_state(whole)
+    assert [(session.date, session.id) for session in whole.sessions()] == sorted(
+        {(entry["date"], entry["session_id"]) for entry in entries}, reverse=True
+    )
+    for session in whole.sessions():
+        mine = [entry for entry in entries if entry["session_id"] == session.id]
+        assert session.total_sets == sum(entry["sets"] for entry in mine)
+        assert session.total_reps == sum(entry["sets"] * entry["reps"] for entry in mine)
+        assert [movement.name for movement in session.movements] == sorted(entry["name"] for entry in mine)
+
+
+def test_schedule_picks_up_movements_added_to_a_day_already_read():
+    index = SessionIndex()
+    index.add_entries([movement_entry(DAY, "a")])
+    assert [item["session_id"] for item in index.schedule_range(DAY, DAY)[DAY.isoformat()]] == ["a"]
+
+    index.add_entries([movement_entry(DAY, "b"), movement_entry(DAY + timedelta(days=1), "c")])
+    schedule = index.schedule_range(DAY, DAY + timedelta(days=1))
+    assert [item["session_id"] for item in schedule[DAY.isoformat()]] == ["b", "a"]
+    assert list(schedule) == [DAY.isoformat(), (DAY + timedelta(days=1)).isoformat()]
+    assert index.schedule_range(DAY + timedelta(days=2), DAY + timedelta(days=9)) == {}
+
+
+def test_daily_summary_rows_match_summing_sessions_and_logs():
+    rng = random.Random(17)
+    sessions = [
+        Session(
+            id=f"s{rng.randrange(1000):03d}-{number}",
+            date=DAY + timedelta(days=rng.randrange(20)),
+            body_weight=float(rng.randrange(70, 90)),
+            calories_target=float(rng.randrange(2000, 3000)),
+            calories_burned=float(rng.randrange(200, 600)),
+            protein_g=float(rng.randrange(100, 200)),
+            duration_minutes=float(rng.randrange(30, 90)),
+        )
+        for number in range(60)
+    ]
+    logs = [
+        {"date": DAY + timedelta(days=rng.randrange(25)), **{macro: float(rng.randrange(0, 900)) for macro in MACROS}}
+        for _ in range(80)
+    ]
+    table = DailySummaryTable()
+    for start in range(0, 60, 20):
+        table.add_sessions(sessions[start:start + 20])
+        table.add_logs(logs[start:start + 20])
+    table.add_logs(logs[60:])
+
+    for offset in range(-1, 26):
+        day = DAY + timedelta(days=offset)
+        todays = [session for session in sessions if session.date == day]
+        eaten = [log for log in logs if log["date"] == day]
+        row = table.get(day)
+        if not todays and not eaten:
+            assert row is None
+            continue
+        assert row["session_count"] == len(todays)
+        for field in DailySummaryTable.SESSION_FIELDS:
+            assert row[field] == pytest.approx(sum(getattr(session, field) for session in todays))
+        for macro in MACROS:
+            assert row[macro] == pytest.approx(sum(log[macro] for log in eaten))
+        newest = max(todays, key=lambda session: session.id) if todays else None
+        assert row["reference_weight"] == (newest.body_weight if newest else None)
+
+    start, end = DAY + timedelta(days=5), DAY + timedelta(days=9)
+    days = {session.date for session in sessions} | {log["date"] for log in logs}
+    assert list(table.window(start, end)) == sorted(day for day in days if start <= day <= end)
+
+
+def test_progression_records_match_brute_force_in_any_arrival_order():
+    rng = random.Random(29)
+    entries = []
+    for _ in range(150):
+        entry = movement_entry(DAY + timedelta(days=rng.randrange(40)), "s")
+        entry.update(weight=float(rng.randrange(60, 140, 10)), sets=rng.randint(1, 5), reps=rng.randint(1, 10))
+        entries.append(entry)
+
+    volumes = {}
+    for entry in entries:
+        volumes[entry["date"]] = volumes.get(entry["date"], 0.0) + entry["weight"] * entry["sets"] * entry["reps"]
+    heaviest = max(entry["weight"] for entry in entries)
+    best = max(epley_1rm(entry["weight"], entry["reps"]) for entry in entries)
+    best_volume = max(volumes.values())
+
+    results = []
+    for seed in range(3):
+        shuffled = entries[:]
+        random.Random(seed).shuffle(shuffled)
+        index = ProgressionIndex()
+        index.add_entries(shuffled[:70])
+        index.add_entries(shuffled[70:])
+        results.append(index.records("Back Squat"))
+    assert results[0] == results[1] == results[2]
+
+    records = results[0]
+    assert records["heaviest_weight"]["value"] == heaviest
+    assert records["heaviest_weight"]["date"] == min(e["date"] for e in entries if e["weight"] == heaviest).isoformat()
+    assert records["best_e1rm"]["value"] == round(best, 1)
+    assert records["best_volume_day"]["value"] == round(best_volume, 1)
+    assert records["best_volume_day"]["date"] == min(day for day, v in volumes.items() if v == best_volume).isoformat()
+    assert records["training_days"] == len(volumes)
+    assert (records["first_trained"], records["last_trained"]) == (min(volumes).isoformat(), max(volumes).isoformat())
+    assert index.records("Leg Press") is None
+
+
+def test_progression_window_and_trend():
+    index = ProgressionIndex()
+    for week, weight in enumerate([100.0, 105.0, 110.0, 115.0]):
+        entry = movement_entry(DAY + timedelta(weeks=week), "s")
+        entry.update(weight=weight, sets=1, reps=30)  # Epley: twice the load
+        index.add_entries([entry])
+
+    progression = index.progression("Back Squat", window=3)
+    assert [point["best_e1rm"] for point in progression["recent"]] == [210.0, 220.0, 230.0]
+    assert progression["trend"] == {
+        "e1rm_change": 20.0,
+        "e1rm_change_pct": 9.5,
+        "e1rm_per_week": 10.0,
+        "average_volume": 3300.0,
+    }
+    assert index.progression("Back Squat", window=1)["trend"] is None
+    assert index.progression("Leg Press") == {"recent": [], "trend": None}
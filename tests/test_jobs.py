@@ -0,0 +1,56 @@
+"""Analytics jobs through ``/api/jobs``: validation, coalescing, ownership and results."""
+
+import time
+
+import pytest
+
+import app as muscle_log
+
+
+OTHER = {"X-Muscle-Log-User": "other"}
+
+
+@pytest.fixture
+def jobs_client(flask_app):
+    client = flask_app.test_client()
+    yield client
+    with flask_app.app_context():
+        muscle_log.subsystems().jobs.shutdown()
+
+
+@pytest.mark.parametrize(
+    "payload, error",
+    [
+        ({"kind": "horoscope"}, "Unknown job kind"),
+        ({"kind": "strength_trends", "weeks": "many"}, "whole number"),
+        ([1, 2], "JSON object"),
+    ],
+)
+def test_bad_submissions_are_refused(client, payload, error):
+    response = client.post("/api/jobs", json=payload)
+    assert response.status_code == 400
+    assert error in response.get_json()["error"]
+
+
+def test_jobs_coalesce_per_user_and_data_version_and_finish(jobs_client):
+    client = jobs_client
+    first = client.post("/api/jobs", json={"kind": "body_weight_trend", "weeks": 4}).get_json()
+    again = client.post("/api/jobs", json={"kind": "body_weight_trend", "weeks": "4"}).get_json()
+    assert again["id"] == first["id"]
+    theirs = client.post("/api/jobs", json={"kind": "body_weight_trend", "weeks": 4}, headers=OTHER).get_json()
+    assert theirs["id"] != first["id"]
+    assert client.get(first["url"], headers=OTHER).status_code == 404
+
+    deadline = time.monotonic() + 60
+    status = first
+    while status["status"] not in ("done", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = client.get(first["url"]).get_json()
+    assert status["status"] == "done", status
+    assert "result" in status
+    # A finished job is the cached answer until a write moves the data version.
+    assert client.post("/api/jobs", json={"kind": "body_weight_trend", "weeks": 4}).status_code == 200
+
+    client.post("/nutrition", data={"log_date": "2024-03-01", "log_weight": "80"})
+    fresh = client.post("/api/jobs", json={"kind": "body_weight_trend", "weeks": 4}).get_json()
+    assert fresh["id"] != first["id"] and fresh["version"] > first["version"]
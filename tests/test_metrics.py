@@ -0,0 +1,56 @@
+"""The ``/metrics`` endpoint and opt-in request profiling."""
+
+import re
+
+import pytest
+
+import app as muscle_log
+import metrics
+
+pytestmark = pytest.mark.skipif(not metrics.ENABLED, reason="MUSCLE_LOG_METRICS is off")
+
+
+def scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    values = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+def test_requests_helpers_and_scans_are_counted(client):
+    # The registry is process-wide, so compare before and after.
+    route = 'route="/api/schedule",method="GET",status="200"'
+    before = scrape(client)
+    for _ in range(3):
+        assert client.get("/api/schedule?from=2024-03-01&to=2024-03-07").status_code == 200
+    after = scrape(client)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta(f"muscle_log_request_seconds_count{{{route}}}") == 3
+    assert delta('muscle_log_helper_seconds_count{helper="build_schedule_map"}') >= 1
+    assert 'muscle_log_entries_scanned_total{source="schedule_movements"}' in after
+
+    buckets = [
+        (name, value) for name, value in after.items() if name.startswith(f"muscle_log_request_seconds_bucket{{{route}")
+    ]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)
+    assert buckets[-1][0].endswith('le="+Inf"}')
+    assert counts[-1] == after[f"muscle_log_request_seconds_count{{{route}}}"]
+
+
+def test_profile_opt_in_writes_stats_for_that_request_only(tmp_path):
+    client = muscle_log.create_app(
+        {"STORAGE_BACKEND": "memory", "TEMPLATE_CACHE_DIR": "", "PROFILE_DIR": str(tmp_path)}
+    ).test_client()
+    assert client.get("/api/schedule").status_code == 200
+    assert list(tmp_path.iterdir()) == []
+    assert client.get("/api/schedule?profile=1").status_code == 200
+    assert [re.sub(r"^\d+-", "", path.name) for path in tmp_path.iterdir()] == ["muscle_log.schedule_api.prof"]
@@ -0,0 +1,78 @@
+"""Sessions and movements read back like the stored entries they were built from."""
+
+from datetime import date
+
+import pytest
+
+from models import Session
+
+
+def stored_entry(**fields):
+    entry = {
+        "date": date(2024, 3, 1),
+        "session_id": "s1",
+        "body_part": "legs",
+        "body_part_label": "Legs",
+        "name": "Back Squat",
+        "weight": 100.0,
+        "sets": 3,
+        "reps": 5,
+        "notes": "felt strong",
+        "entry_note": "felt strong",
+        "session_note": "leg day",
+        "body_weight": 80.0,
+        "session_duration_minutes": 45.0,
+        "calories_burned": 337.5,
+        "calories_target": 712.5,
+        "protein_g": 160.0,
+        "fat_g": 72.0,
+        "carb_g": 0.0,
+        "seq": 4,
+    }
+    entry.update(fields)
+    return entry
+
+
+def test_movements_answer_for_every_field_of_their_entry():
+    entries = [
+        stored_entry(),
+        stored_entry(name="Leg Press", weight=150.0, sets=4, reps=10, notes="leg day", entry_note="", seq=7),
+    ]
+    session = Session.from_entry("s1", entries[0])
+    movements = session.add_entries(entries)
+
+    for entry, movement in zip(entries, movements):
+        for name, value in entry.items():
+            if name in ("entry_note", "seq"):
+                continue
+            assert movement[name] == value, name
+            assert movement.get(name) == value
+        assert movement.total_reps == entry["sets"] * entry["reps"]
+        assert movement.session is session
+    assert movements[1].notes == "leg day" and movements[1].note == ""
+    assert (session.total_sets, session.total_reps, session.seq) == (7, 3 * 5 + 4 * 10, 7)
+    assert session.movements == movements
+    assert movements[0].get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        movements[0]["missing"]
+
+
+def test_legacy_entries_keep_only_their_own_note():
+    session = Session.from_entry("s1", stored_entry())
+    merged, own = session.add_entries(
+        [
+            {**stored_entry(notes="leg day"), "entry_note": None},
+            {**stored_entry(notes="knee ok"), "entry_note": None},
+        ]
+    )
+    assert (merged.note, merged.notes) == ("", "leg day")
+    assert (own.note, own.notes) == ("knee ok", "knee ok")
+
+
+def test_repeated_strings_are_held_once():
+    session = Session.from_entry("s1", stored_entry())
+    first, second = session.add_entries(
+        [stored_entry(name="".join(["Back ", "Squat"])), stored_entry(name="".join(["Back ", "Sq", "uat"]))]
+    )
+    assert first.name is second.name
+    assert first.body_part_label is second.body_part_label
@@ -0,0 +1,154 @@
+"""Journal storage across torn writes, crashed compactions and several workers."""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+
+import storage
+from storage import JournalStorage
+
+
+def nutrition(count, start=0):
+    return [
+        {"kind": "nutrition", "entry": {"date": date(2024, 1, 1) + timedelta(days=day), "calories": 100.0 + day}}
+        for day in range(start, start + count)
+    ]
+
+
+class Worker:
+    """A ``JournalStorage`` on a shared directory plus everything it has applied."""
+
+    def __init__(self, data_dir, **options):
+        self.storage = JournalStorage(str(data_dir), fsync=False, **options)
+        self.applied = []
+        self.storage.load(self.apply)
+
+    def apply(self, records):
+        self.applied.extend(records)
+
+    def seqs(self):
+        return sorted(record["seq"] for record in self.applied)
+
+
+def journal_names(data_dir):
+    return sorted(name for name in os.listdir(data_dir) if name.startswith("journal-"))
+
+
+def test_torn_last_line_is_skipped_then_overwritten(tmp_path):
+    writer = Worker(tmp_path)
+    writer.storage.append(nutrition(3), writer.apply)
+    with open(tmp_path / "journal-0.jsonl", "ab") as handle:
+        handle.write(b'{"kind":"nutrition","entry":{"date":"2024-')
+
+    restarted = Worker(tmp_path)
+    assert restarted.seqs() == [1, 2, 3]
+
+    restarted.storage.append(nutrition(1, start=3), restarted.apply)
+    assert Worker(tmp_path).seqs() == [1, 2, 3, 4]
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+def crash_before_removing_journals(monkeypatch):
+    def remove(path):
+        raise SimulatedCrash(path)
+
+    monkeypatch.setattr(storage.os, "remove", remove)
+
+
+def test_crash_between_snapshot_replace_and_journal_removal(tmp_path, monkeypatch):
+    bystander = Worker(tmp_path)
+    compactor = Worker(tmp_path)
+    compactor.storage.append(nutrition(3), compactor.apply)
+
+    with monkeypatch.context() as patch:
+        crash_before_removing_journals(patch)
+        with pytest.raises(SimulatedCrash):
+            compactor.storage.compact(compactor.apply)
+    assert journal_names(tmp_path) == ["journal-0.jsonl", "journal-1.jsonl"]
+
+    # A worker started after the crash loads the snapshot and nothing twice.
+    restarted = Worker(tmp_path)
+    assert restarted.seqs() == [1, 2, 3]
+
+    # One that was running all along must not keep writing to the stale journal.
+    bystander.storage.append(nutrition(1, start=3), bystander.apply)
+    assert bystander.seqs() == [1, 2, 3, 4]
+    assert Worker(tmp_path).seqs() == [1, 2, 3, 4]
+
+    restarted.storage.refresh(restarted.apply)
+    assert restarted.seqs() == [1, 2, 3, 4]
+
+    # The next compaction clears the leftover journal.
+    restarted.storage.compact(restarted.apply)
+    assert journal_names(tmp_path) == ["journal-2.jsonl"]
+    assert Worker(tmp_path).seqs() == [1, 2, 3, 4]
+
+
+def test_second_worker_catches_up_after_compaction(tmp_path):
+    writer = Worker(tmp_path)
+    reader = Worker(tmp_path)
+
+    writer.storage.append(nutrition(3), writer.apply)
+    writer.storage.compact(writer.apply)
+    writer.storage.append(nutrition(2, start=3), writer.apply)
+    reader.storage.refresh(reader.apply)
+    assert reader.seqs() == [1, 2, 3, 4, 5]
+
+    # Two compactions while the reader was not looking: it resumes from the snapshot.
+    writer.storage.append(nutrition(1, start=5), writer.apply)
+    writer.storage.compact(writer.apply)
+    writer.storage.append(nutrition(1, start=6), writer.apply)
+    writer.storage.compact(writer.apply)
+    writer.storage.append(nutrition(1, start=7), writer.apply)
+    reader.storage.refresh(reader.apply)
+    assert reader.seqs() == writer.seqs() == list(range(1, 9))
+
+    reader.storage.append(nutrition(1, start=8), reader.apply)
+    writer.storage.refresh(writer.apply)
+    assert writer.seqs() == list(range(1, 10))
+
+
+def test_maybe_compact_waits_until_the_journal_outgrows_the_snapshot(tmp_path):
+    writer = Worker(tmp_path, compact_after=2)
+    writer.storage.append(nutrition(10), writer.apply, compact=False)
+    writer.storage.maybe_compact(writer.apply)
+    assert journal_names(tmp_path) == ["journal-1.jsonl"]
+
+    writer.storage.append(nutrition(4, start=10), writer.apply, compact=False)
+    writer.storage.maybe_compact(writer.apply)
+    assert journal_names(tmp_path) == ["journal-1.jsonl"]
+
+    writer.storage.append(nutrition(1, start=14), writer.apply, compact=False)
+    writer.storage.maybe_compact(writer.apply)
+    assert journal_names(tmp_path) == ["journal-2.jsonl"]
+    assert Worker(tmp_path).seqs() == list(range(1, 16))
+
+
+def test_compacted_snapshot_holds_records_read_and_written(tmp_path):
+    writer = Worker(tmp_path)
+    other = Worker(tmp_path)
+    other.storage.append(nutrition(2), other.apply)
+    squat = {"date": date(2024, 2, 1), "name": "Back Squat", "sets": 3}
+    workout = {"kind": "workouts", "user": "ana", "entries": [squat]}
+    writer.storage.append([workout] + nutrition(1, start=2), writer.apply, compact=False)
+    writer.storage.compact(writer.apply)
+    assert journal_names(tmp_path) == ["journal-1.jsonl"]
+
+    def by_seq(records):
+        return sorted(records, key=lambda record: record["seq"])
+
+    records = by_seq(Worker(tmp_path).applied)
+    assert [(record["kind"], record.get("user")) for record in records] == [
+        ("nutrition", None),
+        ("nutrition", None),
+        ("workouts", "ana"),
+        ("nutrition", None),
+    ]
+    assert records[2]["entries"] == [{"date": date(2024, 2, 1), "name": "Back Squat", "sets": 3, "seq": 3}]
+    assert [record["entry"] for record in records if record["kind"] == "nutrition"] == [
+        record["entry"] for record in nutrition(3)
+    ]
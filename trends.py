@@ -0,0 +1,167 @@
+"""Long-horizon training and body-weight analytics, run as background jobs.
+
+These functions run in worker processes (see ``jobs``): they take plain,
+picklable inputs copied out of the stores and return JSON-ready dicts, and
+import nothing from the app.
+
+* ``strength_trends`` fits a line through each exercise's best estimated
+  1RM per training day and projects it forward.
+* ``body_weight_trend`` smooths the body-weight readings and sets the trend
+  against the intake logged and the calorie targets the sessions set.
+* ``muscle_balance`` totals the weekly sets and tonnage per body part.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from columnar import ColumnarWorkouts, epley_1rm
+
+
+KCAL_PER_KG = 7700.0  # energy in a kilogram of body mass
+WEIGHT_SMOOTHING = 0.1  # share of each new reading folded into the trend
+PROJECTION_WEEKS = (4, 12)
+
+
+def _fit(xs: Sequence[float], ys: Sequence[float]) -> Tuple[float, float, float]:
+    """Least-squares slope, intercept and r² of ``ys`` against ``xs``."""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    syy = sum((y - mean_y) ** 2 for y in ys)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    slope = sxy / sxx if sxx else 0.0
+    r2 = sxy * sxy / (sxx * syy) if sxx and syy else 0.0
+    return slope, mean_y - slope * mean_x, r2
+
+
+def _projections(slope: float, intercept: float, today: int) -> Dict[str, float]:
+    return {f"{weeks}w": round(intercept + slope * (today + weeks * 7), 1) for weeks in PROJECTION_WEEKS}
+
+
+def strength_trends(columns: ColumnarWorkouts, today: int, weeks: int) -> Dict:
+    """Per-exercise e1RM trend over the ``weeks`` weeks up to the ``today`` ordinal."""
+    best: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for ordinal, exercise, weight, reps in zip(columns.ordinals, columns.exercises, columns.weights, columns.reps):
+        days = best[exercise]
+        estimate = epley_1rm(weight, reps)
+        if estimate > days.get(ordinal, 0.0):
+            days[ordinal] = estimate
+
+    start = today - weeks * 7
+    exercises = []
+    for code, days in best.items():
+        window = sorted((ordinal, value) for ordinal, value in days.items() if start < ordinal <= today)
+        if len(window) < 2:
+            continue
+        slope, intercept, r2 = _fit([ordinal for ordinal, _ in window], [value for _, value in window])
+        exercises.append(
+            {
+                "exercise": columns.exercise_codes.names[code],
+                "training_days": len(window),
+                "current_e1rm": round(window[-1][1], 1),
+                "best_e1rm": round(max(value for _, value in window), 1),
+                "e1rm_per_week": round(slope * 7, 2),
+                "r2": round(r2, 3),
+                "projected_e1rm": _projections(slope, intercept, today),
+            }
+        )
+    exercises.sort(key=lambda item: item["exercise"])
+    return {"weeks": weeks, "exercises": exercises}
+
+
+def body_weight_trend(
+    days: List[Tuple[int, Optional[float], Optional[float], Optional[float]]],
+    today: int,
+    weeks: int,
+    baseline_kcal_per_kg: float,
+) -> Dict:
+    """Smoothed body weight and energy intake against targets over the last ``weeks`` weeks.
+
+    ``days`` holds ``(ordinal, weight, intake, session_target)`` per date with
+    any data, in date order; ``weight`` and ``intake`` are ``None`` where
+    nothing was recorded, ``session_target`` where no session set one (the
+    target is then the maintenance baseline for the trend weight).
+    """
+    start = today - weeks * 7
+    trend: Optional[float] = None
+    points = []
+    intakes: List[float] = []
+    targets: List[float] = []
+    for ordinal, weight, intake, session_target in days:
+        if ordinal > today:
+            break
+        if weight:
+            trend = weight if trend is None else trend + WEIGHT_SMOOTHING * (weight - trend)
+        if ordinal <= start or trend is None:
+            continue
+        points.append((ordinal, weight, trend))
+        if intake is not None:
+            intakes.append(intake)
+            targets.append(session_target or baseline_kcal_per_kg * trend)
+
+    result: Dict = {
+        "weeks": weeks,
+        "points": [
+            {"date": date.fromordinal(ordinal).isoformat(), "weight": weight, "trend": round(value, 2)}
+            for ordinal, weight, value in points
+        ],
+        "trend_kg_per_week": None,
+        "projected_weight": None,
+        "energy": None,
+    }
+    if len(points) >= 2:
+        slope, intercept, _ = _fit([ordinal for ordinal, _, _ in points], [value for _, _, value in points])
+        result["trend_kg_per_week"] = round(slope * 7, 3)
+        result["projected_weight"] = _projections(slope, intercept, today)
+    if intakes:
+        gap = (sum(intakes) - sum(targets)) / len(intakes)
+        result["energy"] = {
+            "logged_days": len(intakes),
+            "average_intake": round(sum(intakes) / len(intakes), 1),
+            "average_target": round(sum(targets) / len(targets), 1),
+            "average_gap": round(gap, 1),
+            # How much faster (or slower) than planned the intake should move the weight.
+            "gap_kg_per_week": round(gap * 7 / KCAL_PER_KG, 3),
+        }
+    return result
+
+
+def muscle_balance(columns: ColumnarWorkouts, today: int, weeks: int) -> Dict:
+    """Weekly sets and tonnage per body part over the ``weeks`` weeks ending with ``today``'s week."""
+    this_week = today - date.fromordinal(today).weekday()
+    first_week = this_week - (weeks - 1) * 7
+    sets: Dict[int, Dict[str, int]] = {first_week + 7 * index: defaultdict(int) for index in range(weeks)}
+    tonnage: Dict[str, float] = defaultdict(float)
+    totals: Dict[str, int] = defaultdict(int)
+    names = columns.body_part_codes.names
+    for ordinal, body_part, weight, set_count, reps in zip(
+        columns.ordinals, columns.body_parts, columns.weights, columns.sets, columns.reps
+    ):
+        if not first_week <= ordinal <= today:
+            continue
+        key = names[body_part]
+        sets[ordinal - date.fromordinal(ordinal).weekday()][key] += set_count
+        totals[key] += set_count
+        tonnage[key] += weight * set_count * reps
+
+    total_sets = sum(totals.values())
+    even_share = 1 / len(totals) if totals else 0.0
+    return {
+        "weeks": [
+            {"week": date.fromordinal(week).isoformat(), "sets": dict(by_part)}
+            for week, by_part in sorted(sets.items())
+        ],
+        "body_parts": {
+            key: {
+                "sets": count,
+                "weekly_sets": round(count / weeks, 1),
+                "tonnage": round(tonnage[key], 1),
+                "share": round(count / total_sets, 3),
+                # Positive when the body part gets more than an even split of the sets.
+                "deviation": round(count / total_sets - even_share, 3),
+            }
+            for key, count in sorted(totals.items())
+        },
+    }